@@ -1,3 +1,7 @@
+from typing import Optional
+
+from panel import state
+
 from annotation import log_file_path, llm_examples_path, llm_definitions_path, llm_zero_prompt_path, llm_cost_path
 from annotation.controller.AnnotationController import AnnotationController
 from annotation.model.AnnotationService import AnnotationService
@@ -8,7 +12,7 @@ from annotation.view.global_notifiers import NotifierService
 
 class Annotation:
     def __init__(self, debug: bool = False):
-        annotation_service = AnnotationService()
+        annotation_service = AnnotationService(session_id=Annotation._get_session_id())
         notifier_service = NotifierService()
         import_export_service = ImportExportService()
         controller: AnnotationController = AnnotationController(annotation_service, notifier_service,
@@ -18,5 +22,12 @@ class Annotation:
                                                                 debug=debug)
         self.view: AnnotationViewWrapper = AnnotationViewWrapper(controller)
 
+    @staticmethod
+    def _get_session_id() -> Optional[str]:
+        # When served, each browser session is given its own datastores
+        if state.curdoc is None or state.curdoc.session_context is None:
+            return None
+        return state.curdoc.session_context.id
+
     def run(self):
         return self.view.get_layout().servable()
@@ -4,20 +4,20 @@ import time
 import traceback
 from io import BytesIO
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Optional, BinaryIO, Iterator
 
 import openai
 from openai.error import AuthenticationError, APIConnectionError
 from pandas import DataFrame
 
 from annotation.model import AnnotationService
-from annotation.model.data_structures import SequenceTuple
+from annotation.model.data_structures import SequenceTuple, SequenceView
 from annotation.model.import_export import ImportExportService
 from annotation.view.global_notifiers import NotifierService
 
 
 class AnnotationController:
-    MIN_SEQUENCE_ID: int = 1
+    MIN_SEQUENCE_POSITION: int = 1
     OPENAI_API_KEY_ENVIRON: str = 'OPENAI_API_KEY'
 
     def __init__(self, annotation_service: AnnotationService,
@@ -44,10 +44,19 @@ class AnnotationController:
         self.import_export_service: ImportExportService = import_export_service
 
         self._update_display_callables: list[Callable] = []
-        self.curr_sequence_id: int = AnnotationController.MIN_SEQUENCE_ID
+        # The 1-based position of the current sequence among all sequences, in ascending order of sequence id
+        self.curr_sequence_position: int = AnnotationController.MIN_SEQUENCE_POSITION
+        # The sequence position last viewed in each open document other than the current one
+        self._document_positions: dict[str, int] = {}
+        # The snapshot of the current sequence, and the document, position and data version it was read at.
+        # Every display reads the same snapshot, so a refresh reads the datastores at most once
+        self._sequence_view: Optional[SequenceView] = None
+        self._sequence_view_key: Optional[tuple[str, int, int]] = None
 
         # Stores the cost and time estimates of the LLM processing currently being done.
-        self.cost_time_estimates: Optional[dict[str, float]] = None
+        self.cost_time_estimates: Optional[tuple[float, float]] = None
+        # Set when sequences change after the LLM was prepared. Estimates are recalculated when next requested
+        self.llm_estimates_stale: bool = False
 
         self.loading_msg: Optional[str] = None
 
@@ -55,6 +64,9 @@ class AnnotationController:
 
     @staticmethod
     def configure_logging(log_file_path: Path, debug: bool = False):
+        # Every session served by the process shares the log, so it is only cleared by the first session
+        if logging.getLogger().hasHandlers():
+            return
         with open(log_file_path, 'w') as log_f:
             log_f.write("")
 
@@ -113,65 +125,87 @@ class AnnotationController:
     def get_all_clause_text(self) -> dict[int, str]:
         return self.annotation_service.get_all_clause_text()
 
-    def get_min_sequence_id(self) -> int:
-        return AnnotationController.MIN_SEQUENCE_ID
+    def get_min_sequence_position(self) -> int:
+        return AnnotationController.MIN_SEQUENCE_POSITION
+
+    def get_max_sequence_position(self) -> int:
+        return self.get_sequence_count() - 1 + self.get_min_sequence_position()
+
+    def get_curr_sequence_view(self) -> SequenceView:
+        """
+        Returns a snapshot of the current sequence. The snapshot is only read again once the current document,
+        the current position or the data changes
+        """
+        try:
+            view_key: tuple[str, int, int] = (self.annotation_service.get_current_document_name(),
+                                              self.curr_sequence_position,
+                                              self.annotation_service.get_data_version())
+            if (self._sequence_view is None) or (view_key != self._sequence_view_key):
+                self._sequence_view = self.annotation_service.get_sequence_view(self.curr_sequence_position)
+                self._sequence_view_key = view_key
+        except Exception as e:
+            logging.error(str(e) + '\n' + traceback.format_exc())
+            return SequenceView(self.curr_sequence_position, 0)
+
+        return self._sequence_view
 
-    def get_max_sequence_id(self) -> int:
-        return self.get_sequence_count() - 1 + self.get_min_sequence_id()
+    def get_current_sequence_position(self) -> int:
+        return self.curr_sequence_position
 
-    def get_current_sequence_id(self) -> int:
-        return self.curr_sequence_id
+    def get_curr_sequence_id(self) -> Optional[int]:
+        return self.annotation_service.get_sequence_id_at(self.curr_sequence_position)
 
-    def set_current_sequence_id(self, new_sequence_id: int):
-        logging.debug(f"set_current_sequence_id called. Args: new_sequence_id: {new_sequence_id}")
+    def set_current_sequence_position(self, new_sequence_position: int):
+        logging.debug(f"set_current_sequence_position called. Args: new_sequence_position: {new_sequence_position}")
 
-        min_sequence_id: int = self.get_min_sequence_id()
-        max_sequence_id: int = self.get_max_sequence_id()
-        if new_sequence_id > max_sequence_id:
-            new_sequence_id = max_sequence_id
-        if new_sequence_id < min_sequence_id:
-            new_sequence_id = min_sequence_id
+        min_sequence_position: int = self.get_min_sequence_position()
+        max_sequence_position: int = self.get_max_sequence_position()
+        if new_sequence_position > max_sequence_position:
+            new_sequence_position = max_sequence_position
+        if new_sequence_position < min_sequence_position:
+            new_sequence_position = min_sequence_position
 
-        self.curr_sequence_id = new_sequence_id
+        self.curr_sequence_position = new_sequence_position
         self.update_displays()
 
-    def get_curr_sequence_ranges(self) -> Optional[SequenceTuple]:
+    def set_current_sequence_at_text_index(self, text_index: int):
+        """
+        Navigates to the first sequence with a clause containing the given character index.
+        Displays an error if no sequence covers the index
+        """
+        logging.debug(f"set_current_sequence_at_text_index called. Args: text_index: {text_index}")
         try:
-            return self.annotation_service.get_sequence_clause_ranges(self.curr_sequence_id)
+            sequence_ids: list[int] = self.annotation_service.get_sequence_ids_at_text_index(text_index)
+            sequence_position: Optional[int] = None
+            if len(sequence_ids) > 0:
+                sequence_position = self.annotation_service.get_sequence_position(sequence_ids[0])
         except Exception as e:
             logging.error(str(e) + '\n' + traceback.format_exc())
-            return None
+            self.display_error(str(e))
+            return
+
+        if sequence_position is None:
+            self.display_error(f"No clause pair sequence contains character {text_index}")
+            return
+        self.set_current_sequence_position(sequence_position)
+
+    def get_curr_sequence_ranges(self) -> Optional[SequenceTuple]:
+        return self.get_curr_sequence_view().get_clause_ranges()
 
     def get_curr_sequence_linkage_words(self) -> Optional[list[str]]:
-        try:
-            return self.annotation_service.get_sequence_linkage_words(self.curr_sequence_id)
-        except Exception as e:
-            logging.error(str(e) + '\n' + traceback.format_exc())
-            return None
+        return self.get_curr_sequence_view().linkage_words
 
     def get_all_classifications(self) -> list[str]:
         return self.annotation_service.get_all_sequence_classifications()
 
     def get_predicted_classifications(self) -> list[str]:
-        try:
-            return self.annotation_service.get_sequence_predict_classes(self.curr_sequence_id)
-        except Exception as e:
-            logging.error(str(e) + '\n' + traceback.format_exc())
-            return []
+        return self.get_curr_sequence_view().predicted_classes
 
     def get_correct_classifications(self) -> list[str]:
-        try:
-            return self.annotation_service.get_sequence_correct_classes(self.curr_sequence_id)
-        except Exception as e:
-            logging.error(str(e) + '\n' + traceback.format_exc())
-            return []
+        return self.get_curr_sequence_view().correct_classes
 
     def get_reasoning(self) -> str:
-        try:
-            return self.annotation_service.get_sequence_reasoning(self.curr_sequence_id)
-        except Exception as e:
-            logging.error(str(e) + '\n' + traceback.format_exc())
-            return ""
+        return self.get_curr_sequence_view().reasoning
 
     def get_sequence_count(self) -> int:
         try:
@@ -181,15 +215,27 @@ class AnnotationController:
             return -1
 
     def get_cost_time_estimates(self) -> Optional[tuple[float, float]]:
+        if self.llm_estimates_stale:
+            self.llm_estimates_stale = False
+            try:
+                self.cost_time_estimates = self.annotation_service.calculate_llm_cost_time_estimates(self.llm_cost_path)
+            except Exception as e:
+                logging.error(str(e) + '\n' + traceback.format_exc())
+                self.cost_time_estimates = None
+
         return self.cost_time_estimates
 
     # Data control methods
 
-    def load_source_file(self, source_file_content: BytesIO, source_filetype: str):
+    def load_source_file(self, source_file_content: BytesIO, source_filetype: str,
+                         document_name: Optional[str] = None):
         try:
             self.set_loading_msg("Loading source file")
             load_source_duration_start = time.time()
-            self.annotation_service.load_source_file(source_file_content, source_filetype)
+            if (document_name is not None) and (document_name != self.get_current_document_name()):
+                self._save_document_position()
+                self.curr_sequence_position = AnnotationController.MIN_SEQUENCE_POSITION
+            self.annotation_service.load_source_file(source_file_content, source_filetype, document_name)
             load_source_duration_total = time.time() - load_source_duration_start
             logging.info(f"Source file loading time: {load_source_duration_total} s")
             self.display_success("File successfully loaded")
@@ -200,25 +246,68 @@ class AnnotationController:
         self.stop_loading_indicator()
         self.update_displays()
 
+    def get_current_document_name(self) -> str:
+        return self.annotation_service.get_current_document_name()
+
+    def get_open_document_names(self) -> list[str]:
+        return self.annotation_service.get_open_document_names()
+
+    def _save_document_position(self):
+        self._document_positions[self.get_current_document_name()] = self.curr_sequence_position
+
+    def switch_document(self, document_name: str):
+        """
+        Makes the named open document current, returning to the sequence last viewed in it
+        """
+        logging.debug(f"switch_document called. Args: document_name: {document_name}")
+        if document_name == self.get_current_document_name():
+            return
+        try:
+            self._save_document_position()
+            self.annotation_service.switch_document(document_name)
+        except Exception as e:
+            logging.error(str(e) + '\n' + traceback.format_exc())
+            self.display_error(str(e))
+            return
+
+        self.curr_sequence_position = self._document_positions.pop(document_name,
+                                                                    AnnotationController.MIN_SEQUENCE_POSITION)
+        # The LLM state is kept per document, so the estimates are recalculated for the new document when requested
+        self.llm_prepared = self.annotation_service.llm_processor is not None
+        self.cost_time_estimates = None
+        self.llm_estimates_stale = self.llm_prepared
+        self.update_displays()
+
     def prepare_llm_processor(self, llm_definitions: Optional[BytesIO] = None,
                               llm_examples: Optional[BytesIO] = None,
                               llm_zero_prompt: Optional[BytesIO] = None):
+        # Uploaded files are stored with the document rather than over the defaults, which every session shares
         if llm_definitions is not None:
-            with open(self.llm_definitions_path, 'wb') as f:
-                f.write(llm_definitions.read())
+            self.llm_definitions_path = self.annotation_service.store_llm_input_file(llm_definitions,
+                                                                                    self.llm_definitions_path)
         if llm_examples is not None:
-            with open(self.llm_examples_path, 'wb') as f:
-                f.write(llm_examples.read())
+            self.llm_examples_path = self.annotation_service.store_llm_input_file(llm_examples,
+                                                                                 self.llm_examples_path)
         if llm_zero_prompt is not None:
-            with open(self.llm_zero_prompt_path, 'wb') as f:
-                f.write(llm_zero_prompt.read())
+            self.llm_zero_prompt_path = self.annotation_service.store_llm_input_file(llm_zero_prompt,
+                                                                                    self.llm_zero_prompt_path)
 
         self.annotation_service.initialise_llm_processor(self.llm_examples_path, self.llm_definitions_path,
                                                          self.llm_zero_prompt_path, self.set_loading_msg)
         self.cost_time_estimates = self.annotation_service.calculate_llm_cost_time_estimates(self.llm_cost_path)
+        self.llm_estimates_stale = False
 
         self.llm_prepared = True
 
+    def invalidate_llm_estimates(self):
+        """
+        Marks the LLM cost and time estimates as out of date after a change to the sequences.
+        The LLM processor itself is updated in memory by the annotation service when next needed.
+        """
+        if self.llm_prepared:
+            self.cost_time_estimates = None
+            self.llm_estimates_stale = True
+
     def llm_process_sequences(self):
         if os.environ.get(AnnotationController.OPENAI_API_KEY_ENVIRON) is None:
             self.display_error("No valid OpenAI API key found. Please enter your OpenAI API key.")
@@ -233,10 +322,15 @@ class AnnotationController:
             llm_process_duration_total = time.time() - llm_process_duration_start
             logging.info(f"LLM process time: {llm_process_duration_total} s")
 
-            sequence_df: DataFrame = self.import_export_service.import_file(self.llm_post_process_path, "csv")
-            self.annotation_service.build_datastore(sequence_df)
+            if self.llm_post_process_path is None:
+                self.display_info("All sequences already have an LLM classification")
+            else:
+                field_dtypes: dict[str, type] = self.annotation_service.get_sequence_field_dtypes()
+                sequence_df: DataFrame = self.import_export_service.import_file(self.llm_post_process_path, "csv",
+                                                                                list(field_dtypes.keys()), field_dtypes)
+                self.annotation_service.merge_llm_results(sequence_df)
 
-            self.display_success("LLM classification complete")
+                self.display_success("LLM classification complete")
         except Exception as e:
             logging.error(str(e) + '\n' + traceback.format_exc())
             self.display_error(str(e))
@@ -247,6 +341,17 @@ class AnnotationController:
 
     def load_preprocessed_sequences(self, preprocessed_content: Optional[BytesIO],
                                     preprocessed_filetype: Optional[str]):
+        for _ in self.iter_load_preprocessed_sequences(preprocessed_content, preprocessed_filetype):
+            pass
+
+    def iter_load_preprocessed_sequences(self, preprocessed_content: Optional[BytesIO],
+                                         preprocessed_filetype: Optional[str]) -> Iterator[int]:
+        """
+        Loads the preprocessed file a chunk of rows at a time, validating each chunk before it is stored.
+        The displays are updated after every chunk, and the number of rows loaded so far is yielded, so the caller
+        can let the user navigate the sequences already loaded before continuing. If a chunk is invalid,
+        the chunks before it stay loaded
+        """
         if preprocessed_content is None:
             self.display_error("No preprocessed file provided")
             return
@@ -258,8 +363,15 @@ class AnnotationController:
             self.set_loading_msg("Loading preprocessed file")
             preprocessed_load_duration_start = time.time()
 
-            preprocessed_df: DataFrame = self.import_export_service.import_file(preprocessed_content, preprocessed_filetype)
-            self.annotation_service.build_datastore(preprocessed_df)
+            field_dtypes: dict[str, type] = self.annotation_service.get_sequence_field_dtypes()
+            preprocessed_chunks: Iterator[DataFrame] = self.import_export_service.iter_import_chunks(
+                preprocessed_content, preprocessed_filetype, columns=list(field_dtypes.keys()), dtypes=field_dtypes)
+            loaded_row_count: int = 0
+            for preprocessed_df in preprocessed_chunks:
+                self.annotation_service.build_datastore(preprocessed_df)
+                loaded_row_count += len(preprocessed_df)
+                self.set_loading_msg(f"Loading preprocessed file: {loaded_row_count} rows loaded")
+                yield loaded_row_count
 
             preprocessed_load__duration_total = time.time() - preprocessed_load_duration_start
             logging.info(f"Preprocessed file load time: {preprocessed_load__duration_total} s")
@@ -296,22 +408,25 @@ class AnnotationController:
         logging.debug("next_sequence called")
 
         num_sequences: int = self.annotation_service.get_sequence_count()
-        if self.curr_sequence_id < num_sequences:
-            self.curr_sequence_id += 1
+        if self.curr_sequence_position < num_sequences:
+            self.curr_sequence_position += 1
         self.update_displays()
 
     def prev_sequence(self):
         logging.debug("prev_sequence called")
 
-        if self.curr_sequence_id > AnnotationController.MIN_SEQUENCE_ID:
-            self.curr_sequence_id -= 1
+        if self.curr_sequence_position > AnnotationController.MIN_SEQUENCE_POSITION:
+            self.curr_sequence_position -= 1
         self.update_displays()
 
     def set_correct_classifications(self, classifications: list[str]):
         logging.debug(f"set_correct_classifications called. Args: classifications: {classifications}")
 
         try:
-            self.annotation_service.set_sequence_correct_classes(self.curr_sequence_id, classifications)
+            curr_sequence_id: Optional[int] = self.get_curr_sequence_id()
+            if curr_sequence_id is None:
+                return
+            self.annotation_service.set_sequence_correct_classes(curr_sequence_id, classifications)
         except Exception as e:
             logging.error(str(e) + '\n' + traceback.format_exc())
 
@@ -324,37 +439,58 @@ class AnnotationController:
             logging.error(str(e) + '\n' + traceback.format_exc())
             new_id = -1
 
-        if self.llm_prepared:
-            # If the LLM has already been prepared, a change to the sequences will require preparing the LLM again
-            self.prepare_llm_processor()
+        # A change to the sequences changes the LLM delta, so the estimates must be recalculated
+        self.invalidate_llm_estimates()
 
         self.update_displays()
 
         return new_id
 
     def delete_curr_sequence(self):
-        logging.debug(f"delete_curr_sequence called. Curr sequence id: {self.curr_sequence_id}")
+        logging.debug(f"delete_curr_sequence called. Curr sequence position: {self.curr_sequence_position}")
 
         try:
-            self.annotation_service.delete_sequence(self.curr_sequence_id)
+            curr_sequence_id: Optional[int] = self.get_curr_sequence_id()
+            if curr_sequence_id is None:
+                self.update_displays()
+                return
+            self.annotation_service.delete_sequence(curr_sequence_id)
         except Exception as e:
             logging.error(str(e) + '\n' + traceback.format_exc())
             self.update_displays()
             return
 
-        # The sequence index must be decreased if the deleted sequence was not the first sequence
-        if self.curr_sequence_id > AnnotationController.MIN_SEQUENCE_ID:
-            self.curr_sequence_id -= 1
+        # The sequence position must be decreased if the deleted sequence was not the first sequence
+        if self.curr_sequence_position > AnnotationController.MIN_SEQUENCE_POSITION:
+            self.curr_sequence_position -= 1
 
-        if self.llm_prepared:
-            # If the LLM has already been prepared, a change to the sequences will require preparing the LLM again
-            self.prepare_llm_processor()
+        # A change to the sequences changes the LLM delta, so the estimates must be recalculated
+        self.invalidate_llm_estimates()
 
         # The display must be updated to reflect the deletion
         self.update_displays()
 
-    def export(self, filetype: str) -> Optional[BytesIO]:
+    def commit_changes(self):
+        try:
+            self.annotation_service.commit_changes()
+        except Exception as e:
+            logging.error(str(e) + '\n' + traceback.format_exc())
+            self.display_error(str(e))
+
+    def end_session(self):
+        """
+        Releases the datastores of the session once it has ended
+        """
         try:
+            self.annotation_service.close()
+        except Exception as e:
+            logging.error(str(e) + '\n' + traceback.format_exc())
+
+    def export(self, filetype: str) -> Optional[BinaryIO]:
+        try:
+            if self.import_export_service.is_stream_filetype(filetype):
+                return self.import_export_service.export_stream(self.annotation_service.iter_dataframes_for_export(),
+                                                                filetype)
             return self.import_export_service.export(self.annotation_service.get_dataframe_for_export(), filetype)
         except Exception as e:
             logging.error(str(e) + '\n' + traceback.format_exc())
@@ -364,8 +500,14 @@ class AnnotationController:
     def get_import_export_file_formats(self) -> list[str]:
         return self.import_export_service.get_filetypes()
 
+    def get_import_file_formats(self) -> list[str]:
+        return self.import_export_service.get_import_filetypes()
+
     def get_plot_data(self) -> Optional[DataFrame]:
         return self.annotation_service.get_dataframe_for_plot()
 
     def get_plot_weights_data(self) -> Optional[DataFrame]:
         return self.annotation_service.get_weights_dataframe_for_plot()
+
+    def get_plot_class_count_data(self) -> Optional[DataFrame]:
+        return self.annotation_service.get_class_count_dataframe_for_plot()
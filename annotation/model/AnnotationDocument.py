@@ -0,0 +1,33 @@
+from pathlib import Path
+from typing import Optional
+
+from pandas import DataFrame
+
+from annotation.model.data_structures import SequenceTuple
+from annotation.model.database import AnnotationDAO, DatastoreHandler
+from llm import LLMProcess
+
+
+class AnnotationDocument:
+    """
+    Holds the datastores of one open document together with its LLM processing state,
+    so that the annotation service can switch between documents without recomputing either.
+    """
+    def __init__(self, name: str, annotation_dao: AnnotationDAO, text_path: Path,
+                 pre_llm_sequence_path: Path, llm_data_store_dir: Path):
+        self.name: str = name
+        self.annotation_dao: AnnotationDAO = annotation_dao
+        self.datastore_handler: DatastoreHandler = DatastoreHandler(annotation_dao)
+        self.text_path: Path = text_path
+        self.pre_llm_sequence_path: Path = pre_llm_sequence_path
+        self.llm_data_store_dir: Path = llm_data_store_dir
+
+        self.llm_processor: Optional[LLMProcess] = None
+        # Clause ranges of the sequences that already hold an LLM prediction.
+        # Used to only send new or changed sequences to the LLM.
+        self.llm_processed_ranges: set[SequenceTuple] = set()
+        # The sequences still to be sent to the LLM. Sequence additions and removals are applied to this
+        # in memory, and only synced to the LLM processor when it is next needed.
+        self.llm_delta_df: DataFrame = DataFrame(columns=DatastoreHandler.PRE_LLM_FIELDS)
+        self.llm_processor_stale: bool = False
+        self.llm_cost_time_estimates: Optional[tuple[float, float]] = None
@@ -1,83 +1,281 @@
 from io import BytesIO
 from pathlib import Path
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterator
 
-from pandas import DataFrame
+from numpy import ndarray
+from pandas import DataFrame, concat
 
+from annotation.model.AnnotationDocument import AnnotationDocument
 from annotation.model.clausing.SequencingTool import SequencingTool
-from annotation.model.data_structures import ClauseSequence, Classification, SequenceTuple
-from annotation.model.database import AnnotationDAO, DatastoreHandler
-from annotation.model.database import (llm_data_store_dir, ref_text_ds_path, clauses_ds_path,
-                                       sequences_ds_path, pre_llm_sequence_path)
+from annotation.model.data_structures import ClauseSequence, Classification, SequenceTuple, SequenceView
+from annotation.model.data_structures import ClassificationMask
+from annotation.model.database import AnnotationDAO, AnnotationWorkspace, DatastoreHandler
+from annotation.model.database import data_store_dir, default_document_name, datastore_backend
 from annotation.model.clausing import SourceFileClauser
+from annotation.model.clausing import clause_pair_range, clause_max_char_distance, pair_within_turns
 from llm import LLMProcess
 
 
 class AnnotationService:
     OPEN_AI_MODEL: str = "gpt-4o"
 
-    def __init__(self):
-        self.annotation_dao: AnnotationDAO = AnnotationDAO(ref_text_ds_path, clauses_ds_path, sequences_ds_path)
-        self.annotation_dao.clear_all_data_stores()
-        self.datastore_handler: DatastoreHandler = DatastoreHandler(self.annotation_dao)
-
-        self.llm_processor: Optional[LLMProcess] = None
-
-    def load_source_file(self, source_file_content: BytesIO, filetype: str):
+    def __init__(self, data_dir: Path = data_store_dir, session_id: Optional[str] = None):
+        """
+        Parameters
+        ----------
+        data_dir: Path - the directory holding the datastores of every document
+        session_id: Optional[str] - if provided, the datastores are held in a workspace private to this session,
+        so concurrent sessions served by the same process never share datastore files
+        """
+        self.session_id: Optional[str] = session_id
+        if session_id is None:
+            self.workspace: AnnotationWorkspace = AnnotationWorkspace(data_dir, datastore_backend)
+        else:
+            self.workspace: AnnotationWorkspace = AnnotationWorkspace.for_session(data_dir, session_id,
+                                                                                  datastore_backend)
+        # Every open document, by name. Switching documents only changes which of these is current
+        self._documents: dict[str, AnnotationDocument] = {}
+        # The datastores are only cleared when a new source file is loaded, so work recovered from the
+        # write-ahead logs of a previous run is kept
+        self._document: AnnotationDocument = self.open_document(default_document_name)
+
+    @property
+    def annotation_dao(self) -> AnnotationDAO:
+        return self._document.annotation_dao
+
+    @property
+    def datastore_handler(self) -> DatastoreHandler:
+        return self._document.datastore_handler
+
+    @property
+    def llm_processor(self) -> Optional[LLMProcess]:
+        return self._document.llm_processor
+
+    def open_document(self, document_name: str) -> AnnotationDocument:
+        """
+        Returns the named document, opening its datastores if it is not already open. Does not switch to the document
+        """
+        document: Optional[AnnotationDocument] = self._documents.get(document_name)
+        if document is not None:
+            return document
+
+        document = AnnotationDocument(document_name, self.workspace.open_document(document_name),
+                                      self.workspace.get_text_path(document_name),
+                                      self.workspace.get_pre_llm_sequence_path(document_name),
+                                      self.workspace.get_llm_data_store_dir(document_name))
+        self._documents[document_name] = document
+
+        return document
+
+    def switch_document(self, document_name: str):
+        """
+        Makes the named document current, opening it first if needed.
+        The clauses, sequences and LLM state of an open document are kept, so switching to it recomputes nothing
+        """
+        self._document = self.open_document(document_name)
+
+    def close_document(self, document_name: str):
+        """
+        Writes any outstanding changes of the named document and closes it. The current document cannot be closed
+        """
+        if document_name == self._document.name:
+            raise ValueError(f"Cannot close the current document: {document_name}")
+        if self._documents.pop(document_name, None) is not None:
+            self.workspace.close_document(document_name)
+
+    def get_current_document_name(self) -> str:
+        return self._document.name
+
+    def get_open_document_names(self) -> list[str]:
+        return list(self._documents.keys())
+
+    def load_source_file(self, source_file_content: BytesIO, filetype: str, document_name: Optional[str] = None,
+                         pair_range: int = clause_pair_range,
+                         max_char_distance: Optional[int] = clause_max_char_distance,
+                         within_turns: bool = pair_within_turns):
+        """
+        Clauses the source file into the datastores of a document, replacing their contents.
+        If document_name is provided, the named document is opened and made current first,
+        otherwise the current document is used.
+        The clause pairs are generated and stored in chunks, so wide pairing ranges over long texts
+        do not need every pair in memory at once
+
+        Parameters
+        ----------
+        source_file_content: BytesIO - the content of the source file
+        filetype: str - either 'docx' or 'txt'
+        document_name: Optional[str] - the document to load the source file into
+        pair_range: int - each clause is paired with the next pair_range clauses
+        max_char_distance: Optional[int] - if provided, clauses separated by more than this many characters
+        are not paired
+        within_turns: bool - if True, clauses in different speaker turns are not paired. Only applies to source files
+        with speaker turns
+        """
+        if document_name is not None:
+            self.switch_document(document_name)
+        document: AnnotationDocument = self._document
         self.annotation_dao.clear_all_data_stores()
+        document.llm_processed_ranges.clear()
+        document.llm_delta_df = DataFrame(columns=DatastoreHandler.PRE_LLM_FIELDS)
+        document.llm_processor = None
+        document.llm_cost_time_estimates = None
 
         source_loader: SourceFileClauser = SourceFileClauser(source_file_content, filetype)
         text_content: str = source_loader.get_text()
         self.datastore_handler.build_text_datastore(text_content)
 
         clause_df: DataFrame = source_loader.generate_clause_dataframe()
-        sequence_generator = SequencingTool(clause_df)
-        sequence_df = sequence_generator.generate_initial_sequence_df()
-        self.datastore_handler.build_clause_datastores(sequence_df)
+        turn_starts: Optional[ndarray] = source_loader.get_turn_starts() if within_turns else None
+        sequence_generator = SequencingTool(clause_df, pair_range, max_char_distance, turn_starts)
+        # Clause and sequence ids continue from one chunk to the next, so they match storing every pair at once
+        for sequence_df in sequence_generator.iter_sequence_chunks():
+            self.datastore_handler.build_clause_datastores(sequence_df)
+
+    def store_llm_input_file(self, file_content: BytesIO, source_path: Path) -> Path:
+        """
+        Writes an uploaded LLM input file into the LLM data store of the current document,
+        leaving the shared default input file untouched
+
+        Parameters
+        ----------
+        file_content: BytesIO - the content of the uploaded file
+        source_path: Path - the default input file the upload replaces. Its name is kept, so the file type is kept
+        Returns
+        -------
+        The path of the written file
+        """
+        stored_path: Path = self._document.llm_data_store_dir.joinpath(source_path.name)
+        with open(stored_path, 'wb') as f:
+            f.write(file_content.read())
+
+        return stored_path
 
     def initialise_llm_processor(self, llm_examples_path: Path,
                                  llm_definitions_path: Path,
                                  llm_zero_prompt_path: Path,
                                  progress_update_fn: Callable):
-        self.datastore_handler.update_pre_llm_sequence_file(str(pre_llm_sequence_path.resolve()))
-        self.llm_processor = LLMProcess(modelname_llm=self.OPEN_AI_MODEL,
-                                        filename_pairs=str(pre_llm_sequence_path.resolve()),
-                                        filename_text=str(ref_text_ds_path.resolve()),
-                                        filename_examples=str(llm_examples_path.resolve()),
-                                        filename_definitions=str(llm_definitions_path.resolve()),
-                                        filename_zero_prompt=str(llm_zero_prompt_path.resolve()),
-                                        outpath=str(llm_data_store_dir.resolve()),
-                                        progress_update_fn=progress_update_fn)
+        document: AnnotationDocument = self._document
+        pre_llm_df: DataFrame = self.datastore_handler.build_pre_llm_dataframe()
+        pre_llm_df.to_csv(str(document.pre_llm_sequence_path.resolve()), index=False, na_rep='')
+        delta_sequence_ids: list[int] = self.datastore_handler.get_llm_delta_sequence_ids(
+            document.llm_processed_ranges)
+        document.llm_delta_df = pre_llm_df.loc[pre_llm_df[DatastoreHandler.SEQ_ID_FIELD].isin(delta_sequence_ids)]
+        document.llm_processor = LLMProcess(modelname_llm=self.OPEN_AI_MODEL,
+                                            filename_pairs=str(document.pre_llm_sequence_path.resolve()),
+                                            filename_text=str(document.text_path.resolve()),
+                                            filename_examples=str(llm_examples_path.resolve()),
+                                            filename_definitions=str(llm_definitions_path.resolve()),
+                                            filename_zero_prompt=str(llm_zero_prompt_path.resolve()),
+                                            outpath=str(document.llm_data_store_dir.resolve()),
+                                            progress_update_fn=progress_update_fn,
+                                            sequence_ids=delta_sequence_ids)
+        document.llm_processor_stale = False
+        document.llm_cost_time_estimates = None
+
+    def _invalidate_llm_processor(self):
+        self._document.llm_processor_stale = True
+        self._document.llm_cost_time_estimates = None
+
+    def _sync_llm_processor(self):
+        """
+        Applies the in-memory delta to the LLM processor if sequences were added or removed since the last sync.
+        """
+        if (self.llm_processor is None) or (not self._document.llm_processor_stale):
+            return
+        self.llm_processor.set_sequences(self._document.llm_delta_df)
+        self._document.llm_processor_stale = False
 
     def calculate_llm_cost_time_estimates(self, llm_cost_path: Path) -> tuple[float, float]:
         if self.llm_processor is None:
             raise ValueError("LLM process called but no LLM processor is set")
+        if self._document.llm_cost_time_estimates is not None:
+            return self._document.llm_cost_time_estimates
 
+        self._sync_llm_processor()
         estimates = self.llm_processor.estimate_compute_cost(str(llm_cost_path.resolve()))
 
         if (estimates['compute_time'] is None) or (estimates['costs'] is None):
             raise ValueError("Error calculating LLM process time and costs")
 
-        return float(estimates['costs']), float(estimates['compute_time'])
+        self._document.llm_cost_time_estimates = float(estimates['costs']), float(estimates['compute_time'])
+        return self._document.llm_cost_time_estimates
 
-    def perform_llm_processing(self) -> str:
+    def perform_llm_processing(self) -> Optional[str]:
+        """
+        Runs the LLM over the sequences that are new or changed since the last prediction.
+        Returns the path of the results file, or None if there were no sequences to process.
+        """
         if self.llm_processor is None:
             raise ValueError("LLM process called but no LLM processor is set")
+        self._sync_llm_processor()
+        if len(self.llm_processor.df_sequences) == 0:
+            return None
 
+        self.datastore_handler.update_pre_llm_sequence_file(str(self._document.pre_llm_sequence_path.resolve()))
         return self.llm_processor.run()
 
+    @staticmethod
+    def get_sequence_field_dtypes() -> dict[str, type]:
+        """
+        Returns the dtype of each field required in preprocessed sequence and LLM result files
+        """
+        return dict(DatastoreHandler.FIELD_DTYPES)
+
     def build_datastore(self, master_sequence_df: DataFrame):
         self.datastore_handler.update_sequence_datastores(master_sequence_df)
+        self._document.llm_processed_ranges.update(DatastoreHandler.get_sequence_ranges(master_sequence_df))
+
+    def merge_llm_results(self, llm_sequence_df: DataFrame):
+        """
+        Stores the LLM results that hold a valid classification. Sequences whose LLM response failed or held an
+        unknown classification are left unchanged and kept in the delta, so they are sent to the LLM again
+        """
+        predicted_masks: ndarray = ClassificationMask.from_value_strings(
+            llm_sequence_df[DatastoreHandler.PREDICTED_FIELD].values)
+        llm_sequence_df = llm_sequence_df.loc[predicted_masks != ClassificationMask.EMPTY_MASK]
+        self.datastore_handler.update_sequence_datastores(llm_sequence_df, preserve_corrected=True)
+        self._document.llm_processed_ranges.update(DatastoreHandler.get_sequence_ranges(llm_sequence_df))
+
+        id_field: str = DatastoreHandler.SEQ_ID_FIELD
+        merged_ids = llm_sequence_df[id_field].astype(int)
+        llm_delta_df: DataFrame = self._document.llm_delta_df
+        self._document.llm_delta_df = llm_delta_df.loc[~llm_delta_df[id_field].isin(merged_ids)]
+        self._invalidate_llm_processor()
+
+    def commit_changes(self):
+        self.workspace.commit()
+
+    def close(self):
+        """
+        Writes any outstanding changes and closes the datastores. If the datastores are private to a session,
+        they are deleted, as no other session can open them
+        """
+        self._documents.clear()
+        if self.session_id is None:
+            self.workspace.close()
+        else:
+            self.workspace.delete()
 
     def get_dataframe_for_export(self) -> DataFrame:
+        self.commit_changes()
         return self.datastore_handler.build_export_dataframe()
 
+    def iter_dataframes_for_export(self) -> Iterator[DataFrame]:
+        """
+        Produces the rows of get_dataframe_for_export in consecutive chunks, without building the full DataFrame
+        """
+        self.commit_changes()
+        return self.datastore_handler.iter_export_dataframes()
+
     def get_dataframe_for_plot(self) -> Optional[DataFrame]:
         return self.datastore_handler.build_plot_dataframe()
 
     def get_weights_dataframe_for_plot(self) -> Optional[DataFrame]:
         return self.datastore_handler.build_weights_plot_dataframe()
 
+    def get_class_count_dataframe_for_plot(self) -> Optional[DataFrame]:
+        return self.datastore_handler.build_class_count_dataframe()
+
     def get_text(self) -> str:
         return self.annotation_dao.get_text()
 
@@ -87,6 +285,50 @@ class AnnotationService:
     def get_sequence_count(self) -> int:
         return self.annotation_dao.get_sequence_count()
 
+    def get_sequence_id_at(self, position: int) -> Optional[int]:
+        return self.annotation_dao.get_sequence_id_at(position)
+
+    def get_sequence_position(self, sequence_id: int) -> Optional[int]:
+        return self.annotation_dao.get_sequence_position(sequence_id)
+
+    def get_data_version(self) -> int:
+        """
+        Returns a number that changes whenever the clauses or sequences of the current document change
+        """
+        return self.annotation_dao.get_data_version()
+
+    def get_sequence_view(self, position: int) -> SequenceView:
+        """
+        Reads everything displayed about the sequence at the given 1-based position in one call
+
+        Parameters
+        ----------
+        position: int - the 1-based position of the sequence, in ascending order of sequence id
+        Returns
+        -------
+        A SequenceView snapshot. Its sequence fields are empty if no sequence is at the position
+        """
+        sequence_id: Optional[int] = self.annotation_dao.get_sequence_id_at(position)
+        sequence: Optional[ClauseSequence] = self.annotation_dao.get_sequence_by_id(sequence_id)
+
+        return SequenceView(position, self.annotation_dao.get_sequence_count(), sequence)
+
+    def get_clause_sequence_ids(self, clause_id: int) -> list[int]:
+        """
+        Returns the ids of every sequence the clause with the given id is part of
+        """
+        return [sequence.get_id() for sequence in self.annotation_dao.get_sequences_by_clause_id(clause_id)]
+
+    def get_sequence_ids_at_text_index(self, index: int) -> list[int]:
+        """
+        Returns the ids of every sequence with a clause containing the given character index, in ascending order
+        """
+        sequence_ids: set[int] = set()
+        for clause in self.annotation_dao.get_clauses_containing(index):
+            sequence_ids.update(self.get_clause_sequence_ids(clause.range_id))
+
+        return sorted(sequence_ids)
+
     def get_sequence_clause_ranges(self, sequence_id: int) -> Optional[SequenceTuple]:
         sequence: Optional[ClauseSequence] = self.annotation_dao.get_sequence_by_id(sequence_id)
         if sequence is None:
@@ -145,7 +387,24 @@ class AnnotationService:
         return sequence.get_reasoning()
 
     def create_sequence(self, clause_a_id: int, clause_b_id: int) -> int:
-        return self.annotation_dao.create_sequence(clause_a_id, clause_b_id)
+        new_id: int = self.annotation_dao.create_sequence(clause_a_id, clause_b_id)
+        if (new_id == -1) or (self.llm_processor is None):
+            return new_id
+
+        sequence: Optional[ClauseSequence] = self.annotation_dao.get_sequence_by_id(new_id)
+        if sequence is not None:
+            new_row = DataFrame([DatastoreHandler.build_pre_llm_row(sequence)], columns=DatastoreHandler.PRE_LLM_FIELDS)
+            self._document.llm_delta_df = concat([self._document.llm_delta_df, new_row], ignore_index=True)
+            self._invalidate_llm_processor()
+
+        return new_id
 
     def delete_sequence(self, sequence_id: int):
         self.annotation_dao.delete_sequence(sequence_id)
+        if self.llm_processor is None:
+            return
+
+        id_field: str = DatastoreHandler.SEQ_ID_FIELD
+        llm_delta_df: DataFrame = self._document.llm_delta_df
+        self._document.llm_delta_df = llm_delta_df.loc[llm_delta_df[id_field] != sequence_id]
+        self._invalidate_llm_processor()
@@ -1,3 +1,6 @@
+from typing import Optional, Iterator
+
+from numpy import ndarray, arange, concatenate, lexsort, maximum, minimum, searchsorted, asarray, empty, ones
 from pandas import DataFrame
 
 CLAUSE_FIELD: str = "clause"
@@ -14,35 +17,104 @@ CLAUSE_PAIR_RANGE: int = 1
 
 
 class SequencingTool:
-    def __init__(self, clause_df: DataFrame):
+    """
+    Pairs each clause with each of the following clauses up to pair_range clauses later.
+    Pairs are built from shifted index arrays rather than row by row, and can be produced in chunks
+    so that wide pairing ranges over long texts do not need every pair in memory at once.
+    Pairs are ordered by the ranges of the first and then the second clause, and numbered from 1 in that order.
+    """
+    SEQUENCE_FIELDS: list[str] = [C1_START_FIELD, C1_END_FIELD, C2_START_FIELD, C2_END_FIELD, SEQUENCE_ID_FIELD]
+    # Default maximum number of pairs in each chunk produced by iter_sequence_chunks
+    CHUNK_SIZE: int = 1 << 20
+
+    def __init__(self, clause_df: DataFrame, pair_range: int = CLAUSE_PAIR_RANGE,
+                 max_char_distance: Optional[int] = None, turn_starts: Optional[ndarray] = None):
+        """
+        Parameters
+        ----------
+        clause_df: DataFrame - the clauses, in text order, with start and end index columns
+        pair_range: int - each clause is paired with the next pair_range clauses. Must be at least 1
+        max_char_distance: Optional[int] - if provided, clauses separated by more than this many characters
+        are not paired. Overlapping and adjacent clauses are separated by 0 characters
+        turn_starts: Optional[ndarray[int]] - if provided, the start index of each speaker turn in ascending order.
+        Clauses that start in different turns are not paired
+        """
+        if pair_range < 1:
+            raise ValueError(f"pair_range must be at least 1. Provided pair_range: {pair_range}")
         self.clause_df: DataFrame = clause_df
+        self.pair_range: int = pair_range
+        self.max_char_distance: Optional[int] = max_char_distance
 
-    def _generate_groupings(self, item_df: DataFrame, item_range: int) -> list[dict]:
-        groupings: list[dict] = []
-        for idx, item_a in item_df.iterrows():
-            idx: int
-            curr_seq_idx: int = int(idx)
-            for i in range(curr_seq_idx + 1, curr_seq_idx + item_range + 1):
-                try:
-                    item_b = item_df.iloc[i]
-                except IndexError:
-                    continue
-
-                grouping: dict = {
-                    C1_START_FIELD: int(item_a[START_FIELD]),
-                    C1_END_FIELD: int(item_a[END_FIELD]),
-                    C2_START_FIELD: int(item_b[START_FIELD]),
-                    C2_END_FIELD: int(item_b[END_FIELD]),
-                }
-                groupings.append(grouping)
-
-        return groupings
+        self._starts: ndarray = clause_df[START_FIELD].values.astype(int)
+        self._ends: ndarray = clause_df[END_FIELD].values.astype(int)
+        self._turns: Optional[ndarray] = None
+        if turn_starts is not None:
+            self._turns = searchsorted(asarray(turn_starts, dtype=int), self._starts, side='right')
+        # Clauses are processed in order of their range, so that chunks follow one another in pair order
+        self._clause_order: ndarray = lexsort((self._ends, self._starts))
 
-    def generate_initial_sequence_df(self) -> DataFrame:
-        sequences: list[dict] = self._generate_groupings(self.clause_df, CLAUSE_PAIR_RANGE)
-        sequences.sort(key=lambda s: (s[C1_START_FIELD], s[C1_END_FIELD], s[C2_START_FIELD], s[C2_END_FIELD]))
+    def _generate_groupings(self, first_clauses: ndarray) -> ndarray:
+        """
+        Returns every pair whose first clause is one of first_clauses, after pruning, as a row per pair holding
+        the first clause start and end then the second clause start and end, in pair order
+        """
+        clause_count: int = len(self._starts)
+        first_indexes: list[ndarray] = []
+        second_indexes: list[ndarray] = []
+        for offset in range(1, self.pair_range + 1):
+            item_a: ndarray = first_clauses[first_clauses + offset < clause_count]
+            if len(item_a) == 0:
+                break
+            first_indexes.append(item_a)
+            second_indexes.append(item_a + offset)
+        if len(first_indexes) == 0:
+            return empty((0, 4), dtype=int)
+
+        item_a = concatenate(first_indexes)
+        item_b: ndarray = concatenate(second_indexes)
+        keep: ndarray = ones(len(item_a), dtype=bool)
+        if self.max_char_distance is not None:
+            char_distance: ndarray = (maximum(self._starts[item_a], self._starts[item_b]) -
+                                      minimum(self._ends[item_a], self._ends[item_b]))
+            keep &= char_distance <= self.max_char_distance
+        if self._turns is not None:
+            keep &= self._turns[item_a] == self._turns[item_b]
+        item_a = item_a[keep]
+        item_b = item_b[keep]
+
+        pairs: ndarray = concatenate([self._starts[item_a, None], self._ends[item_a, None],
+                                      self._starts[item_b, None], self._ends[item_b, None]], axis=1)
+        pair_order: ndarray = lexsort((pairs[:, 3], pairs[:, 2], pairs[:, 1], pairs[:, 0]))
 
-        for seq_idx, seq in enumerate(sequences):
-            seq[SEQUENCE_ID_FIELD] = seq_idx + 1
+        return pairs[pair_order]
 
-        return DataFrame(sequences, dtype=int)
+    @staticmethod
+    def _to_sequence_df(pairs: ndarray, first_sequence_id: int) -> DataFrame:
+        sequence_df = DataFrame(pairs, columns=SequencingTool.SEQUENCE_FIELDS[:4], dtype=int)
+        sequence_df[SEQUENCE_ID_FIELD] = arange(first_sequence_id, first_sequence_id + len(pairs), dtype=int)
+
+        return sequence_df
+
+    def iter_sequence_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[DataFrame]:
+        """
+        Produces the sequences in consecutive chunks, in the same order and with the same ids as
+        generate_initial_sequence_df. Each chunk holds the pairs of a run of first clauses, and at most chunk_size pairs
+
+        Parameters
+        ----------
+        chunk_size: int - the maximum number of pairs in each chunk
+        Returns
+        -------
+        Iterator[DataFrame] - the sequences, with the same columns as generate_initial_sequence_df
+        """
+        clauses_per_chunk: int = max(chunk_size // self.pair_range, 1)
+        next_sequence_id: int = 1
+        for chunk_start in range(0, len(self._clause_order), clauses_per_chunk):
+            pairs: ndarray = self._generate_groupings(self._clause_order[chunk_start:chunk_start + clauses_per_chunk])
+            if len(pairs) == 0:
+                continue
+            yield SequencingTool._to_sequence_df(pairs, next_sequence_id)
+            next_sequence_id += len(pairs)
+
+    def generate_initial_sequence_df(self) -> DataFrame:
+        return SequencingTool._to_sequence_df(self._generate_groupings(self._clause_order), 1)
@@ -1,5 +1,7 @@
 from io import BytesIO
+from typing import Optional
 
+from numpy import ndarray, array, cumsum
 from pandas import DataFrame
 
 import spacy
@@ -18,8 +20,12 @@ class SourceFileClauser:
 
     def __init__(self, source_file: BytesIO, filetype: str):
         self.source_text: str
+        # The start index of each speaker turn. Only known for docx files, where each table row is a turn
+        self.turn_starts: Optional[ndarray] = None
         if filetype == "docx":
-            self.source_text = SourceFileClauser.read_docx(source_file)
+            turns: list[str] = SourceFileClauser.read_docx_turns(source_file)
+            self.source_text = "".join(turns)
+            self.turn_starts = cumsum(array([0] + [len(turn) for turn in turns[:-1]], dtype=int))
         elif filetype == "txt":
             self.source_text = SourceFileClauser.read_txt(source_file)
         else:
@@ -30,14 +36,24 @@ class SourceFileClauser:
     def get_text(self) -> str:
         return self.source_text
 
+    def get_turn_starts(self) -> Optional[ndarray]:
+        return self.turn_starts
+
     @staticmethod
     def read_docx(docx_file: BytesIO) -> str:
+        return "".join(SourceFileClauser.read_docx_turns(docx_file))
+
+    @staticmethod
+    def read_docx_turns(docx_file: BytesIO) -> list[str]:
+        """
+        Reads the text of each row of the content column of the first table, each followed by a line break
+        """
         docx_file.seek(0)
         try:
             doc = Document(docx_file)
         except Exception:
             raise ValueError("Loaded file type or file format is incorrect")
-        doc_text: str = ""
+        turns: list[str] = []
 
         if len(doc.tables) == 0:
             raise ValueError("No table found within the loaded document")
@@ -54,9 +70,9 @@ class SourceFileClauser:
 
         for row in text_table.rows[1:]:
             cell = row.cells[content_col]
-            doc_text += f"{cell.text} \n"
+            turns.append(f"{cell.text} \n")
 
-        return doc_text
+        return turns
 
     @staticmethod
     def read_txt(txt_file: BytesIO) -> str:
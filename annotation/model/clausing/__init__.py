@@ -1 +1,13 @@
+import os
+from typing import Optional
+
+from .SequencingTool import SequencingTool, CLAUSE_PAIR_RANGE
 from .SourceFileClauser import SourceFileClauser
+
+# Each clause of a loaded source file is paired with this many following clauses
+clause_pair_range: int = int(os.environ.get("ANNOTATION_CLAUSE_PAIR_RANGE", CLAUSE_PAIR_RANGE))
+# If set, clauses separated by more than this many characters are not paired
+_max_char_distance: Optional[str] = os.environ.get("ANNOTATION_CLAUSE_MAX_CHAR_DISTANCE")
+clause_max_char_distance: Optional[int] = int(_max_char_distance) if _max_char_distance else None
+# If set to 'true', clauses in different speaker turns are not paired. Turns are only known for docx source files
+pair_within_turns: bool = os.environ.get("ANNOTATION_PAIR_WITHIN_TURNS", "false").lower() == "true"
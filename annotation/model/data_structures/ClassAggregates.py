@@ -0,0 +1,173 @@
+from typing import Optional
+
+from numpy import ndarray, asarray, zeros, ones, where, maximum, concatenate, flatnonzero
+
+from annotation.model.data_structures.Classification import Classification
+from annotation.model.data_structures.ClassificationMask import ClassificationMask
+
+
+class ClassAggregates:
+    """
+    Maintains the plotted classes of every sequence, along with the number of sequences per Classification and the
+    position and weight of each sequence, so that plots are drawn without rescanning the datastores.
+    The plotted classes of a sequence are its corrected classes where present, otherwise its predicted classes.
+    A sequence with neither is plotted as NA.
+    Each sequence occupies a slot, and slots are kept in ascending order of sequence id. Adding, updating and removing
+    a single sequence is O(1): removed slots are only marked as such, and are compacted once they make up half the
+    slots.
+    """
+    INITIAL_CAPACITY: int = 1024
+
+    def __init__(self):
+        self._class_counts: ndarray = zeros(len(ClassificationMask.CLASSES), dtype=int)
+        # Maps the id of each sequence to its slot
+        self._slots: dict[int, int] = {}
+        self._slot_count: int = 0
+        self._sequence_ids: ndarray = zeros(ClassAggregates.INITIAL_CAPACITY, dtype=int)
+        self._positions: ndarray = zeros(ClassAggregates.INITIAL_CAPACITY, dtype=int)
+        self._predicted_masks: ndarray = zeros(ClassAggregates.INITIAL_CAPACITY, dtype=int)
+        self._corrected_masks: ndarray = zeros(ClassAggregates.INITIAL_CAPACITY, dtype=int)
+        self._plot_masks: ndarray = zeros(ClassAggregates.INITIAL_CAPACITY, dtype=int)
+        self._live: ndarray = zeros(ClassAggregates.INITIAL_CAPACITY, dtype=bool)
+
+    @staticmethod
+    def get_plot_masks(predicted_masks: ndarray, corrected_masks: ndarray) -> ndarray:
+        """
+        Returns the ClassificationMask plotted for each sequence: the corrected classes where present, otherwise
+        the predicted classes, and NA where neither are present
+        """
+        plot_masks: ndarray = where(corrected_masks != ClassificationMask.EMPTY_MASK, corrected_masks, predicted_masks)
+        return where(plot_masks == ClassificationMask.EMPTY_MASK,
+                     ClassificationMask.get_bit(Classification.NA), plot_masks)
+
+    @staticmethod
+    def get_sequence_positions(clause_ranges: ndarray) -> ndarray:
+        """
+        Returns the position of each sequence in the text: the mean of the start and end indexes of its clauses
+
+        Parameters
+        ----------
+        clause_ranges: ndarray[int] - a row per sequence holding the first clause start and end,
+        then the second clause start and end
+        """
+        return asarray(clause_ranges, dtype=int).reshape(-1, 4).sum(axis=1) // 4
+
+    def rebuild(self, sequence_ids: ndarray, clause_ranges: ndarray,
+                predicted_masks: ndarray, corrected_masks: ndarray):
+        """
+        Replaces the aggregates with those of the given sequences
+
+        Parameters
+        ----------
+        sequence_ids: ndarray[int] - the ids of the sequences, in ascending order
+        clause_ranges: ndarray[int] - a row per sequence holding the first clause start and end,
+        then the second clause start and end
+        predicted_masks: ndarray[int] - the predicted classes ClassificationMask of each sequence
+        corrected_masks: ndarray[int] - the corrected classes ClassificationMask of each sequence
+        """
+        sequence_ids = asarray(sequence_ids, dtype=int)
+        self._slot_count = len(sequence_ids)
+        self._sequence_ids = sequence_ids.copy()
+        self._positions = ClassAggregates.get_sequence_positions(clause_ranges)
+        self._predicted_masks = asarray(predicted_masks, dtype=int).copy()
+        self._corrected_masks = asarray(corrected_masks, dtype=int).copy()
+        self._plot_masks = ClassAggregates.get_plot_masks(self._predicted_masks, self._corrected_masks)
+        self._live = ones(self._slot_count, dtype=bool)
+        self._slots = {int(sequence_id): slot for slot, sequence_id in enumerate(sequence_ids.tolist())}
+        self._class_counts = ClassificationMask.to_class_matrix(self._plot_masks).sum(axis=0).astype(int)
+
+    def _grow(self):
+        padding: int = max(self._slot_count, ClassAggregates.INITIAL_CAPACITY)
+        self._sequence_ids = concatenate([self._sequence_ids, zeros(padding, dtype=int)])
+        self._positions = concatenate([self._positions, zeros(padding, dtype=int)])
+        self._predicted_masks = concatenate([self._predicted_masks, zeros(padding, dtype=int)])
+        self._corrected_masks = concatenate([self._corrected_masks, zeros(padding, dtype=int)])
+        self._plot_masks = concatenate([self._plot_masks, zeros(padding, dtype=int)])
+        self._live = concatenate([self._live, zeros(padding, dtype=bool)])
+
+    def _compact(self):
+        live_slots: ndarray = flatnonzero(self._live[:self._slot_count])
+        self._slot_count = len(live_slots)
+        self._sequence_ids = self._sequence_ids[live_slots]
+        self._positions = self._positions[live_slots]
+        self._predicted_masks = self._predicted_masks[live_slots]
+        self._corrected_masks = self._corrected_masks[live_slots]
+        self._plot_masks = self._plot_masks[live_slots]
+        self._live = ones(self._slot_count, dtype=bool)
+        self._slots = {int(sequence_id): slot for slot, sequence_id in enumerate(self._sequence_ids.tolist())}
+
+    def _set_plot_mask(self, slot: int):
+        plot_mask: int = int(ClassAggregates.get_plot_masks(self._predicted_masks[slot:slot + 1],
+                                                             self._corrected_masks[slot:slot + 1])[0])
+        self._class_counts += ClassificationMask.to_class_matrix([plot_mask])[0]
+        self._plot_masks[slot] = plot_mask
+
+    def add(self, sequence_id: int, clause_ranges: tuple[int, int, int, int],
+            predicted_mask: int, corrected_mask: int):
+        """
+        Adds a sequence. The sequence id must be greater than the id of every sequence already added
+        """
+        if self._slot_count == len(self._live):
+            self._grow()
+        slot: int = self._slot_count
+        self._slot_count += 1
+        self._slots[int(sequence_id)] = slot
+        self._sequence_ids[slot] = sequence_id
+        self._positions[slot] = sum(clause_ranges) // 4
+        self._predicted_masks[slot] = predicted_mask
+        self._corrected_masks[slot] = corrected_mask
+        self._live[slot] = True
+        self._set_plot_mask(slot)
+
+    def update(self, sequence_id: int, predicted_mask: Optional[int] = None, corrected_mask: Optional[int] = None):
+        """
+        Updates the classes of a sequence. Classes given as None are left unchanged.
+        Does nothing if the sequence has not been added
+        """
+        slot: Optional[int] = self._slots.get(int(sequence_id))
+        if slot is None:
+            return
+        self._class_counts -= ClassificationMask.to_class_matrix([int(self._plot_masks[slot])])[0]
+        if predicted_mask is not None:
+            self._predicted_masks[slot] = predicted_mask
+        if corrected_mask is not None:
+            self._corrected_masks[slot] = corrected_mask
+        self._set_plot_mask(slot)
+
+    def remove(self, sequence_id: int):
+        """
+        Removes a sequence. Does nothing if the sequence has not been added
+        """
+        slot: Optional[int] = self._slots.pop(int(sequence_id), None)
+        if slot is None:
+            return
+        self._class_counts -= ClassificationMask.to_class_matrix([int(self._plot_masks[slot])])[0]
+        self._live[slot] = False
+
+        if len(self._slots) < (self._slot_count // 2):
+            self._compact()
+
+    def get_class_counts(self) -> ndarray:
+        """
+        Returns the number of sequences plotted with each Classification, in definition order
+        """
+        return self._class_counts.copy()
+
+    def get_positions(self) -> ndarray:
+        """
+        Returns the position of each sequence, in ascending order of sequence id
+        """
+        return self._positions[:self._slot_count][self._live[:self._slot_count]]
+
+    def get_plot_masks_in_order(self) -> ndarray:
+        """
+        Returns the plotted ClassificationMask of each sequence, in ascending order of sequence id
+        """
+        return self._plot_masks[:self._slot_count][self._live[:self._slot_count]]
+
+    def get_weights(self) -> ndarray:
+        """
+        Returns the weight of each sequence, in ascending order of sequence id: the sum of its plotted Classification
+        values, with negative sums counted as 0
+        """
+        return maximum(ClassificationMask.to_value_sums(self.get_plot_masks_in_order()), 0)
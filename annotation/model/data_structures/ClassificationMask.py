@@ -0,0 +1,139 @@
+from typing import Optional, Iterable
+
+from numpy import ndarray, asarray, arange, empty, zeros
+from pandas import DataFrame, Series
+
+from annotation.model.data_structures.Classification import Classification
+
+
+class ClassificationMask:
+    """
+    Encodes a set of Classifications as an integer bitmask, where each Classification sets one bit, in the order
+    the Classifications are defined. A mask of 0 is the empty set.
+    Conversions of arrays of masks use lookup tables covering every possible mask, so they do not loop per row.
+    """
+    CLASSES: tuple[Classification, ...] = tuple(Classification)
+    MASK_COUNT: int = 1 << len(CLASSES)
+    EMPTY_MASK: int = 0
+    VALUE_DELIMITER: str = ','
+    EMPTY_NAME: str = '-'
+
+    # Lookup tables indexed by mask, filled by _build_lookup_tables
+    _classifications: list[Optional[list[Classification]]] = []
+    _value_strings: ndarray = empty(0, dtype=object)
+    _name_strings: ndarray = empty(0, dtype=object)
+    _value_sums: ndarray = empty(0, dtype=int)
+
+    @staticmethod
+    def _build_lookup_tables():
+        classes: tuple[Classification, ...] = ClassificationMask.CLASSES
+        ClassificationMask._classifications = [None]
+        ClassificationMask._value_strings = empty(ClassificationMask.MASK_COUNT, dtype=object)
+        ClassificationMask._name_strings = empty(ClassificationMask.MASK_COUNT, dtype=object)
+        ClassificationMask._value_sums = zeros(ClassificationMask.MASK_COUNT, dtype=int)
+
+        ClassificationMask._value_strings[0] = ''
+        ClassificationMask._name_strings[0] = ClassificationMask.EMPTY_NAME
+        for mask in range(1, ClassificationMask.MASK_COUNT):
+            mask_classes: list[Classification] = [c for bit, c in enumerate(classes) if (mask >> bit) & 1]
+            ClassificationMask._classifications.append(mask_classes)
+            ClassificationMask._value_strings[mask] = ClassificationMask.VALUE_DELIMITER.join(
+                [str(c.value) for c in mask_classes])
+            ClassificationMask._name_strings[mask] = ClassificationMask.VALUE_DELIMITER.join(
+                [c.name for c in mask_classes])
+            ClassificationMask._value_sums[mask] = sum([c.value for c in mask_classes])
+
+    @staticmethod
+    def get_bit(classification: Classification) -> int:
+        return 1 << ClassificationMask.CLASSES.index(classification)
+
+    @staticmethod
+    def from_values(values: Iterable[int]) -> int:
+        """
+        Parameters
+        ----------
+        values: Iterable[int] - Classification values. Values that are not a Classification are ignored
+
+        Returns
+        -------
+        int - the mask of the Classifications with the given values
+        """
+        mask: int = ClassificationMask.EMPTY_MASK
+        for value in values:
+            try:
+                mask |= ClassificationMask.get_bit(Classification(value))
+            except ValueError:
+                continue
+        return mask
+
+    @staticmethod
+    def to_classifications(mask: int) -> Optional[list[Classification]]:
+        """
+        Returns the Classifications set in the mask, in definition order, or None if the mask is empty
+        """
+        classifications: Optional[list[Classification]] = ClassificationMask._classifications[int(mask)]
+        if classifications is None:
+            return None
+        return list(classifications)
+
+    @staticmethod
+    def from_value_strings(value_strings: ndarray | Series | list) -> ndarray:
+        """
+        Parameters
+        ----------
+        value_strings: ndarray[str] - Classification values as delimited digits, e.g. '1,2,3'.
+        Missing entries and values that are not a Classification are ignored
+
+        Returns
+        -------
+        ndarray[int] - the mask of each entry
+        """
+        value_strings = Series(asarray(value_strings, dtype=object)).fillna('').astype(str).str.replace(' ', '')
+        class_columns: DataFrame = value_strings.str.get_dummies(sep=ClassificationMask.VALUE_DELIMITER)
+
+        masks: ndarray = zeros(len(value_strings), dtype=int)
+        for bit, classification in enumerate(ClassificationMask.CLASSES):
+            value: str = str(classification.value)
+            if value in class_columns.columns:
+                masks |= class_columns[value].values.astype(int) << bit
+        return masks
+
+    @staticmethod
+    def to_value_strings(masks: ndarray | list[int]) -> ndarray:
+        """
+        Returns the Classification values of each mask as delimited digits, e.g. '1,2,3'. Empty masks give ''
+        """
+        return ClassificationMask._value_strings[asarray(masks, dtype=int)]
+
+    @staticmethod
+    def to_name_strings(masks: ndarray | list[int]) -> ndarray:
+        """
+        Returns the Classification names of each mask as delimited names, e.g. 'INC,COH'. Empty masks give '-'
+        """
+        return ClassificationMask._name_strings[asarray(masks, dtype=int)]
+
+    @staticmethod
+    def to_value_sums(masks: ndarray | list[int]) -> ndarray:
+        """
+        Returns the sum of the Classification values of each mask. Empty masks give 0
+        """
+        return ClassificationMask._value_sums[asarray(masks, dtype=int)]
+
+    @staticmethod
+    def to_class_matrix(masks: ndarray | list[int]) -> ndarray:
+        """
+        Returns a boolean matrix with a row per mask and a column per Classification, in definition order,
+        which is True where the Classification is set in the mask
+        """
+        masks = asarray(masks, dtype=int)
+        return ((masks[:, None] >> arange(len(ClassificationMask.CLASSES))) & 1).astype(bool)
+
+    @staticmethod
+    def contains(masks: ndarray | list[int], classification: Classification) -> ndarray:
+        """
+        Returns True for each mask in which the given Classification is set
+        """
+        return (asarray(masks, dtype=int) & ClassificationMask.get_bit(classification)) != 0
+
+
+ClassificationMask._build_lookup_tables()
@@ -0,0 +1,56 @@
+from typing import Optional
+
+from annotation.model.data_structures import TextRangeTuple, ClauseSequence
+
+
+class SequenceView:
+    """
+    A snapshot of everything displayed about the sequence at one position, read from the datastores in a single call.
+    If no sequence is at the position, the sequence fields are empty
+    """
+
+    def __init__(self, position: int, sequence_count: int, sequence: Optional[ClauseSequence] = None):
+        """
+        Parameters
+        ----------
+        position: int - the 1-based position of the sequence
+        sequence_count: int - the number of sequences in the datastore
+        sequence: Optional[ClauseSequence] - the sequence at the position, or None if there is no such sequence
+        """
+        self.position: int = position
+        self.sequence_count: int = sequence_count
+        self.sequence_id: Optional[int] = None
+        self.clause_a_range: Optional[TextRangeTuple] = None
+        self.clause_b_range: Optional[TextRangeTuple] = None
+        self.overlap_range: Optional[TextRangeTuple] = None
+        self.linkage_words: Optional[list[str]] = None
+        self.predicted_classes: list[str] = []
+        self.correct_classes: list[str] = []
+        self.reasoning: str = ''
+
+        if sequence is None:
+            return
+
+        self.sequence_id = sequence.get_id()
+        self.clause_a_range, self.clause_b_range = sequence.get_clause_ranges()
+        self.overlap_range = SequenceView.get_overlap_range(self.clause_a_range, self.clause_b_range)
+        self.linkage_words = list(sequence.get_linkage_words())
+        if sequence.get_predicted_classes() is not None:
+            self.predicted_classes = [c.name for c in sequence.get_predicted_classes()]
+        if sequence.get_correct_classes() is not None:
+            self.correct_classes = [c.name for c in sequence.get_correct_classes()]
+        self.reasoning = sequence.get_reasoning()
+
+    @staticmethod
+    def get_overlap_range(clause_a_range: TextRangeTuple, clause_b_range: TextRangeTuple) -> Optional[TextRangeTuple]:
+        overlap_start: int = max(clause_a_range[0], clause_b_range[0])
+        overlap_end: int = min(clause_a_range[1], clause_b_range[1])
+        if overlap_start < overlap_end:
+            return overlap_start, overlap_end
+
+        return None
+
+    def get_clause_ranges(self) -> Optional[tuple[TextRangeTuple, TextRangeTuple]]:
+        if self.sequence_id is None:
+            return None
+        return self.clause_a_range, self.clause_b_range
@@ -3,3 +3,6 @@ from .TextRange import TextRange
 from .TextRange import TextRangeTuple
 from .ClauseSequence import ClauseSequence
 from .ClauseSequence import SequenceTuple
+from .ClassificationMask import ClassificationMask
+from .SequenceView import SequenceView
+from .ClassAggregates import ClassAggregates
@@ -1,35 +1,83 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 
-import pandas as pd
-from numpy import ndarray
+from numpy import ndarray, full, argsort, searchsorted, stack, empty
 
 from annotation.model.data_structures import TextRange, ClauseSequence
-from annotation.model.data_structures.Classification import Classification
-from annotation.model.database.repositories import TextTXTRepository, TextRangeCSVRepository, SequenceCSVRepository
+from annotation.model.data_structures import ClassificationMask, ClassAggregates
+from annotation.model.database.repositories import (TextTXTRepository, TextRangeCSVRepository, SequenceCSVRepository,
+                                                    TextRangeSQLiteRepository, SequenceSQLiteRepository)
 
 
 class AnnotationDAO:
-    def __init__(self, text_database_fn: Path, clause_database_fn: Path, sequence_database_fn: Path):
+    CSV_BACKEND: str = "csv"
+    SQLITE_BACKEND: str = "sqlite"
+    SQLITE_SUFFIX: str = ".db"
+    # Maximum number of ClauseSequence objects held in the sequence cache
+    SEQUENCE_CACHE_SIZE: int = 256
+    # Maximum number of deleted sequence ids held in the ordinal index before they are removed from it
+    MAX_DELETED_SEQUENCE_IDS: int = 1024
+
+    def __init__(self, text_database_fn: Path, clause_database_fn: Path, sequence_database_fn: Path,
+                 datastore_backend: str = CSV_BACKEND):
+        """
+        Parameters
+        ----------
+        text_database_fn: Path - the path of the reference text file
+        clause_database_fn: Path - the path of the clause datastore
+        sequence_database_fn: Path - the path of the sequence datastore
+        datastore_backend: str - either 'csv' or 'sqlite'. For 'sqlite', the clause and sequence datastore paths
+        are given a .db suffix
+        """
         self.text_repository: TextTXTRepository = TextTXTRepository(text_database_fn)
-        self.clause_repository: TextRangeCSVRepository = TextRangeCSVRepository(clause_database_fn)
-        self.sequence_repository: SequenceCSVRepository = SequenceCSVRepository(sequence_database_fn)
-
-    @staticmethod
-    def _split_to_int_list(sequence_data) -> list[int]:
-        if pd.isna(sequence_data):
-            return []
-        sequence_data = str(sequence_data)
-        if len(sequence_data) == 0:
-            return []
-
-        delimiter: str = SequenceCSVRepository.CLASS_LS_DELIMITER
-        return [int(x) for x in sequence_data.split(delimiter)]
-
-    @staticmethod
-    def _join_str_from_int_list(int_list: list[int]) -> str:
-        delimiter: str = SequenceCSVRepository.CLASS_LS_DELIMITER
-        return delimiter.join([str(x) for x in int_list])
+        self.clause_repository: TextRangeCSVRepository | TextRangeSQLiteRepository
+        self.sequence_repository: SequenceCSVRepository | SequenceSQLiteRepository
+        if datastore_backend == AnnotationDAO.CSV_BACKEND:
+            self.clause_repository = TextRangeCSVRepository(clause_database_fn)
+            self.sequence_repository = SequenceCSVRepository(sequence_database_fn)
+        elif datastore_backend == AnnotationDAO.SQLITE_BACKEND:
+            self.clause_repository = TextRangeSQLiteRepository(
+                clause_database_fn.with_suffix(AnnotationDAO.SQLITE_SUFFIX))
+            self.sequence_repository = SequenceSQLiteRepository(
+                sequence_database_fn.with_suffix(AnnotationDAO.SQLITE_SUFFIX))
+        else:
+            raise ValueError(f"{datastore_backend} is not a valid datastore backend")
+
+        # Ordinal index of the sequences: the ids of all sequences in ascending order.
+        # Sequence ids are stable and never reused, so the Nth sequence is found by position rather than by id
+        self._sequence_ids: list[int] = sorted([int(sequence_id) for sequence_id in
+                                                self.sequence_repository.read_all()[:, 0]])
+        # Ids of deleted sequences still held in _sequence_ids, in ascending order. Deleting from the middle of the
+        # ordinal index would shift every later id, so deleted ids are skipped until enough build up to remove at once
+        self._deleted_sequence_ids: list[int] = []
+
+        # Incremented on every change to the clauses or sequences, so callers can tell when derived data is stale
+        self._data_version: int = 0
+        # Least recently used cache of ClauseSequence objects by sequence id. Each entry holds the cache generation
+        # it was read in. Updates and deletes evict a single entry, while bulk changes increment the generation,
+        # which invalidates every entry without walking the cache
+        self._sequence_cache: OrderedDict[int, tuple[int, ClauseSequence]] = OrderedDict()
+        self._cache_generation: int = 0
+        # Class counts and weights of the sequences, built when first requested and then kept up to date by each
+        # single sequence change. Bulk changes discard them, and they are rebuilt when next requested
+        self._class_aggregates: Optional[ClassAggregates] = None
+
+    def get_data_version(self) -> int:
+        """
+        Returns a number that changes whenever the clauses or sequences change
+        """
+        return self._data_version
+
+    def _invalidate_sequence(self, sequence_id: int):
+        self._data_version += 1
+        self._sequence_cache.pop(sequence_id, None)
+
+    def _invalidate_all_sequences(self):
+        self._data_version += 1
+        self._cache_generation += 1
+        self._sequence_cache.clear()
 
     def write_text_file(self, text: str):
         self.text_repository.write_file(text)
@@ -37,15 +85,30 @@ class AnnotationDAO:
     def get_text(self) -> str:
         return self.text_repository.read_all()
 
+    def get_text_by_range(self, start: int, end: int) -> str:
+        return self.text_repository.read_by_range(start, end)
+
+    def get_text_end_index(self) -> int:
+        return self.text_repository.get_end_index()
+
     def create_clause(self, start: int, end: int) -> int:
+        self._data_version += 1
         return self.clause_repository.create(start, end)
 
+    def create_many_clauses(self, starts: ndarray, ends: ndarray) -> ndarray:
+        self._data_version += 1
+        return self.clause_repository.create_many(starts, ends)
+
     def get_all_clauses(self) -> list[TextRange]:
         clause_data: ndarray = self.clause_repository.read_all()
         clauses: list[TextRange] = [TextRange(data[1], data[2], range_id=data[0]) for data in clause_data]
 
         return clauses
 
+    def get_clauses_containing(self, index: int) -> list[TextRange]:
+        clause_data: ndarray = self.clause_repository.read_containing(index)
+        return [TextRange(data[1], data[2], range_id=data[0]) for data in clause_data]
+
     def get_all_clause_text(self) -> dict[int, str]:
         text: str = self.get_text()
         clauses: list[TextRange] = self.get_all_clauses()
@@ -58,16 +121,61 @@ class AnnotationDAO:
         return clause_str_dict
 
     def get_sequence_count(self) -> int:
-        sequence_data: ndarray = self.sequence_repository.read_all()
-        return sequence_data.shape[0]
+        return len(self._sequence_ids) - len(self._deleted_sequence_ids)
+
+    def get_sequence_id_at(self, position: int) -> Optional[int]:
+        """
+        Parameters
+        ----------
+        position: int - the 1-based position of the sequence, in ascending order of sequence id
+
+        Returns
+        -------
+        Optional[int] - the id of the sequence at the given position, or None if the position is out of range
+        """
+        if (position < 1) or (position > self.get_sequence_count()):
+            return None
+        if len(self._deleted_sequence_ids) == 0:
+            return self._sequence_ids[position - 1]
+
+        # Binary search for the first index with the given number of sequences that are not deleted up to it
+        low: int = position - 1
+        high: int = position - 1 + len(self._deleted_sequence_ids)
+        while low < high:
+            mid: int = (low + high) // 2
+            if mid + 1 - bisect_right(self._deleted_sequence_ids, self._sequence_ids[mid]) < position:
+                low = mid + 1
+            else:
+                high = mid
+        return self._sequence_ids[low]
+
+    def get_sequence_position(self, sequence_id: int) -> Optional[int]:
+        """
+        Parameters
+        ----------
+        sequence_id: int - the id of the sequence
+
+        Returns
+        -------
+        Optional[int] - the 1-based position of the sequence, in ascending order of sequence id,
+        or None if no sequence has the given id
+        """
+        index: int = bisect_left(self._sequence_ids, sequence_id)
+        if (index == len(self._sequence_ids)) or (self._sequence_ids[index] != sequence_id):
+            return None
+        deleted_ids: list[int] = self._deleted_sequence_ids
+        deleted_index: int = bisect_left(deleted_ids, sequence_id)
+        if (deleted_index < len(deleted_ids)) and (deleted_ids[deleted_index] == sequence_id):
+            return None
+        return index + 1 - deleted_index
 
     def _read_sequence_from_sequence_data(self, sequence_data: tuple[int]) -> ClauseSequence:
         sequence_id: int = sequence_data[0]
         clause_a_id: int = sequence_data[1]
         clause_b_id: int = sequence_data[2]
         linkage_words: str | float = sequence_data[3]
-        class_predict_ids: list[int] = AnnotationDAO._split_to_int_list(sequence_data[4])
-        class_correct_ids: list[int] = AnnotationDAO._split_to_int_list(sequence_data[5])
+        predicted_mask: int = int(sequence_data[4])
+        corrected_mask: int = int(sequence_data[5])
         reasoning: str = sequence_data[6]
 
         clause_a_data: tuple = self.clause_repository.read_by_id(clause_a_id)
@@ -84,33 +192,41 @@ class AnnotationDAO:
         if isinstance(linkage_words, str) and (len(linkage_words) > 0):
             linkage_words_list = linkage_words.split(SequenceCSVRepository.LINKAGE_LS_DELIMITER)
 
-        predicted_classes: Optional[list[Classification]] = []
-        for class_int in class_predict_ids:
-            try:
-                predicted_classes.append(Classification(class_int))
-            except ValueError:
-                continue
-        if len(predicted_classes) == 0:
-            predicted_classes = None
-
-        corrected_classes: Optional[list[Classification]] = []
-        for class_int in class_correct_ids:
-            try:
-                corrected_classes.append(Classification(class_int))
-            except ValueError:
-                continue
-        if len(corrected_classes) == 0:
-            corrected_classes = None
-
         return ClauseSequence(sequence_id, clause_a, clause_b, linkage_words_list,
-                              predicted_classes, corrected_classes, reasoning)
+                              ClassificationMask.to_classifications(predicted_mask),
+                              ClassificationMask.to_classifications(corrected_mask), reasoning)
+
+    def get_sequence_by_id(self, sequence_id: Optional[int]) -> Optional[ClauseSequence]:
+        """
+        Returns the sequence with the given id, or None if there is no such sequence.
+        The returned ClauseSequence is shared with the sequence cache, so it must not be modified
+        """
+        if sequence_id is None:
+            return None
+
+        cache_entry: Optional[tuple[int, ClauseSequence]] = self._sequence_cache.get(sequence_id)
+        if (cache_entry is not None) and (cache_entry[0] == self._cache_generation):
+            self._sequence_cache.move_to_end(sequence_id)
+            return cache_entry[1]
 
-    def get_sequence_by_id(self, sequence_id: int) -> Optional[ClauseSequence]:
         sequence_data: tuple = self.sequence_repository.read_by_id(sequence_id)
         if len(sequence_data) == 0:
             return None
 
-        return self._read_sequence_from_sequence_data(sequence_data)
+        sequence: ClauseSequence = self._read_sequence_from_sequence_data(sequence_data)
+        self._sequence_cache[sequence_id] = (self._cache_generation, sequence)
+        self._sequence_cache.move_to_end(sequence_id)
+        if len(self._sequence_cache) > AnnotationDAO.SEQUENCE_CACHE_SIZE:
+            self._sequence_cache.popitem(last=False)
+
+        return sequence
+
+    def get_sequence_id_by_clauses(self, clause_a_id: int, clause_b_id: int) -> Optional[int]:
+        return self.sequence_repository.read_id_by_clause_pair(clause_a_id, clause_b_id)
+
+    def get_sequences_by_clause_id(self, clause_id: int) -> list[ClauseSequence]:
+        sequence_data: ndarray = self.sequence_repository.read_by_clause_id(clause_id)
+        return [self._read_sequence_from_sequence_data(data) for data in sequence_data]
 
     def get_all_sequences(self) -> list[ClauseSequence]:
         sequence_data: ndarray = self.sequence_repository.read_all()
@@ -122,24 +238,173 @@ class AnnotationDAO:
 
         return list(sequence_map.values())
 
-    def update_sequence(self, sequence_id: int, linkage_words: str, predicted_classes: str,
-                        corrected_classes: str, reasoning: str) -> bool:
-        return self.sequence_repository.update(sequence_id, linkage_words, predicted_classes,
-                                               corrected_classes, reasoning)
+    def get_all_clause_data(self) -> ndarray:
+        """
+        Reads all clauses without building TextRange objects.
+        Returns
+        -------
+        ndarray - a row per clause holding the clause id, start and end
+        """
+        return self.clause_repository.read_all()
+
+    def get_all_sequence_data(self) -> ndarray:
+        """
+        Reads all sequences without building ClauseSequence objects.
+        Returns
+        -------
+        ndarray - a row per sequence, in the order of get_all_sequences, holding the sequence id, the first and
+        second clause ids, the linkage words, the predicted and corrected classes ClassificationMasks and the reasoning
+        """
+        return self.sequence_repository.read_all()
+
+    def get_all_sequence_class_masks(self) -> ndarray:
+        """
+        Reads the classes of all sequences without building ClauseSequence objects.
+        Returns
+        -------
+        ndarray[int] - a row per sequence, in the order of get_all_sequences, holding the sequence id,
+        the predicted classes ClassificationMask and the corrected classes ClassificationMask
+        """
+        sequence_data: ndarray = self.sequence_repository.read_all()
+        return sequence_data[:, [0, 4, 5]].astype(int)
+
+    def get_class_aggregates(self) -> ClassAggregates:
+        """
+        Returns the class counts and weights of all sequences. These are read from the datastores on the first
+        request after a bulk change, and are otherwise kept up to date as sequences change.
+        The returned ClassAggregates is shared, so it must not be modified
+        """
+        if self._class_aggregates is not None:
+            return self._class_aggregates
+
+        sequence_data: ndarray = self.sequence_repository.read_all()
+        clause_data: ndarray = self.clause_repository.read_all()
+        if len(sequence_data) == 0:
+            sequence_data = empty((0, 7), dtype=object)
+        if len(clause_data) == 0:
+            clause_data = empty((0, 3), dtype=int)
+
+        clause_ids: ndarray = clause_data[:, 0].astype(int)
+        clause_order: ndarray = argsort(clause_ids)
+        clause_ranges: ndarray = clause_data[clause_order, 1:3].astype(int)
+        sorted_clause_ids: ndarray = clause_ids[clause_order]
+        clause_a_rows: ndarray = searchsorted(sorted_clause_ids, sequence_data[:, 1].astype(int))
+        clause_b_rows: ndarray = searchsorted(sorted_clause_ids, sequence_data[:, 2].astype(int))
+        sequence_ranges: ndarray = stack([clause_ranges[clause_a_rows], clause_ranges[clause_b_rows]], axis=1)
+
+        self._class_aggregates = ClassAggregates()
+        self._class_aggregates.rebuild(sequence_data[:, 0].astype(int), sequence_ranges.reshape(-1, 4),
+                                       sequence_data[:, 4].astype(int), sequence_data[:, 5].astype(int))
+
+        return self._class_aggregates
+
+    def update_sequence(self, sequence_id: int, linkage_words: str, predicted_classes: int,
+                        corrected_classes: Optional[int], reasoning: str) -> bool:
+        self._invalidate_sequence(sequence_id)
+        updated: bool = self.sequence_repository.update(sequence_id, linkage_words, predicted_classes,
+                                                        corrected_classes, reasoning)
+        if updated and (self._class_aggregates is not None):
+            self._class_aggregates.update(sequence_id, predicted_classes, corrected_classes)
+
+        return updated
+
+    def update_many_sequences(self, sequence_ids: ndarray, linkage_words: Optional[ndarray] = None,
+                              predicted_classes: Optional[ndarray] = None, corrected_classes: Optional[ndarray] = None,
+                              reasoning: Optional[ndarray] = None) -> ndarray:
+        """
+        Updates many sequences in bulk. Attributes that are None are left unchanged.
+        Returns
+        -------
+        ndarray[bool] - for each provided sequence id, True if the sequence was updated, False if it was not found
+        """
+        updated: ndarray = self.sequence_repository.update_many(sequence_ids, linkage_words, predicted_classes,
+                                                                corrected_classes, reasoning)
+        self._invalidate_all_sequences()
+        self._class_aggregates = None
+
+        return updated
 
     def update_sequence_classifications(self, sequence_id: int, correct_classes: list[int]):
-        correct_classes_str: str = AnnotationDAO._join_str_from_int_list(correct_classes)
-        self.sequence_repository.update(sequence_id, corrected_classes=correct_classes_str)
+        self._invalidate_sequence(sequence_id)
+        corrected_mask: int = ClassificationMask.from_values(correct_classes)
+        updated: bool = self.sequence_repository.update(sequence_id, corrected_classes=corrected_mask)
+        if updated and (self._class_aggregates is not None):
+            self._class_aggregates.update(sequence_id, corrected_mask=corrected_mask)
 
     def create_sequence(self, clause_a_id: int, clause_b_id: int, linkage_words: str = "",
-                        predicted_classes: str = "0", correct_classes: str = "", reasoning: str = "") -> int:
-        return self.sequence_repository.create(clause_a_id, clause_b_id, linkage_words,
-                                               predicted_classes, correct_classes, reasoning)
+                        predicted_classes: int = ClassificationMask.EMPTY_MASK,
+                        correct_classes: int = ClassificationMask.EMPTY_MASK, reasoning: str = "") -> int:
+        new_id: int = self.sequence_repository.create(clause_a_id, clause_b_id, linkage_words,
+                                                      predicted_classes, correct_classes, reasoning)
+        # New ids are always greater than existing ids, so appending keeps the ordinal index sorted
+        if new_id != -1:
+            self._sequence_ids.append(int(new_id))
+            self._data_version += 1
+            if self._class_aggregates is not None:
+                clause_a_data: tuple = self.clause_repository.read_by_id(clause_a_id)
+                clause_b_data: tuple = self.clause_repository.read_by_id(clause_b_id)
+                self._class_aggregates.add(new_id, (int(clause_a_data[1]), int(clause_a_data[2]),
+                                                    int(clause_b_data[1]), int(clause_b_data[2])),
+                                           predicted_classes, correct_classes)
+
+        return new_id
+
+    def create_many_sequences(self, clause_a_ids: ndarray, clause_b_ids: ndarray,
+                              linkage_words: Optional[ndarray] = None, predicted_classes: Optional[ndarray] = None,
+                              correct_classes: Optional[ndarray] = None, reasoning: Optional[ndarray] = None) -> ndarray:
+        row_count: int = len(clause_a_ids)
+        if linkage_words is None:
+            linkage_words = full(row_count, "", dtype=object)
+        if predicted_classes is None:
+            predicted_classes = full(row_count, ClassificationMask.EMPTY_MASK, dtype=int)
+        if correct_classes is None:
+            correct_classes = full(row_count, ClassificationMask.EMPTY_MASK, dtype=int)
+        if reasoning is None:
+            reasoning = full(row_count, "", dtype=object)
+
+        new_ids: ndarray = self.sequence_repository.create_many(clause_a_ids, clause_b_ids, linkage_words,
+                                                                predicted_classes, correct_classes, reasoning)
+        self._sequence_ids.extend([int(new_id) for new_id in new_ids if new_id != -1])
+        self._invalidate_all_sequences()
+        self._class_aggregates = None
+
+        return new_ids
 
     def delete_sequence(self, sequence_id: int):
-        self.sequence_repository.delete(sequence_id)
+        if not self.sequence_repository.delete(sequence_id):
+            return
+        self._invalidate_sequence(sequence_id)
+        if self._class_aggregates is not None:
+            self._class_aggregates.remove(sequence_id)
+        if self.get_sequence_position(sequence_id) is None:
+            return
+        insort(self._deleted_sequence_ids, sequence_id)
+        if len(self._deleted_sequence_ids) > AnnotationDAO.MAX_DELETED_SEQUENCE_IDS:
+            deleted_ids: set[int] = set(self._deleted_sequence_ids)
+            self._sequence_ids = [existing_id for existing_id in self._sequence_ids if existing_id not in deleted_ids]
+            self._deleted_sequence_ids = []
+
+    def commit(self):
+        """
+        Writes any changes still held in the clause and sequence datastore caches
+        """
+        self.clause_repository.commit()
+        self.sequence_repository.commit()
+
+    def close(self):
+        """
+        Writes any changes still held in the datastore caches and closes the datastores.
+        The AnnotationDAO cannot be used once closed
+        """
+        self.clause_repository.close()
+        self.sequence_repository.close()
+        self.text_repository.close()
 
     def clear_all_data_stores(self):
         self.text_repository.clear_database()
         self.sequence_repository.clear_database()
         self.clause_repository.clear_database()
+        self._sequence_ids = []
+        self._deleted_sequence_ids = []
+        self._invalidate_all_sequences()
+        self._class_aggregates = None
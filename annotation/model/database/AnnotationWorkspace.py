@@ -0,0 +1,130 @@
+import re
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from annotation.model.database.AnnotationDAO import AnnotationDAO
+
+
+class AnnotationWorkspace:
+    """
+    Keeps a namespaced set of datastores for each document under a single data directory.
+    The datastores of a document are held in a subdirectory named after the document. The AnnotationDAO of each
+    open document is kept, so a document that is already open is returned without being reloaded.
+    Document names that map to the same directory name refer to the same document.
+    """
+    TEXT_FILENAME: str = "reference_text.txt"
+    CLAUSES_FILENAME: str = "clauses.csv"
+    SEQUENCES_FILENAME: str = "sequences.csv"
+    PRE_LLM_SEQUENCES_FILENAME: str = "pre_llm_sequences.csv"
+    LLM_DATA_STORE_DIRNAME: str = "llm_data_store"
+    SESSIONS_DIRNAME: str = "sessions"
+
+    def __init__(self, data_dir: Path, datastore_backend: str = AnnotationDAO.CSV_BACKEND):
+        """
+        Parameters
+        ----------
+        data_dir: Path - the directory holding the datastores of every document. Created if it does not exist
+        datastore_backend: str - either 'csv' or 'sqlite'. Passed to the AnnotationDAO of each document
+        """
+        self.data_dir: Path = data_dir
+        self.datastore_backend: str = datastore_backend
+        # The AnnotationDAO of each open document, by directory name
+        self._open_documents: dict[str, AnnotationDAO] = {}
+
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def for_session(data_dir: Path, session_id: str,
+                    datastore_backend: str = AnnotationDAO.CSV_BACKEND) -> 'AnnotationWorkspace':
+        """
+        Creates a workspace private to a single session, held in its own directory under the sessions directory
+        of the given data directory. Separate sessions therefore never share datastore files
+
+        Parameters
+        ----------
+        data_dir: Path - the shared data directory
+        session_id: str - the identifier of the session. Characters not safe in a directory name are replaced
+        datastore_backend: str - either 'csv' or 'sqlite'. Passed to the AnnotationDAO of each document
+        """
+        session_dir: Path = data_dir.joinpath(AnnotationWorkspace.SESSIONS_DIRNAME,
+                                              AnnotationWorkspace._to_dirname(session_id))
+        return AnnotationWorkspace(session_dir, datastore_backend)
+
+    @staticmethod
+    def _to_dirname(document_name: str) -> str:
+        # Characters that are not safe in a directory name are replaced, so a name cannot escape the data directory
+        dirname: str = re.sub(r'[^\w.\-]', '_', document_name.strip())
+        if dirname.strip('.') == '':
+            raise ValueError(f"{document_name} is not a valid document name")
+        return dirname
+
+    def get_document_dir(self, document_name: str) -> Path:
+        return self.data_dir.joinpath(AnnotationWorkspace._to_dirname(document_name))
+
+    def get_text_path(self, document_name: str) -> Path:
+        return self.get_document_dir(document_name).joinpath(AnnotationWorkspace.TEXT_FILENAME)
+
+    def get_pre_llm_sequence_path(self, document_name: str) -> Path:
+        return self.get_document_dir(document_name).joinpath(AnnotationWorkspace.PRE_LLM_SEQUENCES_FILENAME)
+
+    def get_llm_data_store_dir(self, document_name: str) -> Path:
+        llm_data_store_dir: Path = self.get_document_dir(document_name).joinpath(
+            AnnotationWorkspace.LLM_DATA_STORE_DIRNAME)
+        llm_data_store_dir.mkdir(parents=True, exist_ok=True)
+        return llm_data_store_dir
+
+    def open_document(self, document_name: str) -> AnnotationDAO:
+        """
+        Returns the AnnotationDAO of the named document, opening its datastores if the document is not yet open.
+        The datastores are created empty if the document has no datastores yet
+        """
+        dirname: str = AnnotationWorkspace._to_dirname(document_name)
+        annotation_dao: Optional[AnnotationDAO] = self._open_documents.get(dirname)
+        if annotation_dao is not None:
+            return annotation_dao
+
+        document_dir: Path = self.data_dir.joinpath(dirname)
+        annotation_dao = AnnotationDAO(document_dir.joinpath(AnnotationWorkspace.TEXT_FILENAME),
+                                       document_dir.joinpath(AnnotationWorkspace.CLAUSES_FILENAME),
+                                       document_dir.joinpath(AnnotationWorkspace.SEQUENCES_FILENAME),
+                                       self.datastore_backend)
+        self._open_documents[dirname] = annotation_dao
+
+        return annotation_dao
+
+    def close_document(self, document_name: str):
+        """
+        Writes any outstanding changes of the named document and closes its datastores.
+        Does nothing if the document is not open
+        """
+        annotation_dao: Optional[AnnotationDAO] = self._open_documents.pop(
+            AnnotationWorkspace._to_dirname(document_name), None)
+        if annotation_dao is not None:
+            annotation_dao.close()
+
+    def is_open(self, document_name: str) -> bool:
+        return AnnotationWorkspace._to_dirname(document_name) in self._open_documents
+
+    def commit(self):
+        """
+        Writes any outstanding changes of every open document
+        """
+        for annotation_dao in self._open_documents.values():
+            annotation_dao.commit()
+
+    def close(self):
+        """
+        Writes any outstanding changes of every open document and closes their datastores
+        """
+        for annotation_dao in self._open_documents.values():
+            annotation_dao.close()
+        self._open_documents.clear()
+
+    def delete(self):
+        """
+        Closes every open document and removes the data directory along with all datastores in it.
+        Intended for workspaces private to a session, once the session has ended
+        """
+        self.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
@@ -1,8 +1,10 @@
-from typing import Optional
+from typing import Optional, Callable, Iterator
 
-from pandas import DataFrame, Series
+from numpy import ndarray, stack, nonzero, array, empty
+from pandas import DataFrame, Series, isna
 
-from annotation.model.data_structures import ClauseSequence, Classification
+from annotation.model.data_structures import ClauseSequence, Classification, ClassificationMask, SequenceTuple
+from annotation.model.data_structures import ClassAggregates
 from annotation.model.database import AnnotationDAO
 
 
@@ -27,192 +29,313 @@ class DatastoreHandler:
                           PREDICTED_FIELD: str, CORRECTED_FIELD: str, REASONING_FIELD: str,
                           WINDOW_START_FIELD: int, WINDOW_END_FIELD: int}
     REQUIRED_FIELDS: list[str, ...] = [field for field in FIELD_DTYPES.keys()]
+    PRE_LLM_FIELDS: list[str, ...] = [SEQ_ID_FIELD, C1_START_FIELD, C1_END_FIELD, C2_START_FIELD, C2_END_FIELD]
+    EXPORT_FIELDS: list[str, ...] = [SEQ_ID_FIELD, C1_TEXT_FIELD, C1_START_FIELD, C1_END_FIELD,
+                                     C2_TEXT_FIELD, C2_START_FIELD, C2_END_FIELD, LINKAGE_FIELD,
+                                     PREDICTED_FIELD, PREDICTED_NAME_FIELD, CORRECTED_FIELD, CORRECTED_NAME_FIELD,
+                                     WINDOW_START_FIELD, WINDOW_END_FIELD, REASONING_FIELD]
+    # Default number of rows in each chunk produced by iter_export_dataframes
+    EXPORT_CHUNK_SIZE: int = 10000
+    # Columns of the sequence table that are not part of the export
+    C1_ID_FIELD: str = "c1_id"
+    C2_ID_FIELD: str = "c2_id"
 
     def __init__(self, annotation_dao: AnnotationDAO):
         self.annotation_dao: AnnotationDAO = annotation_dao
-
-    def _write_database_rows(self, row: Series):
-        c1_start: int = row[DatastoreHandler.C1_START_FIELD]
-        c1_end: int = row[DatastoreHandler.C1_END_FIELD]
-        c2_start: int = row[DatastoreHandler.C2_START_FIELD]
-        c2_end: int = row[DatastoreHandler.C2_END_FIELD]
-
-        c1_id: int = self.annotation_dao.create_clause(c1_start, c1_end)
-        c2_id: int = self.annotation_dao.create_clause(c2_start, c2_end)
-
-        try:
-            linkage_words: str | float = row[DatastoreHandler.LINKAGE_FIELD]
-            if type(linkage_words) is float:
-                linkage_words = ""
-            predicted_classes: str = row[DatastoreHandler.PREDICTED_FIELD]
-            correct_classes: str = row[DatastoreHandler.CORRECTED_FIELD]
-            reasoning: str = row[DatastoreHandler.REASONING_FIELD]
-
-            self.annotation_dao.create_sequence(c1_id, c2_id, linkage_words, predicted_classes,
-                                                correct_classes, reasoning)
-        except KeyError:
-            self.annotation_dao.create_sequence(c1_id, c2_id)
-
-    def _update_sequence_row(self, row: Series):
-        sequence_id: int = row[DatastoreHandler.SEQ_ID_FIELD]
-        linkage_words: str | float = row[DatastoreHandler.LINKAGE_FIELD]
-        if type(linkage_words) is float:
-            linkage_words = ""
-        predicted_classes: str = row[DatastoreHandler.PREDICTED_FIELD]
-        corrected_classes: str = row[DatastoreHandler.CORRECTED_FIELD]
-        reasoning: str = row[DatastoreHandler.REASONING_FIELD]
-
-        self.annotation_dao.update_sequence(sequence_id, linkage_words,
-                                            predicted_classes, corrected_classes, reasoning)
+        # The last DataFrame built for each plot, with the data version it was built at
+        self._dataframe_cache: dict[str, tuple[int, Optional[DataFrame]]] = {}
+
+    @staticmethod
+    def validate_sequence_df(master_sequence_df: DataFrame) -> DataFrame:
+        """
+        Checks master_sequence_df has every required field and that each field can be converted to its dtype.
+        Missing text values are read as empty strings
+
+        Returns
+        -------
+        DataFrame - the required fields of master_sequence_df, converted to their dtypes
+        """
+        missing_fields: list[str] = [field for field in DatastoreHandler.REQUIRED_FIELDS
+                                     if field not in master_sequence_df.columns]
+        if len(missing_fields) > 0:
+            raise ValueError(f"Missing required fields from sequence file: {', '.join(missing_fields)}")
+
+        type_df = DataFrame(index=master_sequence_df.index)
+        for field, dtype in DatastoreHandler.FIELD_DTYPES.items():
+            values: Series = master_sequence_df[field]
+            if dtype is str:
+                values = values.where(~isna(values), "")
+            try:
+                type_df[field] = values.astype(dtype)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Invalid value in {field} field of sequence file: {e}")
+
+        return type_df
 
     def build_text_datastore(self, text_file_content: str):
         self.annotation_dao.write_text_file(text_file_content)
 
     def build_clause_datastores(self, master_sequence_df: DataFrame):
-        master_sequence_df.apply(self._write_database_rows, axis=1)
-
-    def update_sequence_datastores(self, master_sequence_df: DataFrame):
-        type_df = master_sequence_df.astype(DatastoreHandler.FIELD_DTYPES)
-        type_df.apply(self._update_sequence_row, axis=1)
-
-    def update_pre_llm_sequence_file(self, pre_llm_sequence_path: str):
-        pre_llm_columns = [DatastoreHandler.SEQ_ID_FIELD,
-                           DatastoreHandler.C1_START_FIELD, DatastoreHandler.C1_END_FIELD,
-                           DatastoreHandler.C2_START_FIELD, DatastoreHandler.C2_END_FIELD]
-        pre_llm_data: list[dict] = []
+        """
+        Creates the clauses and sequences described by master_sequence_df in bulk.
+        Clause ranges are interleaved per row (first clause, then second clause) so that clause ids are
+        assigned in the same order as creating the rows one at a time.
+        """
+        if len(master_sequence_df) == 0:
+            return
+
+        c1_ranges: ndarray = master_sequence_df[[DatastoreHandler.C1_START_FIELD,
+                                                 DatastoreHandler.C1_END_FIELD]].values.astype(int)
+        c2_ranges: ndarray = master_sequence_df[[DatastoreHandler.C2_START_FIELD,
+                                                 DatastoreHandler.C2_END_FIELD]].values.astype(int)
+        interleaved_ranges: ndarray = stack([c1_ranges, c2_ranges], axis=1).reshape(-1, 2)
+
+        clause_ids: ndarray = self.annotation_dao.create_many_clauses(interleaved_ranges[:, 0], interleaved_ranges[:, 1])
+        c1_ids: ndarray = clause_ids[0::2]
+        c2_ids: ndarray = clause_ids[1::2]
+
+        sequence_fields = [DatastoreHandler.LINKAGE_FIELD, DatastoreHandler.PREDICTED_FIELD,
+                           DatastoreHandler.CORRECTED_FIELD, DatastoreHandler.REASONING_FIELD]
+        if all([field in master_sequence_df.columns for field in sequence_fields]):
+            linkage_words: ndarray = master_sequence_df[DatastoreHandler.LINKAGE_FIELD].fillna("").values
+            predicted_masks: ndarray = ClassificationMask.from_value_strings(
+                master_sequence_df[DatastoreHandler.PREDICTED_FIELD].values)
+            corrected_masks: ndarray = ClassificationMask.from_value_strings(
+                master_sequence_df[DatastoreHandler.CORRECTED_FIELD].values)
+            self.annotation_dao.create_many_sequences(c1_ids, c2_ids, linkage_words, predicted_masks, corrected_masks,
+                                                      master_sequence_df[DatastoreHandler.REASONING_FIELD].values)
+        else:
+            self.annotation_dao.create_many_sequences(c1_ids, c2_ids)
+
+    def update_sequence_datastores(self, master_sequence_df: DataFrame, preserve_corrected: bool = False):
+        """
+        Updates the stored sequences with the rows of master_sequence_df, matched by sequence id.
+        If preserve_corrected is True, the corrected classes already in the datastore are left untouched,
+        which allows LLM results for a subset of sequences to be merged without losing annotator work.
+        The rows are validated with validate_sequence_df and applied in a single bulk update.
+        """
+        type_df: DataFrame = DatastoreHandler.validate_sequence_df(master_sequence_df)
+        predicted_masks: ndarray = ClassificationMask.from_value_strings(
+            type_df[DatastoreHandler.PREDICTED_FIELD].values)
+        corrected_masks: Optional[ndarray] = None
+        if not preserve_corrected:
+            corrected_masks = ClassificationMask.from_value_strings(type_df[DatastoreHandler.CORRECTED_FIELD].values)
+
+        self.annotation_dao.update_many_sequences(type_df[DatastoreHandler.SEQ_ID_FIELD].values,
+                                                  type_df[DatastoreHandler.LINKAGE_FIELD].values,
+                                                  predicted_masks, corrected_masks,
+                                                  type_df[DatastoreHandler.REASONING_FIELD].values)
+
+    @staticmethod
+    def get_sequence_ranges(master_sequence_df: DataFrame) -> set[SequenceTuple]:
+        """
+        Returns the clause ranges of every row in master_sequence_df as a set of ((c1_start, c1_end), (c2_start, c2_end))
+        """
+        range_columns = [DatastoreHandler.C1_START_FIELD, DatastoreHandler.C1_END_FIELD,
+                         DatastoreHandler.C2_START_FIELD, DatastoreHandler.C2_END_FIELD]
+        range_data = master_sequence_df[range_columns].astype(int).values
+
+        return {((int(c1_start), int(c1_end)), (int(c2_start), int(c2_end)))
+                for c1_start, c1_end, c2_start, c2_end in range_data}
+
+    def get_llm_delta_sequence_ids(self, processed_ranges: set[SequenceTuple]) -> list[int]:
+        """
+        Returns the ids of the sequences that need to be (re)classified by the LLM.
+        A sequence needs processing if it has no predicted classes, or if its clause ranges are not
+        among the processed_ranges, i.e. the clauses changed since the prediction was made.
+        """
+        delta_ids: list[int] = []
 
         sequences: list[ClauseSequence] = self.annotation_dao.get_all_sequences()
         for sequence in sequences:
-            sequence_data: list = [sequence.get_id()]
-            sequence_data.extend(sequence.get_first_clause().get_range())
-            sequence_data.extend(sequence.get_second_clause().get_range())
+            predicted_classes: Optional[list[Classification]] = sequence.get_predicted_classes()
+            if (predicted_classes is None) or (sequence.get_clause_ranges() not in processed_ranges):
+                delta_ids.append(sequence.get_id())
 
-            sequence_dict: dict = {col: data for col, data in zip(pre_llm_columns, sequence_data)}
-            pre_llm_data.append(sequence_dict)
+        return delta_ids
 
-        pre_llm_df = DataFrame(pre_llm_data, columns=pre_llm_columns)
+    def update_pre_llm_sequence_file(self, pre_llm_sequence_path: str):
+        pre_llm_df = self.build_pre_llm_dataframe()
         pre_llm_df.to_csv(pre_llm_sequence_path, index=False, na_rep='')
 
-    def build_export_dataframe(self) -> DataFrame:
-        export_columns = [DatastoreHandler.SEQ_ID_FIELD, DatastoreHandler.C1_TEXT_FIELD,
-                          DatastoreHandler.C1_START_FIELD, DatastoreHandler.C1_END_FIELD,
-                          DatastoreHandler.C2_TEXT_FIELD, DatastoreHandler.C2_START_FIELD,
-                          DatastoreHandler.C2_END_FIELD, DatastoreHandler.LINKAGE_FIELD,
-                          DatastoreHandler.PREDICTED_FIELD, DatastoreHandler.PREDICTED_NAME_FIELD,
-                          DatastoreHandler.CORRECTED_FIELD, DatastoreHandler.CORRECTED_NAME_FIELD,
-                          DatastoreHandler.WINDOW_START_FIELD, DatastoreHandler.WINDOW_END_FIELD,
-                          DatastoreHandler.REASONING_FIELD]
-        export_data: list[dict] = []
-
-        clause_texts: dict[int, str] = self.annotation_dao.get_all_clause_text()
+    def build_pre_llm_dataframe(self) -> DataFrame:
+        pre_llm_columns = DatastoreHandler.PRE_LLM_FIELDS
+        pre_llm_data: list[dict] = []
+
         sequences: list[ClauseSequence] = self.annotation_dao.get_all_sequences()
         for sequence in sequences:
-            sequence_data: list = [sequence.get_id()]
-
-            clause_a_text: Optional[str] = clause_texts.get(sequence.get_first_clause().get_id())
-            clause_a_text = "" if clause_a_text is None else clause_a_text
-            sequence_data.append(clause_a_text)
-            sequence_data.extend(sequence.get_first_clause().get_range())
-
-            clause_b_text: Optional[str] = clause_texts.get(sequence.get_second_clause().get_id())
-            clause_b_text = "" if clause_b_text is None else clause_b_text
-            sequence_data.append(clause_b_text)
-            sequence_data.extend(sequence.get_second_clause().get_range())
+            pre_llm_data.append(DatastoreHandler.build_pre_llm_row(sequence))
+
+        return DataFrame(pre_llm_data, columns=pre_llm_columns)
+
+    @staticmethod
+    def build_pre_llm_row(sequence: ClauseSequence) -> dict:
+        sequence_data: list = [sequence.get_id()]
+        sequence_data.extend(sequence.get_first_clause().get_range())
+        sequence_data.extend(sequence.get_second_clause().get_range())
+
+        return {col: data for col, data in zip(DatastoreHandler.PRE_LLM_FIELDS, sequence_data)}
+
+    def _build_sequence_table(self) -> DataFrame:
+        """
+        Builds a DataFrame with a row per sequence, in the order of get_all_sequences, by joining the sequence table
+        with the clause table once for each clause of the sequence. The class columns hold ClassificationMasks
+        """
+        sequence_data: ndarray = self.annotation_dao.get_all_sequence_data()
+        clause_data: ndarray = self.annotation_dao.get_all_clause_data()
+        if len(sequence_data) == 0:
+            sequence_data = empty((0, 7), dtype=object)
+        if len(clause_data) == 0:
+            clause_data = empty((0, 3), dtype=int)
+
+        sequence_df = DataFrame({DatastoreHandler.SEQ_ID_FIELD: sequence_data[:, 0].astype(int),
+                                 DatastoreHandler.C1_ID_FIELD: sequence_data[:, 1].astype(int),
+                                 DatastoreHandler.C2_ID_FIELD: sequence_data[:, 2].astype(int),
+                                 DatastoreHandler.LINKAGE_FIELD: sequence_data[:, 3],
+                                 DatastoreHandler.PREDICTED_FIELD: sequence_data[:, 4].astype(int),
+                                 DatastoreHandler.CORRECTED_FIELD: sequence_data[:, 5].astype(int),
+                                 DatastoreHandler.REASONING_FIELD: sequence_data[:, 6]})
+        for clause_id_field, start_field, end_field in [
+                (DatastoreHandler.C1_ID_FIELD, DatastoreHandler.C1_START_FIELD, DatastoreHandler.C1_END_FIELD),
+                (DatastoreHandler.C2_ID_FIELD, DatastoreHandler.C2_START_FIELD, DatastoreHandler.C2_END_FIELD)]:
+            clause_df = DataFrame({clause_id_field: clause_data[:, 0].astype(int),
+                                   start_field: clause_data[:, 1].astype(int),
+                                   end_field: clause_data[:, 2].astype(int)})
+            sequence_df = sequence_df.merge(clause_df, how="left", on=clause_id_field, validate="many_to_one")
+
+            missing_clauses: Series = sequence_df[start_field].isna()
+            if missing_clauses.any():
+                missing_id: int = sequence_df.loc[missing_clauses, clause_id_field].iloc[0]
+                raise ValueError(f"Clause database does not contain a clause with id {missing_id}")
+
+        return sequence_df
+
+    def _build_export_chunk(self, df: DataFrame, text: str, text_start: int) -> DataFrame:
+        """
+        Converts rows of the sequence table into export rows
+
+        Parameters
+        ----------
+        df: DataFrame - rows of the sequence table. Modified in place
+        text: str - the part of the text containing every clause of the rows
+        text_start: int - the index of the start of the given text within the full text
+        """
+        for text_field, start_field, end_field in [
+                (DatastoreHandler.C1_TEXT_FIELD, DatastoreHandler.C1_START_FIELD, DatastoreHandler.C1_END_FIELD),
+                (DatastoreHandler.C2_TEXT_FIELD, DatastoreHandler.C2_START_FIELD, DatastoreHandler.C2_END_FIELD)]:
+            starts: list[int] = (df[start_field].values - text_start).tolist()
+            ends: list[int] = (df[end_field].values - text_start).tolist()
+            df[text_field] = array([text[start:end] for start, end in zip(starts, ends)], dtype=object)
+        df[DatastoreHandler.WINDOW_START_FIELD] = df[DatastoreHandler.C1_START_FIELD]
+        df[DatastoreHandler.WINDOW_END_FIELD] = df[DatastoreHandler.C2_END_FIELD]
+        for text_field in [DatastoreHandler.LINKAGE_FIELD, DatastoreHandler.REASONING_FIELD]:
+            df[text_field] = df[text_field].where(~isna(df[text_field]), "")
+
+        predicted_masks: ndarray = df[DatastoreHandler.PREDICTED_FIELD].values
+        corrected_masks: ndarray = df[DatastoreHandler.CORRECTED_FIELD].values
+        df[DatastoreHandler.PREDICTED_FIELD] = ClassificationMask.to_value_strings(predicted_masks)
+        df[DatastoreHandler.PREDICTED_NAME_FIELD] = ClassificationMask.to_name_strings(predicted_masks)
+        df[DatastoreHandler.CORRECTED_FIELD] = ClassificationMask.to_value_strings(corrected_masks)
+        df[DatastoreHandler.CORRECTED_NAME_FIELD] = ClassificationMask.to_name_strings(corrected_masks)
+
+        return df[DatastoreHandler.EXPORT_FIELDS].astype(DatastoreHandler.FIELD_DTYPES)
 
-            linkage_words: str = ",".join(sequence.get_linkage_words())
-            sequence_data.append(linkage_words)
-
-            predicted_classes: Optional[list[Classification]] = sequence.get_predicted_classes()
-            predicted_class_values: str = ''
-            predicted_class_names: str = '-'
-            if predicted_classes is not None:
-                predicted_class_values = ','.join([str(c.value) for c in predicted_classes])
-                predicted_class_names = ','.join([c.name for c in predicted_classes])
-            sequence_data.append(predicted_class_values)
-            sequence_data.append(predicted_class_names)
-
-            correct_classes: Optional[list[Classification]] = sequence.get_correct_classes()
-            corrected_class_values: str = ''
-            corrected_class_names: str = '-'
-            if correct_classes is not None:
-                corrected_class_values = ','.join([str(c.value) for c in correct_classes])
-                corrected_class_names = ','.join([c.name for c in correct_classes])
-            sequence_data.append(corrected_class_values)
-            sequence_data.append(corrected_class_names)
-
-            window_start: int = sequence.get_first_clause().get_range()[0]
-            window_end: int = sequence.get_second_clause().get_range()[1]
-            sequence_data.append(window_start)
-            sequence_data.append(window_end)
-
-            reasoning: str = sequence.get_reasoning()
-            sequence_data.append(reasoning)
-
-            sequence_dict: dict = {col: data for col, data in zip(export_columns, sequence_data)}
-            export_data.append(sequence_dict)
-
-        df = DataFrame(export_data, columns=export_columns)
-        return df.astype(DatastoreHandler.FIELD_DTYPES)
+    def build_export_dataframe(self) -> DataFrame:
+        return self._build_export_chunk(self._build_sequence_table(), self.annotation_dao.get_text(), 0)
+
+    def iter_export_dataframes(self, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[DataFrame]:
+        """
+        Produces the rows of build_export_dataframe in consecutive chunks. Only the text spanned by the clauses
+        of a chunk is read for that chunk, so neither the full export nor the full text is held in memory.
+        At least one chunk is produced, which is empty if there are no sequences
+
+        Parameters
+        ----------
+        chunk_size: int - the maximum number of rows in each chunk
+        """
+        sequence_df: DataFrame = self._build_sequence_table()
+        if len(sequence_df) == 0:
+            yield self._build_export_chunk(sequence_df, "", 0)
+            return
+
+        text_end_index: int = self.annotation_dao.get_text_end_index()
+        for chunk_start in range(0, len(sequence_df), chunk_size):
+            chunk_df: DataFrame = sequence_df.iloc[chunk_start:chunk_start + chunk_size].copy()
+            text_start: int = int(min(chunk_df[DatastoreHandler.C1_START_FIELD].min(),
+                                      chunk_df[DatastoreHandler.C2_START_FIELD].min()))
+            text_end: int = int(max(chunk_df[DatastoreHandler.C1_END_FIELD].max(),
+                                    chunk_df[DatastoreHandler.C2_END_FIELD].max()))
+            text_start = min(max(text_start, 0), text_end_index)
+            text: str = self.annotation_dao.get_text_by_range(text_start, min(max(text_end, text_start),
+                                                                              text_end_index))
+            yield self._build_export_chunk(chunk_df, text, text_start)
+
+    def _get_cached_dataframe(self, name: str, build_fn: Callable) -> Optional[DataFrame]:
+        """
+        Returns the DataFrame built by build_fn, building it only if the data has changed since it was last built.
+        The cached DataFrame is shared between callers, so it must not be modified
+        """
+        data_version: int = self.annotation_dao.get_data_version()
+        cache_entry: Optional[tuple[int, Optional[DataFrame]]] = self._dataframe_cache.get(name)
+        if (cache_entry is not None) and (cache_entry[0] == data_version):
+            return cache_entry[1]
+
+        df: Optional[DataFrame] = build_fn()
+        self._dataframe_cache[name] = (data_version, df)
+
+        return df
 
     def build_plot_dataframe(self) -> Optional[DataFrame]:
+        return self._get_cached_dataframe("classification", self._build_plot_dataframe)
+
+    def _build_plot_dataframe(self) -> Optional[DataFrame]:
         sequence_position_field: str = "sequence_position"
         classification_field: str = "classification"
         plot_columns = [sequence_position_field, classification_field]
-        plot_data: list[dict] = []
-        default_class_name: str = 'NA'
 
-        sequences: list[ClauseSequence] = self.annotation_dao.get_all_sequences()
-        if len(sequences) == 0:
+        class_aggregates: ClassAggregates = self.annotation_dao.get_class_aggregates()
+        plot_masks: ndarray = class_aggregates.get_plot_masks_in_order()
+        if len(plot_masks) == 0:
             return None
-        for sequence in sequences:
-            clause_a_range, clause_b_range = sequence.get_clause_ranges()
-            sequence_position: int = (sum(clause_a_range) + sum(clause_b_range)) // 4
-
-            predicted_classes: Optional[list[Classification]] = sequence.get_predicted_classes()
-            correct_classes: Optional[list[Classification]] = sequence.get_correct_classes()
+        sequence_positions: ndarray = class_aggregates.get_positions()
 
-            class_names: list[str]
-            if (correct_classes is not None) and (len(correct_classes) > 0):
-                class_names = [c.name for c in correct_classes]
-            elif (predicted_classes is not None) and (len(predicted_classes) > 0):
-                class_names = [c.name for c in predicted_classes]
-            else:
-                class_names = [default_class_name]
-            for class_name in class_names:
-                plot_data.append({sequence_position_field: sequence_position, classification_field: class_name})
+        sequence_rows, class_columns = nonzero(ClassificationMask.to_class_matrix(plot_masks))
+        class_names: ndarray = array([c.name for c in ClassificationMask.CLASSES], dtype=object)
 
-        return DataFrame(plot_data, columns=plot_columns)
+        return DataFrame({sequence_position_field: sequence_positions[sequence_rows],
+                          classification_field: class_names[class_columns]}, columns=plot_columns)
 
     def build_weights_plot_dataframe(self) -> Optional[DataFrame]:
+        return self._get_cached_dataframe("weights", self._build_weights_plot_dataframe)
+
+    def _build_weights_plot_dataframe(self) -> Optional[DataFrame]:
         sequence_position_field: str = "sequence_position"
         weight_field: str = "weight"
         plot_columns = [sequence_position_field, weight_field]
-        plot_data: list[dict] = []
 
-        sequences: list[ClauseSequence] = self.annotation_dao.get_all_sequences()
-        if len(sequences) == 0:
+        class_aggregates: ClassAggregates = self.annotation_dao.get_class_aggregates()
+        sequence_positions: ndarray = class_aggregates.get_positions()
+        if len(sequence_positions) == 0:
             return None
-        for sequence in sequences:
-            sequence_data: list = []
-            clause_a_range, clause_b_range = sequence.get_clause_ranges()
-            sequence_position: int = (sum(clause_a_range) + sum(clause_b_range)) // 4
-            sequence_data.append(sequence_position)
 
-            predicted_classes: Optional[list[Classification]] = sequence.get_predicted_classes()
-            correct_classes: Optional[list[Classification]] = sequence.get_correct_classes()
-
-            class_weight: int
-            if (correct_classes is not None) and (len(correct_classes) > 0):
-                class_weight = sum([c.value for c in correct_classes])
-            elif (predicted_classes is not None) and (len(predicted_classes) > 0):
-                class_weight = sum([c.value for c in predicted_classes])
-            else:
-                class_weight = 0
-            if class_weight < 0:
-                class_weight = 0
-            sequence_data.append(class_weight)
-
-            sequence_dict: dict = {col: data for col, data in zip(plot_columns, sequence_data)}
-            plot_data.append(sequence_dict)
-
-        return DataFrame(plot_data, columns=plot_columns)
+        return DataFrame({sequence_position_field: sequence_positions, weight_field: class_aggregates.get_weights()},
+                         columns=plot_columns)
+
+    def build_class_count_dataframe(self) -> Optional[DataFrame]:
+        return self._get_cached_dataframe("class_count", self._build_class_count_dataframe)
+
+    def _build_class_count_dataframe(self) -> Optional[DataFrame]:
+        classification_field: str = "classification"
+        count_field: str = "count"
+        plot_columns = [classification_field, count_field]
+
+        class_aggregates: ClassAggregates = self.annotation_dao.get_class_aggregates()
+        if len(class_aggregates.get_positions()) == 0:
+            return None
+
+        # Only the plotted classes are included, ordered by name
+        class_counts: ndarray = class_aggregates.get_class_counts()
+        class_names: ndarray = array([c.name for c in ClassificationMask.CLASSES], dtype=object)
+        count_df = DataFrame({classification_field: class_names, count_field: class_counts}, columns=plot_columns)
+
+        return count_df.loc[count_df[count_field] > 0].sort_values(classification_field).reset_index(drop=True)
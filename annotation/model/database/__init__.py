@@ -1,14 +1,16 @@
+import os
 from pathlib import Path
 
 from .AnnotationDAO import AnnotationDAO
 from .DatastoreHandler import DatastoreHandler
+from .AnnotationWorkspace import AnnotationWorkspace
 
 _file_directory: Path = Path(__file__).resolve().parent
 
-llm_data_store_dir: Path = _file_directory.joinpath("llm_data_store/")
+# The directory holding the datastores of every document. Each document is given its own subdirectory
+data_store_dir: Path = Path(os.environ.get("ANNOTATION_DATA_DIR", _file_directory.joinpath("data_store/")))
+# The document opened when the annotation service starts
+default_document_name: str = "default"
 
-_data_store_path: Path = _file_directory.joinpath("data_store/")
-ref_text_ds_path: Path = _data_store_path.joinpath("reference_text.txt")
-clauses_ds_path: Path = _data_store_path.joinpath("clauses.csv")
-sequences_ds_path: Path = _data_store_path.joinpath("sequences.csv")
-pre_llm_sequence_path: Path = _data_store_path.joinpath("pre_llm_sequences.csv")
+# Selects the repository implementation used by AnnotationDAO. Either 'csv' or 'sqlite'
+datastore_backend: str = os.environ.get("ANNOTATION_DATASTORE_BACKEND", AnnotationDAO.CSV_BACKEND)
@@ -0,0 +1,50 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, held for the duration of a with block.
+    The lock is taken on a separate <path>.lock file, so the locked file itself can be atomically replaced while the
+    lock is held. The lock is exclusive between processes and between threads of the same process.
+    """
+    LOCK_SUFFIX: str = ".lock"
+
+    def __init__(self, locked_path: Path):
+        self._lock_path: Path = locked_path.with_name(locked_path.name + FileLock.LOCK_SUFFIX)
+        self._lock_fd: Optional[int] = None
+
+    def acquire(self):
+        """
+        Blocks until the lock is acquired
+        """
+        self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT)
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(self._lock_fd, msvcrt.LK_LOCK, 1)
+
+    def release(self):
+        if self._lock_fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._lock_fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._lock_fd)
+        self._lock_fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
@@ -0,0 +1,121 @@
+from numpy import ndarray, asarray, argsort, arange, empty, maximum, where, minimum
+
+
+class IntervalIndex:
+    """
+    Static index over half-open integer ranges [start, end), answering overlap and point queries in O(log n + k).
+    The ranges are sorted by start and treated as an implicit balanced binary tree, where each node holds the
+    maximum end of its subtree. The index is immutable; it is rebuilt in O(n log n) when the ranges change.
+    """
+    # Subtrees at or below this level are scanned linearly rather than descended
+    LINEAR_SCAN_LEVEL: int = 3
+
+    def __init__(self, range_ids: ndarray | list[int], starts: ndarray | list[int], ends: ndarray | list[int]):
+        """
+        Parameters
+        ----------
+        range_ids: ndarray[int] - the id of each range
+        starts: ndarray[int] - the start of each range (inclusive)
+        ends: ndarray[int] - the end of each range (exclusive). Same length as starts
+        """
+        starts = asarray(starts, dtype=int)
+        order: ndarray = argsort(starts, kind='stable')
+        self._range_ids: ndarray = asarray(range_ids, dtype=int)[order]
+        self._starts: ndarray = starts[order]
+        self._ends: ndarray = asarray(ends, dtype=int)[order]
+        self._max_ends: ndarray = self._ends.copy()
+        self._max_level: int = self._build_max_ends()
+
+    def __len__(self) -> int:
+        return len(self._range_ids)
+
+    def _build_max_ends(self) -> int:
+        count: int = len(self._starts)
+        if count == 0:
+            return -1
+
+        # Leaves are at even positions and hold their own end. last_end is the max end of the subtree
+        # holding the last position, used in place of right children beyond the end of the array
+        last_position: int = ((count - 1) // 2) * 2
+        last_end: int = int(self._ends[last_position])
+        level: int = 1
+        while (1 << level) <= count:
+            half: int = 1 << (level - 1)
+            positions: ndarray = arange((half << 1) - 1, count, half << 2)
+            right_children: ndarray = positions + half
+            right_max_ends: ndarray = where(right_children < count,
+                                            self._max_ends[minimum(right_children, count - 1)], last_end)
+            self._max_ends[positions] = maximum(maximum(self._ends[positions], self._max_ends[positions - half]),
+                                                right_max_ends)
+
+            # Move last_position to its parent and update last_end accordingly
+            if (last_position >> level) & 1:
+                last_position -= half
+            else:
+                last_position += half
+            if (last_position < count) and (self._max_ends[last_position] > last_end):
+                last_end = int(self._max_ends[last_position])
+            level += 1
+
+        return level - 1
+
+    def _overlapping_positions(self, start: int, end: int) -> list[int]:
+        count: int = len(self._starts)
+        if count == 0:
+            return []
+
+        positions: list[int] = []
+        # Each stack entry is a node position, its level, and whether its left child has been visited
+        stack: list[tuple[int, int, bool]] = [((1 << self._max_level) - 1, self._max_level, False)]
+        while len(stack) > 0:
+            node, level, left_visited = stack.pop()
+            if level <= IntervalIndex.LINEAR_SCAN_LEVEL:
+                first: int = (node >> level) << level
+                last: int = min(first + (1 << (level + 1)) - 1, count)
+                for i in range(first, last):
+                    if self._starts[i] >= end:
+                        break
+                    if start < self._ends[i]:
+                        positions.append(i)
+            elif not left_visited:
+                left_child: int = node - (1 << (level - 1))
+                stack.append((node, level, True))
+                # A left child beyond the array may still have descendants within it
+                if (left_child >= count) or (self._max_ends[left_child] > start):
+                    stack.append((left_child, level - 1, False))
+            elif (node < count) and (self._starts[node] < end):
+                if start < self._ends[node]:
+                    positions.append(node)
+                stack.append((node + (1 << (level - 1)), level - 1, False))
+
+        positions.sort()
+        return positions
+
+    def overlapping(self, start: int, end: int) -> ndarray:
+        """
+        Parameters
+        ----------
+        start: int - the start of the query range (inclusive)
+        end: int - the end of the query range (exclusive)
+
+        Returns
+        -------
+        ndarray[int] - the ids of all ranges that share at least one position with the query range, ordered by start.
+        A range [a_start, a_end) overlaps the query when a_start < end and start < a_end
+        """
+        positions: list[int] = self._overlapping_positions(start, end)
+        if len(positions) == 0:
+            return empty(0, dtype=int)
+        return self._range_ids[positions]
+
+    def containing(self, position: int) -> ndarray:
+        """
+        Parameters
+        ----------
+        position: int - the queried position
+
+        Returns
+        -------
+        ndarray[int] - the ids of all ranges [a_start, a_end) with a_start <= position < a_end, ordered by start
+        """
+        return self.overlapping(position, position + 1)
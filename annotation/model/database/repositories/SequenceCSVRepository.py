@@ -3,13 +3,15 @@ from csv import DictReader
 from pathlib import Path
 from typing import Optional
 
-from numpy import ndarray
-from pandas import DataFrame, read_csv
+from numpy import ndarray, asarray, arange, full, unique, argmax
+from pandas import DataFrame, Series, read_csv, concat
 
+from annotation.model.data_structures import Classification, ClassificationMask
 from annotation.model.database.DatabaseExceptions import DatabaseFieldError, DatabaseEntryError
+from annotation.model.database.repositories.WriteBehindCache import WriteBehindCache
 
 
-class SequenceCSVRepository:
+class SequenceCSVRepository(WriteBehindCache):
     SEQUENCE_ID_FIELD: str = "sequence_id"
     CLAUSE_A_ID_FIELD: str = "c1_id"
     CLAUSE_B_ID_FIELD: str = "c2_id"
@@ -17,16 +19,30 @@ class SequenceCSVRepository:
     PREDICTED_CLASSES: str = "predicted_classes"
     CORRECTED_CLASSES: str = "corrected_classes"
     REASONING_FIELD: str = "reasoning"
+    # Deleted sequences are kept as tombstones until the database is next written, so their ids are never reused.
+    # Databases written before sequences were tombstoned do not have this field, and it defaults to False
+    DELETED_FIELD: str = "deleted"
     FIELD_DTYPES: dict = {SEQUENCE_ID_FIELD: int, CLAUSE_A_ID_FIELD: int, CLAUSE_B_ID_FIELD: int,
-                          LINKAGE_FIELD: str, PREDICTED_CLASSES: str, CORRECTED_CLASSES: str, REASONING_FIELD: str}
+                          LINKAGE_FIELD: str, PREDICTED_CLASSES: int, CORRECTED_CLASSES: int, REASONING_FIELD: str,
+                          DELETED_FIELD: bool}
     REQUIRED_FIELDS: list[str, ...] = [field for field in FIELD_DTYPES.keys()]
+    # All fields except DELETED_FIELD, which is the last field
+    SEQUENCE_FIELDS: list[str, ...] = REQUIRED_FIELDS[:-1]
 
-    CLASS_LS_DELIMITER: str = ','
     LINKAGE_LS_DELIMITER: str = ','
 
-    def __init__(self, database_csv_path: Path):
+    DELETE_RECORD: str = "delete"
+
+    def __init__(self, database_csv_path: Path, flush_delay: Optional[float] = WriteBehindCache.DEFAULT_FLUSH_DELAY):
+        super().__init__(database_csv_path, flush_delay)
         self._database_filename: Path = database_csv_path
         self._database_cache: DataFrame = DataFrame(columns=SequenceCSVRepository.REQUIRED_FIELDS)
+        # Maps the id of each sequence that is not deleted to the position of its row in the cache
+        self._id_index: dict[int, int] = {}
+        # Secondary indexes over the sequences that are not deleted
+        self._clause_pair_index: dict[tuple[int, int], int] = {}
+        self._clause_index: dict[int, set[int]] = {}
+        self._next_id: int = 1
         self._cache_updated: bool = False
 
         # If file does not exist, create parent directories and file with only headers
@@ -44,13 +60,13 @@ class SequenceCSVRepository:
 
     def _validate_database_fields(self):
         """
-        Checks the database contains all the required fields.
+        Checks the database contains all the required fields, other than the optional deleted field.
         Additional unnecessary fields are ignored. Does not validate the data itself.
         If all fields are present, returns None. If a field is missing, the method raises a DatabaseFieldError
         """
         with open(self._database_filename, 'r') as csv_f:
             reader = DictReader(csv_f)
-            for field in SequenceCSVRepository.REQUIRED_FIELDS:
+            for field in SequenceCSVRepository.SEQUENCE_FIELDS:
                 if field not in reader.fieldnames:
                     raise DatabaseFieldError(f"Missing {field} column from sequence database")
 
@@ -61,17 +77,87 @@ class SequenceCSVRepository:
         self._validate_database_fields()
         self._database_cache = read_csv(filepath_or_buffer=self._database_filename,
                                         header=0,
-                                        names=SequenceCSVRepository.REQUIRED_FIELDS,
                                         dtype=SequenceCSVRepository.FIELD_DTYPES,
                                         keep_default_na=False,
                                         na_filter=False)
-        self._database_cache.fillna('')
+        if SequenceCSVRepository.DELETED_FIELD not in self._database_cache.columns:
+            self._database_cache[SequenceCSVRepository.DELETED_FIELD] = False
+        self._database_cache = self._database_cache[SequenceCSVRepository.REQUIRED_FIELDS]
+        self._rebuild_id_index()
 
         self._cache_updated = True
+        self._replay_log()
+
+    def _rebuild_id_index(self):
+        id_field = SequenceCSVRepository.SEQUENCE_ID_FIELD
+        sequence_ids: ndarray = self._database_cache[id_field].values
+        duplicated: ndarray = self._database_cache[id_field].duplicated().values
+        if duplicated.any():
+            raise DatabaseEntryError(f"More than one entry found for sequence_id: {sequence_ids[duplicated][0]}")
+
+        is_deleted: ndarray = self._database_cache[SequenceCSVRepository.DELETED_FIELD].values
+        self._id_index = {int(sequence_id): position for position, sequence_id in enumerate(sequence_ids)
+                          if not is_deleted[position]}
+        self._next_id = 1
+        if len(sequence_ids) > 0:
+            self._next_id = int(sequence_ids.max()) + 1
+
+        self._clause_pair_index = {}
+        self._clause_index = {}
+        clause_a_ids: ndarray = self._database_cache[SequenceCSVRepository.CLAUSE_A_ID_FIELD].values
+        clause_b_ids: ndarray = self._database_cache[SequenceCSVRepository.CLAUSE_B_ID_FIELD].values
+        for sequence_id, position in self._id_index.items():
+            self._index_clauses(sequence_id, int(clause_a_ids[position]), int(clause_b_ids[position]))
+
+    def _index_clauses(self, sequence_id: int, clause_a_id: int, clause_b_id: int):
+        self._clause_pair_index[(clause_a_id, clause_b_id)] = sequence_id
+        self._clause_index.setdefault(clause_a_id, set()).add(sequence_id)
+        self._clause_index.setdefault(clause_b_id, set()).add(sequence_id)
+
+    def _unindex_clauses(self, sequence_id: int, clause_a_id: int, clause_b_id: int):
+        self._clause_pair_index.pop((clause_a_id, clause_b_id), None)
+        for clause_id in (clause_a_id, clause_b_id):
+            clause_sequence_ids: Optional[set[int]] = self._clause_index.get(clause_id)
+            if clause_sequence_ids is None:
+                continue
+            clause_sequence_ids.discard(sequence_id)
+            if len(clause_sequence_ids) == 0:
+                del self._clause_index[clause_id]
+
+    def _live_rows(self) -> DataFrame:
+        return self._database_cache.loc[~self._database_cache[SequenceCSVRepository.DELETED_FIELD],
+                                        SequenceCSVRepository.SEQUENCE_FIELDS]
+
+    def _put_rows(self, rows: list[list]):
+        super()._put_rows(rows)
+        for row in rows:
+            self._index_clauses(int(row[0]), int(row[1]), int(row[2]))
+        if len(rows) > 0:
+            self._next_id = max(self._next_id, max([int(row[0]) for row in rows]) + 1)
+
+    def _apply_log_record(self, record_type: str, values: Optional[list]):
+        if record_type == SequenceCSVRepository.DELETE_RECORD:
+            self.delete(values[0])
+        else:
+            super()._apply_log_record(record_type, values)
+
+    def _compact_tombstones(self):
+        # The tombstone holding the largest id is kept, so ids are still never reused once the database is read back
+        id_field = SequenceCSVRepository.SEQUENCE_ID_FIELD
+        is_kept: ndarray = ~self._database_cache[SequenceCSVRepository.DELETED_FIELD].values
+        if is_kept.all():
+            return
+        is_kept[argmax(self._database_cache[id_field].values)] = True
+        self._database_cache = self._database_cache.loc[is_kept].reset_index(drop=True)
+        self._rebuild_id_index()
 
     def _write_cache_to_database(self):
-        self._database_cache.to_csv(path_or_buf=self._database_filename, index=False, na_rep='',
+        self._compact_tombstones()
+        # Written to a temporary file first, so an interrupted write does not corrupt the database
+        temp_filename: Path = self._database_filename.with_name(self._database_filename.name + ".tmp")
+        self._database_cache.to_csv(path_or_buf=temp_filename, index=False, na_rep='',
                                     columns=SequenceCSVRepository.REQUIRED_FIELDS)
+        os.replace(temp_filename, self._database_filename)
 
         self._cache_updated = True
 
@@ -82,16 +168,18 @@ class SequenceCSVRepository:
          - integer id of the sequence
          - integer id of the first clause
          - integer id of the second clause
-         - the predicted classes as a str structured as delimited digits, e.g. '1,2,3'
-         - the corrected classes as a str structured as delimited digits, e.g. '1,2,3'
+         - the predicted classes as an integer ClassificationMask
+         - the corrected classes as an integer ClassificationMask
          - the LLM reasoning for the classification as a str
         Returns
         -------
         ndarray[tuple[int]] - all sequences found in the database
         """
-        self._read_database_into_cache()
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
 
-        return self._database_cache.values
+            return self._live_rows().values
 
     def read_by_id(self, sequence_id: int) -> tuple:
         """
@@ -100,8 +188,8 @@ class SequenceCSVRepository:
          - integer id of the sequence
          - integer id of the first clause
          - integer id of the second clause
-         - the predicted classes as a str structured as delimited digits, e.g. '1,2,3'
-         - the corrected classes as a str structured as delimited digits, e.g. '1,2,3'
+         - the predicted classes as an integer ClassificationMask
+         - the corrected classes as an integer ClassificationMask
          - the LLM reasoning for the classification as a str
         Parameters
         ----------
@@ -111,18 +199,14 @@ class SequenceCSVRepository:
         -------
         tuple - the corresponding sequence as a tuple
         """
-        id_field = SequenceCSVRepository.SEQUENCE_ID_FIELD
-
-        self._read_database_into_cache()
+        with self._cache_lock:
+            self._read_database_into_cache()
 
-        matches: ndarray = self._database_cache.loc[(self._database_cache[id_field] == sequence_id)].values
+            position: Optional[int] = self._id_index.get(sequence_id)
+            if position is None:
+                return tuple()
 
-        if len(matches) == 0:
-            return tuple()
-        elif len(matches) == 1:
-            return tuple(matches[0])
-        else:
-            raise DatabaseEntryError(f"More than one entry found for sequence_id: {sequence_id}")
+            return self._read_row(position)[:len(SequenceCSVRepository.SEQUENCE_FIELDS)]
 
     def read_by_clause_id(self, clause_id: int) -> ndarray:
         """
@@ -131,8 +215,8 @@ class SequenceCSVRepository:
          - integer id of the sequence
          - integer id of the first clause
          - integer id of the second clause
-         - the predicted classes as a str structured as delimited digits, e.g. '1,2,3'
-         - the corrected classes as a str structured as delimited digits, e.g. '1,2,3'
+         - the predicted classes as an integer ClassificationMask
+         - the corrected classes as an integer ClassificationMask
          - the LLM reasoning for the classification as a str
         Parameters
         ----------
@@ -142,29 +226,47 @@ class SequenceCSVRepository:
         -------
         matches: ndarray[tuple[int]] - all sequences found in the database
         """
-        clause_a_id_field = SequenceCSVRepository.CLAUSE_A_ID_FIELD
-        clause_b_id_field = SequenceCSVRepository.CLAUSE_B_ID_FIELD
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
 
-        self._read_database_into_cache()
+            sequence_ids: list[int] = sorted(self._clause_index.get(clause_id, set()))
+            positions: list[int] = [self._id_index[sequence_id] for sequence_id in sequence_ids]
+            matches: ndarray = self._database_cache.iloc[positions][SequenceCSVRepository.SEQUENCE_FIELDS].values
 
-        matches: ndarray = self._database_cache.loc[
-            ((self._database_cache[clause_a_id_field] == clause_id) |
-             (self._database_cache[clause_b_id_field] == clause_id))].values
+            return matches
 
-        return matches
+    def read_id_by_clause_pair(self, clause_a_id: int, clause_b_id: int) -> Optional[int]:
+        """
+        Finds the sequence made of the specified clauses, in the specified order.
+        Parameters
+        ----------
+        clause_a_id: int - the id of the first specified clause
+        clause_b_id: int - the id of the second specified clause
+
+        Returns
+        -------
+        Optional[int] - the integer id of the sequence, or None if no sequence is made of the specified clauses
+        """
+        with self._cache_lock:
+            self._read_database_into_cache()
+
+            return self._clause_pair_index.get((clause_a_id, clause_b_id))
 
     def create(self, clause_a_id: int, clause_b_id: int, linkage_words: str = "",
-               predicted_classes: str = "0", correct_classes: str = "-1", reasoning: str = "") -> int:
+               predicted_classes: int = ClassificationMask.EMPTY_MASK,
+               correct_classes: int = ClassificationMask.get_bit(Classification.NA), reasoning: str = "") -> int:
         """
         Creates a new sequence in the database with the provided clause ids.
-        Returns the integer id of the new sequence. IDs automatically increment by 1 from the max ID
+        Returns the integer id of the new sequence. IDs automatically increment by 1 from the max ID,
+        including deleted sequences, so the ids of deleted sequences are never reused
         Parameters
         ----------
         clause_a_id: int - the id of the first specified clause
         clause_b_id: int - the id of the second specified clause
         linkage_words: str - the linkage words for the sequence, as a list of words separated by a delimiter
-        predicted_classes: str - the predicted classes for the sequence, as a list of digits separated by a delimiter
-        correct_classes: str - the corrected classes as a str structured as delimited digits, e.g. '1,2,3'
+        predicted_classes: int - the predicted classes for the sequence, as a ClassificationMask
+        correct_classes: int - the corrected classes for the sequence, as a ClassificationMask
         reasoning: str - the LLM reasoning for the classification as a str
 
         Returns
@@ -172,39 +274,109 @@ class SequenceCSVRepository:
         int - The integer id of the new sequence
         """
         if ((type(clause_a_id) is not int) or (type(clause_b_id) is not int) or
-                (type(linkage_words) is not str) or (type(predicted_classes) is not str)):
+                (type(linkage_words) is not str) or (type(predicted_classes) is not int)):
             return -1
 
-        self._read_database_into_cache()
+        with self._cache_lock:
+            self._read_database_into_cache()
 
-        sequence_id_field = SequenceCSVRepository.SEQUENCE_ID_FIELD
-        clause_a_id_field = SequenceCSVRepository.CLAUSE_A_ID_FIELD
-        clause_b_id_field = SequenceCSVRepository.CLAUSE_B_ID_FIELD
-        matches: ndarray = self._database_cache.loc[
-            ((self._database_cache[clause_a_id_field] == clause_a_id) &
-             (self._database_cache[clause_b_id_field] == clause_b_id))].values
+            if (clause_a_id, clause_b_id) in self._clause_pair_index:
+                return -1
 
-        if len(matches) > 0:
-            return -1
+            new_id: int = self._next_id
+            self._next_id += 1
 
-        existing_ids: ndarray = self._database_cache[sequence_id_field]
-        new_id: int = 1
-        if len(existing_ids) > 0:
-            new_id = existing_ids.max() + 1
+            new_entry = [new_id, clause_a_id, clause_b_id, linkage_words, predicted_classes, correct_classes, reasoning,
+                         False]
 
-        new_entry = [new_id, clause_a_id, clause_b_id, linkage_words, predicted_classes, correct_classes, reasoning]
+            self._id_index[int(new_id)] = self._append_row(new_entry)
+            self._index_clauses(new_id, clause_a_id, clause_b_id)
 
-        if len(self._database_cache.index) > 0:
-            self._database_cache.loc[max(self._database_cache.index) + 1] = new_entry
-        else:
-            self._database_cache.loc[len(self._database_cache)] = new_entry
+            self._log_change(WriteBehindCache.PUT_RECORD, [new_entry])
+            self._mark_dirty()
 
-        self._write_cache_to_database()
+            return new_id
 
-        return new_id
+    def create_many(self, clause_a_ids: ndarray | list[int], clause_b_ids: ndarray | list[int],
+                    linkage_words: Optional[ndarray | list[str]] = None,
+                    predicted_classes: Optional[ndarray | list[int]] = None,
+                    correct_classes: Optional[ndarray | list[int]] = None,
+                    reasoning: Optional[ndarray | list[str]] = None) -> ndarray:
+        """
+        Creates new sequences in the database in bulk, writing the database once.
+        A clause pair that already exists, or that is repeated within the provided pairs, is not created again.
+        New IDs are assigned in the provided order, incrementing by 1 from the max ID, including deleted sequences.
+        All provided arrays must have the same length. Attributes that are None take the defaults of create
+        Parameters
+        ----------
+        clause_a_ids: ndarray[int] - the ids of the first clause of each sequence
+        clause_b_ids: ndarray[int] - the ids of the second clause of each sequence
+        linkage_words: ndarray[str] - the linkage words for each sequence, as a list of words separated by a delimiter
+        predicted_classes: ndarray[int] - the predicted classes for each sequence, as ClassificationMasks
+        correct_classes: ndarray[int] - the corrected classes for each sequence, as ClassificationMasks
+        reasoning: ndarray[str] - the LLM reasoning for the classification of each sequence
+
+        Returns
+        -------
+        ndarray[int] - the integer id of each new sequence in the provided order, or -1 where the pair already existed
+        """
+        sequence_id_field = SequenceCSVRepository.SEQUENCE_ID_FIELD
+        clause_a_id_field = SequenceCSVRepository.CLAUSE_A_ID_FIELD
+        clause_b_id_field = SequenceCSVRepository.CLAUSE_B_ID_FIELD
 
-    def update(self, sequence_id: int, linkage_words: Optional[str] = None, predicted_classes: Optional[str] = None,
-               corrected_classes: Optional[str] = None, reasoning: Optional[str] = None) -> bool:
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
+
+            clause_a_ids = asarray(clause_a_ids, dtype=int)
+            clause_b_ids = asarray(clause_b_ids, dtype=int)
+            row_count: int = len(clause_a_ids)
+            defaults: dict[str, str | int] = {SequenceCSVRepository.LINKAGE_FIELD: "",
+                                        SequenceCSVRepository.PREDICTED_CLASSES: ClassificationMask.EMPTY_MASK,
+                                        SequenceCSVRepository.CORRECTED_CLASSES:
+                                                ClassificationMask.get_bit(Classification.NA),
+                                        SequenceCSVRepository.REASONING_FIELD: ""}
+            provided: dict[str, Optional[ndarray | list]] = {
+                SequenceCSVRepository.LINKAGE_FIELD: linkage_words,
+                SequenceCSVRepository.PREDICTED_CLASSES: predicted_classes,
+                SequenceCSVRepository.CORRECTED_CLASSES: correct_classes,
+                SequenceCSVRepository.REASONING_FIELD: reasoning
+            }
+            new_df = DataFrame({clause_a_id_field: clause_a_ids, clause_b_id_field: clause_b_ids})
+            for field, values in provided.items():
+                if values is None:
+                    new_df[field] = full(row_count, defaults[field], dtype=SequenceCSVRepository.FIELD_DTYPES[field])
+                else:
+                    new_df[field] = asarray(values, dtype=SequenceCSVRepository.FIELD_DTYPES[field])
+
+            # Provided clause pairs are checked against the clause pair index, then against themselves
+            is_new: ndarray = asarray([(int(clause_a_id), int(clause_b_id)) not in self._clause_pair_index
+                                       for clause_a_id, clause_b_id in zip(clause_a_ids, clause_b_ids)], dtype=bool)
+            is_new &= ~new_df.duplicated(subset=[clause_a_id_field, clause_b_id_field], keep='first').values
+
+            new_ids: ndarray = full(row_count, -1, dtype=int)
+            if is_new.any():
+                first_id: int = self._next_id
+                new_ids[is_new] = arange(first_id, first_id + is_new.sum())
+                self._next_id = first_id + int(is_new.sum())
+
+                new_df[sequence_id_field] = new_ids
+                new_df[SequenceCSVRepository.DELETED_FIELD] = False
+                new_entries = new_df.loc[is_new, SequenceCSVRepository.REQUIRED_FIELDS]
+                first_position: int = len(self._database_cache)
+                self._database_cache = concat([self._database_cache, new_entries], ignore_index=True)
+                self._id_index.update({int(new_id): first_position + offset
+                                       for offset, new_id in enumerate(new_ids[is_new])})
+                for new_id, clause_a_id, clause_b_id in zip(new_ids[is_new], clause_a_ids[is_new],
+                                                            clause_b_ids[is_new]):
+                    self._index_clauses(int(new_id), int(clause_a_id), int(clause_b_id))
+                self._log_change(WriteBehindCache.PUT_RECORD, new_entries.values.tolist())
+                self._mark_dirty()
+
+            return new_ids
+
+    def update(self, sequence_id: int, linkage_words: Optional[str] = None, predicted_classes: Optional[int] = None,
+               corrected_classes: Optional[int] = None, reasoning: Optional[str] = None) -> bool:
         """
         Updates the attributes for the sequence in the database with the given sequence_id.
         Returns True if the operation succeeds, False if the operation fails or the sequence is not found.
@@ -212,44 +384,90 @@ class SequenceCSVRepository:
         ----------
         sequence_id: int - integer id of the sequence
         linkage_words: str - the linkage words for the sequence, as a list of words separated by a delimiter
-        predicted_classes: str - the predicted classes for the sequence, as a list of digits separated by a delimiter
-        corrected_classes: str - the corrected classes as a str structured as delimited digits, e.g. '1,2,3'
+        predicted_classes: int - the predicted classes for the sequence, as a ClassificationMask
+        corrected_classes: int - the corrected classes for the sequence, as a ClassificationMask
         reasoning: str - the LLM reasoning for the classification as a str
 
         Returns
         -------
         bool - True if the operation succeeds, False if the operation fails or the sequence is not found.
         """
-        id_field = SequenceCSVRepository.SEQUENCE_ID_FIELD
-        linkage_field = SequenceCSVRepository.LINKAGE_FIELD
-        predicted_field = SequenceCSVRepository.PREDICTED_CLASSES
-        corrected_field = SequenceCSVRepository.CORRECTED_CLASSES
-        reasoning_field = SequenceCSVRepository.REASONING_FIELD
+        field_values: dict[str, Optional[str | int]] = {
+            SequenceCSVRepository.LINKAGE_FIELD: linkage_words,
+            SequenceCSVRepository.PREDICTED_CLASSES: predicted_classes,
+            SequenceCSVRepository.CORRECTED_CLASSES: corrected_classes,
+            SequenceCSVRepository.REASONING_FIELD: reasoning
+        }
+
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
+
+            position: Optional[int] = self._id_index.get(sequence_id)
+            if position is None:
+                return False
+
+            for field, value in field_values.items():
+                if value is not None:
+                    self._database_cache.iat[position, self._database_cache.columns.get_loc(field)] = value
+
+            self._log_change(WriteBehindCache.PUT_RECORD, [self._database_cache.iloc[position].tolist()])
+            self._mark_dirty()
+            return True
 
-        self._read_database_into_cache()
+    def update_many(self, sequence_ids: ndarray | list[int], linkage_words: Optional[ndarray | list[str]] = None,
+                    predicted_classes: Optional[ndarray | list[int]] = None,
+                    corrected_classes: Optional[ndarray | list[int]] = None,
+                    reasoning: Optional[ndarray | list[str]] = None) -> ndarray:
+        """
+        Updates the attributes of many sequences in bulk, with a single write-ahead log record.
+        All provided arrays must have the same length. Attributes that are None are left unchanged.
+        If a sequence id is repeated, the last of its values are kept
+        Parameters
+        ----------
+        sequence_ids: ndarray[int] - integer id of each sequence
+        linkage_words: ndarray[str] - the linkage words for each sequence, as a list of words separated by a delimiter
+        predicted_classes: ndarray[int] - the predicted classes for each sequence, as ClassificationMasks
+        corrected_classes: ndarray[int] - the corrected classes for each sequence, as ClassificationMasks
+        reasoning: ndarray[str] - the LLM reasoning for the classification of each sequence
 
-        matches: ndarray = self._database_cache.loc[(self._database_cache[id_field] == sequence_id)].values
-
-        if len(matches) == 0:
-            return False
-        elif len(matches) == 1:
-            if linkage_words is not None:
-                self._database_cache.loc[(self._database_cache[id_field] == sequence_id), [linkage_field]] = linkage_words
-            if predicted_classes is not None:
-                self._database_cache.loc[(self._database_cache[id_field] == sequence_id), [predicted_field]] = predicted_classes
-            if corrected_classes is not None:
-                self._database_cache.loc[(self._database_cache[id_field] == sequence_id), [corrected_field]] = corrected_classes
-            if reasoning is not None:
-                self._database_cache.loc[(self._database_cache[id_field] == sequence_id), [reasoning_field]] = reasoning
-
-            self._write_cache_to_database()
-            return True
-        else:
-            raise DatabaseEntryError(f"More than one entry found for sequence_id: {sequence_id}")
+        Returns
+        -------
+        ndarray[bool] - for each provided sequence id, True if the sequence was updated, False if it was not found
+        """
+        field_values: dict[str, Optional[ndarray | list]] = {
+            SequenceCSVRepository.LINKAGE_FIELD: linkage_words,
+            SequenceCSVRepository.PREDICTED_CLASSES: predicted_classes,
+            SequenceCSVRepository.CORRECTED_CLASSES: corrected_classes,
+            SequenceCSVRepository.REASONING_FIELD: reasoning
+        }
+
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
+
+            positions: ndarray = asarray([self._id_index.get(sequence_id, -1)
+                                          for sequence_id in asarray(sequence_ids, dtype=int).tolist()], dtype=int)
+            updated: ndarray = positions != -1
+            if not updated.any():
+                return updated
+
+            for field, values in field_values.items():
+                if values is None:
+                    continue
+                values = Series(values).astype(SequenceCSVRepository.FIELD_DTYPES[field]).values
+                self._database_cache.iloc[positions[updated], self._database_cache.columns.get_loc(field)] = \
+                    values[updated]
+
+            updated_positions: ndarray = unique(positions[updated])
+            self._log_change(WriteBehindCache.PUT_RECORD, self._database_cache.iloc[updated_positions].values.tolist())
+            self._mark_dirty()
+            return updated
 
     def delete(self, sequence_id: int) -> bool:
         """
         Deletes the sequence entry corresponding to the given sequence id.
+        The entry is kept as a tombstone, so the ids of other sequences are unchanged and the id is never reused.
         Returns True if the operation succeeds, False if the operation fails or the sequence is not found.
         Parameters
         ----------
@@ -259,27 +477,36 @@ class SequenceCSVRepository:
         -------
         success: bool - True if the operation succeeds, False if the operation fails or the sequence is not found.
         """
-        id_field = SequenceCSVRepository.SEQUENCE_ID_FIELD
+        clause_a_id_field = SequenceCSVRepository.CLAUSE_A_ID_FIELD
+        clause_b_id_field = SequenceCSVRepository.CLAUSE_B_ID_FIELD
+        deleted_field = SequenceCSVRepository.DELETED_FIELD
 
-        self._read_database_into_cache()
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
 
-        matches: ndarray = self._database_cache.loc[(self._database_cache[id_field] == sequence_id)].values
+            position: Optional[int] = self._id_index.pop(sequence_id, None)
+            if position is None:
+                return False
 
-        if len(matches) == 0:
-            return False
-        elif len(matches) == 1:
-            self._database_cache = self._database_cache.loc[~(self._database_cache[id_field] == sequence_id)]
-            self._database_cache[id_field] = self._database_cache[id_field].apply(
-                lambda x: x - 1 if x > sequence_id else x)
+            self._database_cache.iat[position, self._database_cache.columns.get_loc(deleted_field)] = True
+            deleted_row = self._database_cache.iloc[position]
+            self._unindex_clauses(sequence_id, int(deleted_row[clause_a_id_field]), int(deleted_row[clause_b_id_field]))
 
-            self._write_cache_to_database()
+            self._log_change(SequenceCSVRepository.DELETE_RECORD, [sequence_id])
+            self._mark_dirty()
             return True
-        else:
-            raise DatabaseEntryError(f"More than one entry found for sequence_id: {sequence_id}")
 
     def clear_database(self):
         """
         Deletes all contents from the database, except for column headers
         """
-        self._database_cache = self._database_cache.iloc[0:0]
-        self._write_cache_to_database()
+        with self._cache_lock:
+            self._database_cache = self._database_cache.iloc[0:0]
+            self._pending_rows = []
+            self._id_index = {}
+            self._clause_pair_index = {}
+            self._clause_index = {}
+            self._next_id = 1
+            self._log_change(WriteBehindCache.CLEAR_RECORD)
+            self._mark_dirty()
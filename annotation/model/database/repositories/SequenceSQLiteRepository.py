@@ -0,0 +1,509 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from threading import RLock
+from typing import Optional
+
+from numpy import ndarray, array, empty, asarray, full, zeros
+from pandas import DataFrame, Series
+
+from annotation.model.data_structures import Classification, ClassificationMask
+from annotation.model.database.DatabaseExceptions import DatabaseFieldError, DatabaseEntryError
+
+
+class SequenceSQLiteRepository:
+    """
+    SQLite implementation of the sequence repository. Provides the same methods as SequenceCSVRepository.
+    Rows are indexed by sequence id and by clause pair, so single row operations do not scan the table.
+    Sequence ids are AUTOINCREMENT ids, so the ids of deleted sequences are never reused.
+    The database runs in WAL mode and every write is committed in a transaction.
+    Writes made within the batch() context manager are committed together in a single transaction.
+    The connection is shared between threads, so every statement and transaction holds the repository lock.
+    """
+    TABLE_NAME: str = "sequences"
+    SEQUENCE_ID_FIELD: str = "sequence_id"
+    CLAUSE_A_ID_FIELD: str = "c1_id"
+    CLAUSE_B_ID_FIELD: str = "c2_id"
+    LINKAGE_FIELD: str = "linkage_words"
+    PREDICTED_CLASSES: str = "predicted_classes"
+    CORRECTED_CLASSES: str = "corrected_classes"
+    REASONING_FIELD: str = "reasoning"
+    FIELD_DTYPES: dict = {SEQUENCE_ID_FIELD: int, CLAUSE_A_ID_FIELD: int, CLAUSE_B_ID_FIELD: int,
+                          LINKAGE_FIELD: str, PREDICTED_CLASSES: int, CORRECTED_CLASSES: int, REASONING_FIELD: str}
+    REQUIRED_FIELDS: list[str, ...] = [field for field in FIELD_DTYPES.keys()]
+
+    LINKAGE_LS_DELIMITER: str = ','
+
+    def __init__(self, database_path: Path):
+        self._database_path: Path = database_path
+        self._batch_depth: int = 0
+        self._lock: RLock = RLock()
+
+        # If file does not exist, create parent directories
+        if not os.path.exists(database_path):
+            database_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(database_path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+
+        # Validate the file can be opened with read and write permissions
+        if not os.access(database_path, os.R_OK):
+            raise PermissionError(f"No permissions to read the file: {database_path}")
+        if not os.access(database_path, os.W_OK):
+            raise PermissionError(f"No permissions to write to the file: {database_path}")
+
+        self._create_table()
+        self._validate_database_fields()
+
+    def _create_table(self):
+        table = SequenceSQLiteRepository.TABLE_NAME
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                                 f"\"{SequenceSQLiteRepository.SEQUENCE_ID_FIELD}\" INTEGER PRIMARY KEY AUTOINCREMENT, "
+                                 f"\"{SequenceSQLiteRepository.CLAUSE_A_ID_FIELD}\" INTEGER NOT NULL, "
+                                 f"\"{SequenceSQLiteRepository.CLAUSE_B_ID_FIELD}\" INTEGER NOT NULL, "
+                                 f"\"{SequenceSQLiteRepository.LINKAGE_FIELD}\" TEXT NOT NULL DEFAULT '', "
+                                 f"\"{SequenceSQLiteRepository.PREDICTED_CLASSES}\" INTEGER NOT NULL DEFAULT 0, "
+                                 f"\"{SequenceSQLiteRepository.CORRECTED_CLASSES}\" INTEGER NOT NULL DEFAULT 0, "
+                                 f"\"{SequenceSQLiteRepository.REASONING_FIELD}\" TEXT NOT NULL DEFAULT '')")
+        self._connection.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_clause_pair_idx ON {table} ("
+                                 f"\"{SequenceSQLiteRepository.CLAUSE_A_ID_FIELD}\", "
+                                 f"\"{SequenceSQLiteRepository.CLAUSE_B_ID_FIELD}\")")
+        self._connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_clause_b_idx ON {table} ("
+                                 f"\"{SequenceSQLiteRepository.CLAUSE_B_ID_FIELD}\")")
+
+    def _validate_database_fields(self):
+        """
+        Checks the database contains all the required fields.
+        Additional unnecessary fields are ignored. Does not validate the data itself.
+        If all fields are present, returns None. If a field is missing, the method raises a DatabaseFieldError
+        """
+        table_info = self._connection.execute(f"PRAGMA table_info({SequenceSQLiteRepository.TABLE_NAME})").fetchall()
+        fieldnames: list[str] = [column[1] for column in table_info]
+        for field in SequenceSQLiteRepository.REQUIRED_FIELDS:
+            if field not in fieldnames:
+                raise DatabaseFieldError(f"Missing {field} column from sequence database")
+
+    @staticmethod
+    def _select_columns() -> str:
+        return ", ".join([f"\"{field}\"" for field in SequenceSQLiteRepository.REQUIRED_FIELDS])
+
+    def _next_id(self) -> int:
+        # Holds the largest id ever inserted, including the ids of deleted sequences
+        row: Optional[tuple] = self._connection.execute("SELECT seq FROM sqlite_sequence WHERE name = ?",
+                                                        (SequenceSQLiteRepository.TABLE_NAME,)).fetchone()
+        if row is None:
+            return 1
+        return int(row[0]) + 1
+
+    @staticmethod
+    def _to_array(rows: list[tuple]) -> ndarray:
+        if len(rows) == 0:
+            return empty((0, len(SequenceSQLiteRepository.REQUIRED_FIELDS)), dtype=object)
+        return array(rows, dtype=object)
+
+    def _fetchall(self, query: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def _fetchone(self, query: str, parameters: tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchone()
+
+    def _load_temp_table(self, table: str, columns: list[str], rows: list[tuple]):
+        # Bulk operations join the provided rows against the table indexes, rather than reading the whole table
+        self._connection.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} ({', '.join(columns)})")
+        self._connection.execute(f"DELETE FROM {table}")
+        self._connection.executemany(f"INSERT INTO {table} VALUES ({', '.join(['?'] * len(columns))})", rows)
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups all writes made within the context into a single transaction.
+        The transaction is rolled back if an exception is raised within the context.
+        Other threads are blocked from the connection until the transaction ends
+        """
+        with self._lock:
+            if self._batch_depth == 0:
+                self._connection.execute("BEGIN")
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._connection.execute("ROLLBACK")
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._connection.execute("COMMIT")
+
+    def read_all(self) -> ndarray:
+        """
+        Reads all sequences from the database and returns an array of tuples.
+        Each tuple contains:
+         - integer id of the sequence
+         - integer id of the first clause
+         - integer id of the second clause
+         - the predicted classes as an integer ClassificationMask
+         - the corrected classes as an integer ClassificationMask
+         - the LLM reasoning for the classification as a str
+        Returns
+        -------
+        ndarray[tuple[int]] - all sequences found in the database
+        """
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        rows: list[tuple] = self._fetchall(
+            f"SELECT {self._select_columns()} FROM {SequenceSQLiteRepository.TABLE_NAME} "
+            f"ORDER BY \"{id_field}\"")
+
+        return self._to_array(rows)
+
+    def read_by_id(self, sequence_id: int) -> tuple:
+        """
+        Reads the sequence from the database corresponding to the given sequence_id and returns a tuple.
+        The tuple contains:
+         - integer id of the sequence
+         - integer id of the first clause
+         - integer id of the second clause
+         - the predicted classes as an integer ClassificationMask
+         - the corrected classes as an integer ClassificationMask
+         - the LLM reasoning for the classification as a str
+        Parameters
+        ----------
+        sequence_id: int - integer id of the sequence
+
+        Returns
+        -------
+        tuple - the corresponding sequence as a tuple
+        """
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        row: Optional[tuple] = self._fetchone(
+            f"SELECT {self._select_columns()} FROM {SequenceSQLiteRepository.TABLE_NAME} "
+            f"WHERE \"{id_field}\" = ?", (int(sequence_id),))
+
+        if row is None:
+            return tuple()
+        return tuple(row)
+
+    def read_by_clause_id(self, clause_id: int) -> ndarray:
+        """
+        Reads all sequences that contain the specified clause and returns an array of tuples.
+        Each tuple contains:
+         - integer id of the sequence
+         - integer id of the first clause
+         - integer id of the second clause
+         - the predicted classes as an integer ClassificationMask
+         - the corrected classes as an integer ClassificationMask
+         - the LLM reasoning for the classification as a str
+        Parameters
+        ----------
+        clause_id: int - the id of the specified clause
+
+        Returns
+        -------
+        matches: ndarray[tuple[int]] - all sequences found in the database
+        """
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        clause_a_id_field = SequenceSQLiteRepository.CLAUSE_A_ID_FIELD
+        clause_b_id_field = SequenceSQLiteRepository.CLAUSE_B_ID_FIELD
+        rows: list[tuple] = self._fetchall(
+            f"SELECT {self._select_columns()} FROM {SequenceSQLiteRepository.TABLE_NAME} "
+            f"WHERE \"{clause_a_id_field}\" = ? OR \"{clause_b_id_field}\" = ? "
+            f"ORDER BY \"{id_field}\"", (int(clause_id), int(clause_id)))
+
+        return self._to_array(rows)
+
+    def read_id_by_clause_pair(self, clause_a_id: int, clause_b_id: int) -> Optional[int]:
+        """
+        Finds the sequence made of the specified clauses, in the specified order.
+        Parameters
+        ----------
+        clause_a_id: int - the id of the first specified clause
+        clause_b_id: int - the id of the second specified clause
+
+        Returns
+        -------
+        Optional[int] - the integer id of the sequence, or None if no sequence is made of the specified clauses
+        """
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        clause_a_id_field = SequenceSQLiteRepository.CLAUSE_A_ID_FIELD
+        clause_b_id_field = SequenceSQLiteRepository.CLAUSE_B_ID_FIELD
+
+        row: Optional[tuple] = self._fetchone(
+            f"SELECT \"{id_field}\" FROM {SequenceSQLiteRepository.TABLE_NAME} "
+            f"WHERE \"{clause_a_id_field}\" = ? AND \"{clause_b_id_field}\" = ?",
+            (int(clause_a_id), int(clause_b_id)))
+
+        if row is None:
+            return None
+        return int(row[0])
+
+    def create(self, clause_a_id: int, clause_b_id: int, linkage_words: str = "",
+               predicted_classes: int = ClassificationMask.EMPTY_MASK,
+               correct_classes: int = ClassificationMask.get_bit(Classification.NA), reasoning: str = "") -> int:
+        """
+        Creates a new sequence in the database with the provided clause ids.
+        Returns the integer id of the new sequence. IDs automatically increment by 1 from the max ID,
+        including deleted sequences, so the ids of deleted sequences are never reused
+        Parameters
+        ----------
+        clause_a_id: int - the id of the first specified clause
+        clause_b_id: int - the id of the second specified clause
+        linkage_words: str - the linkage words for the sequence, as a list of words separated by a delimiter
+        predicted_classes: int - the predicted classes for the sequence, as a ClassificationMask
+        correct_classes: int - the corrected classes for the sequence, as a ClassificationMask
+        reasoning: str - the LLM reasoning for the classification as a str
+
+        Returns
+        -------
+        int - The integer id of the new sequence
+        """
+        if ((type(clause_a_id) is not int) or (type(clause_b_id) is not int) or
+                (type(linkage_words) is not str) or (type(predicted_classes) is not int)):
+            return -1
+
+        table = SequenceSQLiteRepository.TABLE_NAME
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        clause_a_id_field = SequenceSQLiteRepository.CLAUSE_A_ID_FIELD
+        clause_b_id_field = SequenceSQLiteRepository.CLAUSE_B_ID_FIELD
+
+        with self.batch():
+            match: Optional[tuple] = self._connection.execute(
+                f"SELECT \"{id_field}\" FROM {table} WHERE \"{clause_a_id_field}\" = ? AND \"{clause_b_id_field}\" = ?",
+                (clause_a_id, clause_b_id)).fetchone()
+            if match is not None:
+                return -1
+
+            new_id: int = self._next_id()
+
+            new_entry = (new_id, clause_a_id, clause_b_id, linkage_words, predicted_classes,
+                         int(correct_classes), str(reasoning))
+            self._connection.execute(f"INSERT INTO {table} ({self._select_columns()}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     new_entry)
+
+        return new_id
+
+    def create_many(self, clause_a_ids: ndarray | list[int], clause_b_ids: ndarray | list[int],
+                    linkage_words: Optional[ndarray | list[str]] = None,
+                    predicted_classes: Optional[ndarray | list[int]] = None,
+                    correct_classes: Optional[ndarray | list[int]] = None,
+                    reasoning: Optional[ndarray | list[str]] = None) -> ndarray:
+        """
+        Creates new sequences in the database in bulk, within a single transaction.
+        A clause pair that already exists, or that is repeated within the provided pairs, is not created again.
+        New IDs are assigned in the provided order, incrementing by 1 from the max ID, including deleted sequences.
+        All provided arrays must have the same length. Attributes that are None take the defaults of create
+        Parameters
+        ----------
+        clause_a_ids: ndarray[int] - the ids of the first clause of each sequence
+        clause_b_ids: ndarray[int] - the ids of the second clause of each sequence
+        linkage_words: ndarray[str] - the linkage words for each sequence, as a list of words separated by a delimiter
+        predicted_classes: ndarray[int] - the predicted classes for each sequence, as ClassificationMasks
+        correct_classes: ndarray[int] - the corrected classes for each sequence, as ClassificationMasks
+        reasoning: ndarray[str] - the LLM reasoning for the classification of each sequence
+
+        Returns
+        -------
+        ndarray[int] - the integer id of each new sequence in the provided order, or -1 where the pair already existed
+        """
+        table = SequenceSQLiteRepository.TABLE_NAME
+        sequence_id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        clause_a_id_field = SequenceSQLiteRepository.CLAUSE_A_ID_FIELD
+        clause_b_id_field = SequenceSQLiteRepository.CLAUSE_B_ID_FIELD
+
+        clause_a_ids = asarray(clause_a_ids, dtype=int)
+        clause_b_ids = asarray(clause_b_ids, dtype=int)
+        row_count: int = len(clause_a_ids)
+        defaults: dict[str, str | int] = {SequenceSQLiteRepository.LINKAGE_FIELD: "",
+                                    SequenceSQLiteRepository.PREDICTED_CLASSES: ClassificationMask.EMPTY_MASK,
+                                    SequenceSQLiteRepository.CORRECTED_CLASSES:
+                                            ClassificationMask.get_bit(Classification.NA),
+                                    SequenceSQLiteRepository.REASONING_FIELD: ""}
+        provided: dict[str, Optional[ndarray | list]] = {
+            SequenceSQLiteRepository.LINKAGE_FIELD: linkage_words,
+            SequenceSQLiteRepository.PREDICTED_CLASSES: predicted_classes,
+            SequenceSQLiteRepository.CORRECTED_CLASSES: correct_classes,
+            SequenceSQLiteRepository.REASONING_FIELD: reasoning
+        }
+        new_df = DataFrame({clause_a_id_field: clause_a_ids, clause_b_id_field: clause_b_ids})
+        for field, values in provided.items():
+            if values is None:
+                new_df[field] = full(row_count, defaults[field], dtype=SequenceSQLiteRepository.FIELD_DTYPES[field])
+            else:
+                new_df[field] = asarray(values, dtype=SequenceSQLiteRepository.FIELD_DTYPES[field])
+
+        # Only the first of repeated clause pairs is created
+        is_first: ndarray = ~new_df.duplicated(subset=[clause_a_id_field, clause_b_id_field], keep='first').values
+        insert_fields: list[str] = SequenceSQLiteRepository.REQUIRED_FIELDS[1:]
+        insert_columns: str = ", ".join([f"\"{field}\"" for field in insert_fields])
+        first_rows = new_df.loc[is_first, insert_fields]
+        provided_rows = [(position, int(row[0]), int(row[1]), row[2], int(row[3]), int(row[4]), row[5])
+                         for position, row in zip(first_rows.index.tolist(),
+                                                  first_rows.itertuples(index=False, name=None))]
+
+        new_ids: ndarray = full(row_count, -1, dtype=int)
+        with self.batch():
+            first_id: int = self._next_id()
+            self._load_temp_table("provided_sequences", ["position INTEGER PRIMARY KEY", "clause_a_id INTEGER",
+                                                         "clause_b_id INTEGER", "linkage_words TEXT",
+                                                         "predicted_classes INTEGER", "corrected_classes INTEGER",
+                                                         "reasoning TEXT"], provided_rows)
+            # Clause pairs that already exist are found through the unique clause pair index
+            self._connection.execute(
+                f"INSERT INTO {table} ({insert_columns}) "
+                f"SELECT clause_a_id, clause_b_id, linkage_words, predicted_classes, corrected_classes, reasoning "
+                f"FROM provided_sequences WHERE NOT EXISTS (SELECT 1 FROM {table} "
+                f"WHERE \"{clause_a_id_field}\" = provided_sequences.clause_a_id "
+                f"AND \"{clause_b_id_field}\" = provided_sequences.clause_b_id) ORDER BY position")
+            created: list[tuple] = self._connection.execute(
+                f"SELECT provided_sequences.position, {table}.\"{sequence_id_field}\" FROM provided_sequences "
+                f"JOIN {table} ON {table}.\"{clause_a_id_field}\" = provided_sequences.clause_a_id "
+                f"AND {table}.\"{clause_b_id_field}\" = provided_sequences.clause_b_id "
+                f"WHERE {table}.\"{sequence_id_field}\" >= ?", (first_id,)).fetchall()
+
+        if len(created) > 0:
+            positions, ids = array(created, dtype=int).T
+            new_ids[positions] = ids
+
+        return new_ids
+
+    def update(self, sequence_id: int, linkage_words: Optional[str] = None, predicted_classes: Optional[int] = None,
+               corrected_classes: Optional[int] = None, reasoning: Optional[str] = None) -> bool:
+        """
+        Updates the attributes for the sequence in the database with the given sequence_id.
+        Returns True if the operation succeeds, False if the operation fails or the sequence is not found.
+        Parameters
+        ----------
+        sequence_id: int - integer id of the sequence
+        linkage_words: str - the linkage words for the sequence, as a list of words separated by a delimiter
+        predicted_classes: int - the predicted classes for the sequence, as a ClassificationMask
+        corrected_classes: int - the corrected classes for the sequence, as a ClassificationMask
+        reasoning: str - the LLM reasoning for the classification as a str
+
+        Returns
+        -------
+        bool - True if the operation succeeds, False if the operation fails or the sequence is not found.
+        """
+        field_values: dict[str, Optional[str | int]] = {
+            SequenceSQLiteRepository.LINKAGE_FIELD: linkage_words,
+            SequenceSQLiteRepository.PREDICTED_CLASSES: predicted_classes,
+            SequenceSQLiteRepository.CORRECTED_CLASSES: corrected_classes,
+            SequenceSQLiteRepository.REASONING_FIELD: reasoning
+        }
+        field_values = {field: SequenceSQLiteRepository.FIELD_DTYPES[field](value)
+                        for field, value in field_values.items() if value is not None}
+
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        with self.batch():
+            exists: Optional[tuple] = self._connection.execute(
+                f"SELECT 1 FROM {SequenceSQLiteRepository.TABLE_NAME} WHERE \"{id_field}\" = ?",
+                (int(sequence_id),)).fetchone()
+            if exists is None:
+                return False
+            if len(field_values) == 0:
+                return True
+
+            set_clause: str = ", ".join([f"\"{field}\" = ?" for field in field_values.keys()])
+            self._connection.execute(f"UPDATE {SequenceSQLiteRepository.TABLE_NAME} SET {set_clause} "
+                                     f"WHERE \"{id_field}\" = ?", (*field_values.values(), int(sequence_id)))
+
+        return True
+
+    def update_many(self, sequence_ids: ndarray | list[int], linkage_words: Optional[ndarray | list[str]] = None,
+                    predicted_classes: Optional[ndarray | list[int]] = None,
+                    corrected_classes: Optional[ndarray | list[int]] = None,
+                    reasoning: Optional[ndarray | list[str]] = None) -> ndarray:
+        """
+        Updates the attributes of many sequences in bulk, within a single transaction.
+        All provided arrays must have the same length. Attributes that are None are left unchanged.
+        If a sequence id is repeated, the last of its values are kept
+        Parameters
+        ----------
+        sequence_ids: ndarray[int] - integer id of each sequence
+        linkage_words: ndarray[str] - the linkage words for each sequence, as a list of words separated by a delimiter
+        predicted_classes: ndarray[int] - the predicted classes for each sequence, as ClassificationMasks
+        corrected_classes: ndarray[int] - the corrected classes for each sequence, as ClassificationMasks
+        reasoning: ndarray[str] - the LLM reasoning for the classification of each sequence
+
+        Returns
+        -------
+        ndarray[bool] - for each provided sequence id, True if the sequence was updated, False if it was not found
+        """
+        field_values: dict[str, Optional[ndarray | list]] = {
+            SequenceSQLiteRepository.LINKAGE_FIELD: linkage_words,
+            SequenceSQLiteRepository.PREDICTED_CLASSES: predicted_classes,
+            SequenceSQLiteRepository.CORRECTED_CLASSES: corrected_classes,
+            SequenceSQLiteRepository.REASONING_FIELD: reasoning
+        }
+        field_values = {field: Series(values).astype(SequenceSQLiteRepository.FIELD_DTYPES[field]).tolist()
+                        for field, values in field_values.items() if values is not None}
+
+        table = SequenceSQLiteRepository.TABLE_NAME
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+        sequence_ids = asarray(sequence_ids, dtype=int)
+        updated: ndarray = zeros(len(sequence_ids), dtype=bool)
+        with self.batch():
+            self._load_temp_table("provided_ids", ["position INTEGER PRIMARY KEY", "sequence_id INTEGER"],
+                                  list(enumerate(sequence_ids.tolist())))
+            found: list[tuple] = self._connection.execute(
+                f"SELECT provided_ids.position FROM provided_ids "
+                f"JOIN {table} ON {table}.\"{id_field}\" = provided_ids.sequence_id").fetchall()
+            updated[[row[0] for row in found]] = True
+            if (len(field_values) == 0) or (not updated.any()):
+                return updated
+
+            set_clause: str = ", ".join([f"\"{field}\" = ?" for field in field_values.keys()])
+            update_rows = [row for row, is_updated in zip(zip(*field_values.values(), sequence_ids.tolist()), updated)
+                           if is_updated]
+            self._connection.executemany(f"UPDATE {table} SET {set_clause} WHERE \"{id_field}\" = ?", update_rows)
+
+        return updated
+
+    def delete(self, sequence_id: int) -> bool:
+        """
+        Deletes the sequence entry corresponding to the given sequence id.
+        The ids of other sequences are unchanged and the id is never reused.
+        Returns True if the operation succeeds, False if the operation fails or the sequence is not found.
+        Parameters
+        ----------
+        sequence_id: int - integer id of the sequence
+
+        Returns
+        -------
+        success: bool - True if the operation succeeds, False if the operation fails or the sequence is not found.
+        """
+        table = SequenceSQLiteRepository.TABLE_NAME
+        id_field = SequenceSQLiteRepository.SEQUENCE_ID_FIELD
+
+        with self.batch():
+            cursor = self._connection.execute(f"DELETE FROM {table} WHERE \"{id_field}\" = ?", (int(sequence_id),))
+            if cursor.rowcount == 0:
+                return False
+            elif cursor.rowcount > 1:
+                raise DatabaseEntryError(f"More than one entry found for sequence_id: {sequence_id}")
+
+        return True
+
+    def clear_database(self):
+        """
+        Deletes all contents from the database, except for column headers
+        """
+        with self.batch():
+            self._connection.execute(f"DELETE FROM {SequenceSQLiteRepository.TABLE_NAME}")
+            self._connection.execute("DELETE FROM sqlite_sequence WHERE name = ?",
+                                     (SequenceSQLiteRepository.TABLE_NAME,))
+
+    def commit(self):
+        """
+        Provided for parity with the CSV repositories. Every write is already committed in its own transaction
+        """
+        return
+
+    def close(self):
+        """
+        Closes the database connection. The repository cannot be used once closed
+        """
+        with self._lock:
+            self._connection.close()
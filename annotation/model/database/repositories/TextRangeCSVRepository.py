@@ -1,23 +1,38 @@
 import os
 from csv import DictReader
 from pathlib import Path
+from typing import Optional
 
-from numpy import ndarray
-from pandas import DataFrame, read_csv
+from numpy import ndarray, asarray, arange, column_stack
+from pandas import DataFrame, read_csv, concat
 
 from annotation.model.database.DatabaseExceptions import DatabaseFieldError, DatabaseEntryError
+from annotation.model.database.repositories.IntervalIndex import IntervalIndex
+from annotation.model.database.repositories.WriteBehindCache import WriteBehindCache
 
 
-class TextRangeCSVRepository:
+class TextRangeCSVRepository(WriteBehindCache):
     RANGE_ID_FIELD: str = "range_id"
     RANGE_START_FIELD: str = "start"
     RANGE_END_FIELD: str = "end"
     FIELD_DTYPES: dict = {RANGE_ID_FIELD: int, RANGE_START_FIELD: int, RANGE_END_FIELD: int}
     REQUIRED_FIELDS: list[str, ...] = [field for field in FIELD_DTYPES.keys()]
+    # Maximum number of ranges created or changed since the interval index was built before it is rebuilt
+    MAX_UNINDEXED_RANGES: int = 1024
 
-    def __init__(self, database_csv_path: Path):
+    def __init__(self, database_csv_path: Path, flush_delay: Optional[float] = WriteBehindCache.DEFAULT_FLUSH_DELAY):
+        super().__init__(database_csv_path, flush_delay)
         self._database_path: Path = database_csv_path
         self._database_cache: DataFrame = DataFrame(columns=TextRangeCSVRepository.REQUIRED_FIELDS)
+        # Maps each range id to the position of its row in the cache
+        self._id_index: dict[int, int] = {}
+        # Maps each (start, end) pair to its range id
+        self._range_index: dict[tuple[int, int], int] = {}
+        # Built from the cache when first queried. Ranges created or changed since then are held by row position in
+        # _unindexed_positions and checked linearly by queries, until too many build up and the index is discarded
+        self._interval_index: Optional[IntervalIndex] = None
+        self._unindexed_positions: set[int] = set()
+        self._next_id: int = 1
         self._cache_updated: bool = False
 
         # If file does not exist, create parent directories and file with only headers
@@ -54,11 +69,75 @@ class TextRangeCSVRepository:
                                         header=0,
                                         names=TextRangeCSVRepository.REQUIRED_FIELDS,
                                         dtype=TextRangeCSVRepository.FIELD_DTYPES)
+        self._rebuild_id_index()
+        self._rebuild_range_index()
         self._cache_updated = True
+        self._replay_log()
+
+    def _rebuild_id_index(self):
+        id_field = TextRangeCSVRepository.RANGE_ID_FIELD
+        range_ids: ndarray = self._database_cache[id_field].values
+        self._id_index = {int(range_id): position for position, range_id in enumerate(range_ids)}
+        self._next_id = 1
+        if len(range_ids) > 0:
+            self._next_id = int(range_ids.max()) + 1
+        if len(self._id_index) != len(range_ids):
+            duplicate_ids = self._database_cache.loc[self._database_cache[id_field].duplicated(), id_field].values
+            raise DatabaseEntryError(f"More than one entry found for range_id: {duplicate_ids[0]}")
+
+    def _rebuild_range_index(self):
+        values: ndarray = self._database_cache[TextRangeCSVRepository.REQUIRED_FIELDS].values
+        self._range_index = {(int(start), int(end)): int(range_id) for range_id, start, end in values}
+        self._discard_interval_index()
+        if len(self._range_index) != len(values):
+            duplicated = self._database_cache.duplicated(subset=[TextRangeCSVRepository.RANGE_START_FIELD,
+                                                                 TextRangeCSVRepository.RANGE_END_FIELD])
+            start, end = values[duplicated.values][0, 1:]
+            raise DatabaseEntryError(f"More than one entry found for text range with start: {start} and end: {end}")
+
+    def _put_rows(self, rows: list[list]):
+        with self._cache_lock:
+            self._flush_pending_rows()
+            # Replaced rows are removed from the range index before their new ranges are added
+            for row in rows:
+                position: Optional[int] = self._id_index.get(row[0])
+                if position is not None:
+                    _, start, end = self._database_cache.iloc[position].values
+                    self._range_index.pop((int(start), int(end)), None)
+            super()._put_rows(rows)
+            self._range_index.update({(int(start), int(end)): int(range_id) for range_id, start, end in rows})
+            self._mark_unindexed([self._id_index[int(row[0])] for row in rows])
+            if len(rows) > 0:
+                self._next_id = max(self._next_id, max([int(row[0]) for row in rows]) + 1)
+
+    def _discard_interval_index(self):
+        self._interval_index = None
+        self._unindexed_positions = set()
+
+    def _mark_unindexed(self, positions: list[int]):
+        # Ranges are never deleted, so the row positions held by the interval index stay valid as ranges are added
+        if self._interval_index is None:
+            return
+        if len(self._unindexed_positions) + len(positions) > TextRangeCSVRepository.MAX_UNINDEXED_RANGES:
+            self._discard_interval_index()
+            return
+        self._unindexed_positions.update(positions)
+
+    def _get_interval_index(self) -> IntervalIndex:
+        # The index holds the row position of each range
+        if self._interval_index is None:
+            self._interval_index = IntervalIndex(arange(len(self._database_cache)),
+                                                 self._database_cache[TextRangeCSVRepository.RANGE_START_FIELD].values,
+                                                 self._database_cache[TextRangeCSVRepository.RANGE_END_FIELD].values)
+            self._unindexed_positions = set()
+        return self._interval_index
 
     def _write_cache_to_database(self):
-        self._database_cache.to_csv(path_or_buf=self._database_path, index=False,
+        # Written to a temporary file first, so an interrupted write does not corrupt the database
+        temp_path: Path = self._database_path.with_name(self._database_path.name + ".tmp")
+        self._database_cache.to_csv(path_or_buf=temp_path, index=False,
                                     columns=TextRangeCSVRepository.REQUIRED_FIELDS)
+        os.replace(temp_path, self._database_path)
         self._cache_updated = True
 
     def read_all(self) -> ndarray:
@@ -67,14 +146,16 @@ class TextRangeCSVRepository:
         Each tuple contains:
          - integer id of the range
          - integer index of the start of the text range (inclusive)
-         - integer index of the end of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
         Returns
         -------
         ndarray[tuple[int]] - all text ranges found in the database
         """
-        self._read_database_into_cache()
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
 
-        return self._database_cache.values
+            return self._database_cache.values
 
     def read_by_id(self, range_id: int) -> tuple:
         """
@@ -82,7 +163,7 @@ class TextRangeCSVRepository:
         The tuple contains:
          - integer id of the range
          - integer index of the start of the text range (inclusive)
-         - integer index of the end of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
         Parameters
         ----------
         range_id: int - integer id of the sequence
@@ -91,62 +172,189 @@ class TextRangeCSVRepository:
         -------
         tuple - the corresponding text range as a tuple
         """
-        id_field = TextRangeCSVRepository.RANGE_ID_FIELD
+        with self._cache_lock:
+            self._read_database_into_cache()
 
-        self._read_database_into_cache()
+            position: Optional[int] = self._id_index.get(range_id)
+            if position is None:
+                return tuple()
+
+            return self._read_row(position)
+
+    def read_by_range(self, start: int, end: int) -> tuple:
+        """
+        Reads the text range from the database with exactly the given start and end and returns a tuple.
+        The tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Parameters
+        ----------
+        start: int - the integer index of the start of the text range (inclusive)
+        end: int - the integer index of the end of the text range (exclusive)
+
+        Returns
+        -------
+        tuple - the corresponding text range as a tuple. Empty if no text range matches
+        """
+        with self._cache_lock:
+            self._read_database_into_cache()
 
-        matches: ndarray = self._database_cache.loc[(self._database_cache[id_field] == range_id)].values
+            range_id: Optional[int] = self._range_index.get((int(start), int(end)))
+            if range_id is None:
+                return tuple()
 
-        if len(matches) == 0:
-            return tuple()
-        elif len(matches) == 1:
-            return tuple(matches[0])
-        else:
-            raise DatabaseEntryError(f"More than one entry found for range_id: {range_id}")
+            return self._read_row(self._id_index[range_id])
+
+    def read_overlapping(self, start: int, end: int) -> ndarray:
+        """
+        Reads all text ranges that share at least one character index with the given range.
+        Ranges are half-open, so a range overlaps the queried range when range start < end and start < range end.
+        Each tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Parameters
+        ----------
+        start: int - the integer index of the start of the queried range (inclusive)
+        end: int - the integer index of the end of the queried range (exclusive)
+
+        Returns
+        -------
+        ndarray[tuple[int]] - the overlapping text ranges, ordered by start
+        """
+        with self._cache_lock:
+            self._read_database_into_cache()
+            # Queued ranges are held in _unindexed_positions while the interval index exists, so they are only
+            # appended to the cache when the index has to be built
+            if self._interval_index is None:
+                self._flush_pending_rows()
+
+            start, end = int(start), int(end)
+            positions: ndarray = self._get_interval_index().overlapping(start, end)
+            if len(self._unindexed_positions) == 0:
+                return self._database_cache.values[positions]
+
+            # Ranges changed since the index was built are dropped from its results and checked against their
+            # current start and end instead
+            cache_values: ndarray = self._database_cache.values
+            cache_length: int = len(cache_values)
+            matches: list[tuple[int, tuple]] = [(int(position), tuple(cache_values[position])) for position in positions
+                                                if position not in self._unindexed_positions]
+            for position in self._unindexed_positions:
+                row = cache_values[position] if position < cache_length else \
+                    self._pending_rows[position - cache_length]
+                if (row[1] < end) and (start < row[2]):
+                    matches.append((position, tuple(row)))
+            matches.sort(key=lambda match: (match[1][1], match[0]))
+            field_count: int = len(TextRangeCSVRepository.REQUIRED_FIELDS)
+            return asarray([row for _, row in matches], dtype=int).reshape(-1, field_count)
+
+    def read_containing(self, index: int) -> ndarray:
+        """
+        Reads all text ranges that contain the given character index, where range start <= index < range end.
+        Each tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Parameters
+        ----------
+        index: int - the integer index of the character
+
+        Returns
+        -------
+        ndarray[tuple[int]] - the text ranges containing the index, ordered by start
+        """
+        return self.read_overlapping(index, index + 1)
 
     def create(self, start: int, end: int) -> int:
         """
         Creates a new text range in the database with the provided start and end ranges.
-        Returns the integer id of the new text range. IDs automatically increment by 1 from the max ID
+        Returns the integer id of the new text range. IDs automatically increment by 1 from the largest id assigned
         Parameters
         ----------
         start: int - the integer index of the start of the text range (inclusive)
-        end: int - the integer index of the end of the text range (inclusive)
+        end: int - the integer index of the end of the text range (exclusive)
 
         Returns
         -------
         int - The integer id of the new text range
         """
         id_field = TextRangeCSVRepository.RANGE_ID_FIELD
-        start_field = TextRangeCSVRepository.RANGE_START_FIELD
-        end_field = TextRangeCSVRepository.RANGE_END_FIELD
 
-        self._read_database_into_cache()
+        with self._cache_lock:
+            self._read_database_into_cache()
 
-        matches: ndarray = self._database_cache.loc[
-            ((self._database_cache[start_field] == start) &
-             (self._database_cache[end_field] == end)), [id_field]].values
+            existing_id: Optional[int] = self._range_index.get((int(start), int(end)))
+            if existing_id is not None:
+                return existing_id
 
-        if len(matches) == 1:
-            return int(matches.item(0))
-        elif len(matches) > 1:
-            raise DatabaseEntryError(f"More than one entry found for text range with start: {start} and end: {end}")
+            new_id: int = self._next_id
+            self._next_id += 1
 
-        existing_ids: ndarray = self._database_cache[id_field]
-        new_id: int = 1
-        if len(existing_ids) > 0:
-            new_id = int(existing_ids.max()) + 1
+            new_entry = [new_id, start, end]
 
-        new_entry = [new_id, start, end]
+            position: int = self._append_row(new_entry)
+            self._id_index[new_id] = position
+            self._range_index[(int(start), int(end))] = new_id
+            self._mark_unindexed([position])
 
-        if len(self._database_cache.index) > 0:
-            self._database_cache.loc[max(self._database_cache.index) + 1] = new_entry
-        else:
-            self._database_cache.loc[len(self._database_cache)] = new_entry
+            self._log_change(WriteBehindCache.PUT_RECORD, [new_entry])
+            self._mark_dirty()
 
-        self._write_cache_to_database()
+            return new_id
 
-        return new_id
+    def create_many(self, starts: ndarray | list[int], ends: ndarray | list[int]) -> ndarray:
+        """
+        Creates new text ranges in the database in bulk, writing the database once.
+        Ranges that already exist, or that are repeated within the provided ranges, are not duplicated.
+        New IDs are assigned in order of first appearance, incrementing by 1 from the largest id assigned.
+        Parameters
+        ----------
+        starts: ndarray[int] - the integer indexes of the start of the text ranges (inclusive)
+        ends: ndarray[int] - the integer indexes of the end of the text ranges (exclusive). Same length as starts
+
+        Returns
+        -------
+        ndarray[int] - the integer id of the text range for each provided start and end, in the provided order
+        """
+        id_field = TextRangeCSVRepository.RANGE_ID_FIELD
+        start_field = TextRangeCSVRepository.RANGE_START_FIELD
+        end_field = TextRangeCSVRepository.RANGE_END_FIELD
+
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
+
+            ranges_df = DataFrame(column_stack([asarray(starts, dtype=int), asarray(ends, dtype=int)]),
+                                  columns=[start_field, end_field])
+            unique_ranges = ranges_df.drop_duplicates(ignore_index=True)
+            # Hash join of the provided ranges against the existing ranges
+            unique_ranges = unique_ranges.merge(self._database_cache, on=[start_field, end_field], how='left')
+            is_new = unique_ranges[id_field].isna().values
+
+            if is_new.any():
+                # The merge leaves the ids as floats, with NaN for new ranges, so the id column is rebuilt as ints
+                first_id: int = self._next_id
+                unique_ids: ndarray = unique_ranges[id_field].fillna(0).values.astype(int)
+                unique_ids[is_new] = arange(first_id, first_id + is_new.sum())
+                unique_ranges[id_field] = unique_ids
+                self._next_id = first_id + int(is_new.sum())
+
+                new_entries = unique_ranges.loc[is_new, TextRangeCSVRepository.REQUIRED_FIELDS]
+                new_entries = new_entries.astype(TextRangeCSVRepository.FIELD_DTYPES)
+                first_position: int = len(self._database_cache)
+                self._database_cache = concat([self._database_cache, new_entries], ignore_index=True)
+                self._id_index.update({int(new_id): first_position + offset
+                                       for offset, new_id in enumerate(new_entries[id_field].values)})
+                self._range_index.update({(int(start), int(end)): int(new_id)
+                                          for new_id, start, end in new_entries.values})
+                self._mark_unindexed(list(range(first_position, len(self._database_cache))))
+                self._log_change(WriteBehindCache.PUT_RECORD, new_entries.values.tolist())
+                self._mark_dirty()
+
+            range_ids = ranges_df.merge(unique_ranges, on=[start_field, end_field], how='left')[id_field]
+            return range_ids.values.astype(int)
 
     def update(self, range_id: int, start: int, end: int) -> bool:
         """
@@ -162,27 +370,38 @@ class TextRangeCSVRepository:
         -------
         bool - True if the operation succeeds, False if the operation fails or the text range is not found.
         """
-        id_field = TextRangeCSVRepository.RANGE_ID_FIELD
         start_field = TextRangeCSVRepository.RANGE_START_FIELD
         end_field = TextRangeCSVRepository.RANGE_END_FIELD
 
-        self._read_database_into_cache()
+        with self._cache_lock:
+            self._read_database_into_cache()
+            self._flush_pending_rows()
 
-        matches = self._database_cache.loc[(self._database_cache[id_field] == range_id)].values
+            position: Optional[int] = self._id_index.get(range_id)
+            if position is None:
+                return False
 
-        if len(matches) == 0:
-            return False
-        elif len(matches) == 1:
-            self._database_cache.loc[self._database_cache[id_field] == range_id, [start_field, end_field]] = [start, end]
+            _, old_start, old_end = self._database_cache.iloc[position].values
+            self._range_index.pop((int(old_start), int(old_end)), None)
+            self._range_index[(int(start), int(end))] = int(range_id)
+            self._mark_unindexed([position])
+            self._database_cache.iat[position, self._database_cache.columns.get_loc(start_field)] = start
+            self._database_cache.iat[position, self._database_cache.columns.get_loc(end_field)] = end
 
-            self._write_cache_to_database()
+            self._log_change(WriteBehindCache.PUT_RECORD, [self._database_cache.iloc[position].tolist()])
+            self._mark_dirty()
             return True
-        else:
-            raise DatabaseEntryError(f"More than one entry found for range_id: {range_id}")
 
     def clear_database(self):
         """
         Deletes all contents from the database, except for column headers
         """
-        self._database_cache = self._database_cache.iloc[0:0]
-        self._write_cache_to_database()
+        with self._cache_lock:
+            self._database_cache = self._database_cache.iloc[0:0]
+            self._pending_rows = []
+            self._id_index = {}
+            self._range_index = {}
+            self._discard_interval_index()
+            self._next_id = 1
+            self._log_change(WriteBehindCache.CLEAR_RECORD)
+            self._mark_dirty()
@@ -0,0 +1,351 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from threading import RLock
+from typing import Optional
+
+from numpy import ndarray, array, empty, asarray, full
+
+from annotation.model.database.DatabaseExceptions import DatabaseFieldError
+
+
+class TextRangeSQLiteRepository:
+    """
+    SQLite implementation of the text range repository. Provides the same methods as TextRangeCSVRepository.
+    Rows are indexed by range id and by (start, end), so single row operations do not scan the table.
+    Range ids are AUTOINCREMENT ids, so the ids of removed ranges are never reused.
+    The database runs in WAL mode and every write is committed in a transaction.
+    Writes made within the batch() context manager are committed together in a single transaction.
+    The connection is shared between threads, so every statement and transaction holds the repository lock.
+    """
+    TABLE_NAME: str = "text_ranges"
+    RANGE_ID_FIELD: str = "range_id"
+    RANGE_START_FIELD: str = "start"
+    RANGE_END_FIELD: str = "end"
+    FIELD_DTYPES: dict = {RANGE_ID_FIELD: int, RANGE_START_FIELD: int, RANGE_END_FIELD: int}
+    REQUIRED_FIELDS: list[str, ...] = [field for field in FIELD_DTYPES.keys()]
+
+    def __init__(self, database_path: Path):
+        self._database_path: Path = database_path
+        self._batch_depth: int = 0
+        self._lock: RLock = RLock()
+
+        # If file does not exist, create parent directories
+        if not os.path.exists(database_path):
+            database_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(database_path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+
+        # Validate the file can be opened with read and write permissions
+        if not os.access(database_path, os.R_OK):
+            raise PermissionError(f"No permissions to read the file: {database_path}")
+        if not os.access(database_path, os.W_OK):
+            raise PermissionError(f"No permissions to write to the file: {database_path}")
+
+        self._create_table()
+        self._validate_database_fields()
+
+    def _create_table(self):
+        table = TextRangeSQLiteRepository.TABLE_NAME
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                                 f"\"{TextRangeSQLiteRepository.RANGE_ID_FIELD}\" INTEGER PRIMARY KEY AUTOINCREMENT, "
+                                 f"\"{TextRangeSQLiteRepository.RANGE_START_FIELD}\" INTEGER NOT NULL, "
+                                 f"\"{TextRangeSQLiteRepository.RANGE_END_FIELD}\" INTEGER NOT NULL)")
+        self._connection.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_range_idx ON {table} ("
+                                 f"\"{TextRangeSQLiteRepository.RANGE_START_FIELD}\", "
+                                 f"\"{TextRangeSQLiteRepository.RANGE_END_FIELD}\")")
+
+    def _validate_database_fields(self):
+        """
+        Checks the database contains all the required fields.
+        Additional unnecessary fields are ignored. Does not validate the data itself.
+        If all fields are present, returns None. If a field is missing, the method raises a DatabaseFieldError
+        """
+        table_info = self._connection.execute(f"PRAGMA table_info({TextRangeSQLiteRepository.TABLE_NAME})").fetchall()
+        fieldnames: list[str] = [column[1] for column in table_info]
+        for field in TextRangeSQLiteRepository.REQUIRED_FIELDS:
+            if field not in fieldnames:
+                raise DatabaseFieldError(f"Missing {field} column from text range database")
+
+    @staticmethod
+    def _select_columns() -> str:
+        return ", ".join([f"\"{field}\"" for field in TextRangeSQLiteRepository.REQUIRED_FIELDS])
+
+    @staticmethod
+    def _to_array(rows: list[tuple]) -> ndarray:
+        if len(rows) == 0:
+            return empty((0, len(TextRangeSQLiteRepository.REQUIRED_FIELDS)), dtype=int)
+        return array(rows, dtype=int)
+
+    def _fetchall(self, query: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def _fetchone(self, query: str, parameters: tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchone()
+
+    def _load_temp_table(self, table: str, columns: list[str], rows: list[tuple]):
+        # Bulk operations join the provided rows against the table indexes, rather than reading the whole table
+        self._connection.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} ({', '.join(columns)})")
+        self._connection.execute(f"DELETE FROM {table}")
+        self._connection.executemany(f"INSERT INTO {table} VALUES ({', '.join(['?'] * len(columns))})", rows)
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups all writes made within the context into a single transaction.
+        The transaction is rolled back if an exception is raised within the context.
+        Other threads are blocked from the connection until the transaction ends
+        """
+        with self._lock:
+            if self._batch_depth == 0:
+                self._connection.execute("BEGIN")
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._connection.execute("ROLLBACK")
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._connection.execute("COMMIT")
+
+    def read_all(self) -> ndarray:
+        """
+        Reads all text ranges from the database and returns an array of tuples.
+        Each tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Returns
+        -------
+        ndarray[tuple[int]] - all text ranges found in the database
+        """
+        id_field = TextRangeSQLiteRepository.RANGE_ID_FIELD
+        rows: list[tuple] = self._fetchall(
+            f"SELECT {self._select_columns()} FROM {TextRangeSQLiteRepository.TABLE_NAME} "
+            f"ORDER BY \"{id_field}\"")
+
+        return self._to_array(rows)
+
+    def read_by_id(self, range_id: int) -> tuple:
+        """
+        Reads the text range from the database corresponding to the given range_id and returns a tuple.
+        The tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Parameters
+        ----------
+        range_id: int - integer id of the sequence
+
+        Returns
+        -------
+        tuple - the corresponding text range as a tuple
+        """
+        id_field = TextRangeSQLiteRepository.RANGE_ID_FIELD
+        row: Optional[tuple] = self._fetchone(
+            f"SELECT {self._select_columns()} FROM {TextRangeSQLiteRepository.TABLE_NAME} "
+            f"WHERE \"{id_field}\" = ?", (int(range_id),))
+
+        if row is None:
+            return tuple()
+        return tuple(row)
+
+    def read_by_range(self, start: int, end: int) -> tuple:
+        """
+        Reads the text range from the database with exactly the given start and end and returns a tuple.
+        The tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Parameters
+        ----------
+        start: int - the integer index of the start of the text range (inclusive)
+        end: int - the integer index of the end of the text range (exclusive)
+
+        Returns
+        -------
+        tuple - the corresponding text range as a tuple. Empty if no text range matches
+        """
+        start_field = TextRangeSQLiteRepository.RANGE_START_FIELD
+        end_field = TextRangeSQLiteRepository.RANGE_END_FIELD
+        row: Optional[tuple] = self._fetchone(
+            f"SELECT {self._select_columns()} FROM {TextRangeSQLiteRepository.TABLE_NAME} "
+            f"WHERE \"{start_field}\" = ? AND \"{end_field}\" = ?", (int(start), int(end)))
+
+        if row is None:
+            return tuple()
+        return tuple(row)
+
+    def read_overlapping(self, start: int, end: int) -> ndarray:
+        """
+        Reads all text ranges that share at least one character index with the given range.
+        Ranges are half-open, so a range overlaps the queried range when range start < end and start < range end.
+        Each tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Parameters
+        ----------
+        start: int - the integer index of the start of the queried range (inclusive)
+        end: int - the integer index of the end of the queried range (exclusive)
+
+        Returns
+        -------
+        ndarray[tuple[int]] - the overlapping text ranges, ordered by start
+        """
+        id_field = TextRangeSQLiteRepository.RANGE_ID_FIELD
+        start_field = TextRangeSQLiteRepository.RANGE_START_FIELD
+        end_field = TextRangeSQLiteRepository.RANGE_END_FIELD
+        # The (start, end) index bounds the scan to ranges starting before the end of the queried range
+        rows: list[tuple] = self._fetchall(
+            f"SELECT {self._select_columns()} FROM {TextRangeSQLiteRepository.TABLE_NAME} "
+            f"WHERE \"{start_field}\" < ? AND \"{end_field}\" > ? "
+            f"ORDER BY \"{start_field}\", \"{id_field}\"", (int(end), int(start)))
+
+        return self._to_array(rows)
+
+    def read_containing(self, index: int) -> ndarray:
+        """
+        Reads all text ranges that contain the given character index, where range start <= index < range end.
+        Each tuple contains:
+         - integer id of the range
+         - integer index of the start of the text range (inclusive)
+         - integer index of the end of the text range (exclusive)
+        Parameters
+        ----------
+        index: int - the integer index of the character
+
+        Returns
+        -------
+        ndarray[tuple[int]] - the text ranges containing the index, ordered by start
+        """
+        return self.read_overlapping(index, index + 1)
+
+    def create(self, start: int, end: int) -> int:
+        """
+        Creates a new text range in the database with the provided start and end ranges.
+        Returns the integer id of the new text range. IDs automatically increment by 1 from the largest id assigned
+        Parameters
+        ----------
+        start: int - the integer index of the start of the text range (inclusive)
+        end: int - the integer index of the end of the text range (exclusive)
+
+        Returns
+        -------
+        int - The integer id of the new text range
+        """
+        table = TextRangeSQLiteRepository.TABLE_NAME
+        id_field = TextRangeSQLiteRepository.RANGE_ID_FIELD
+        start_field = TextRangeSQLiteRepository.RANGE_START_FIELD
+        end_field = TextRangeSQLiteRepository.RANGE_END_FIELD
+
+        with self.batch():
+            match: Optional[tuple] = self._connection.execute(
+                f"SELECT \"{id_field}\" FROM {table} WHERE \"{start_field}\" = ? AND \"{end_field}\" = ?",
+                (int(start), int(end))).fetchone()
+            if match is not None:
+                return int(match[0])
+
+            cursor = self._connection.execute(f"INSERT INTO {table} (\"{start_field}\", \"{end_field}\") VALUES (?, ?)",
+                                              (int(start), int(end)))
+
+        return int(cursor.lastrowid)
+
+    def create_many(self, starts: ndarray | list[int], ends: ndarray | list[int]) -> ndarray:
+        """
+        Creates new text ranges in the database in bulk, within a single transaction.
+        Ranges that already exist, or that are repeated within the provided ranges, are not duplicated.
+        New IDs are assigned in order of first appearance, incrementing by 1 from the largest id assigned.
+        Parameters
+        ----------
+        starts: ndarray[int] - the integer indexes of the start of the text ranges (inclusive)
+        ends: ndarray[int] - the integer indexes of the end of the text ranges (exclusive). Same length as starts
+
+        Returns
+        -------
+        ndarray[int] - the integer id of the text range for each provided start and end, in the provided order
+        """
+        table = TextRangeSQLiteRepository.TABLE_NAME
+        id_field = TextRangeSQLiteRepository.RANGE_ID_FIELD
+        start_field = TextRangeSQLiteRepository.RANGE_START_FIELD
+        end_field = TextRangeSQLiteRepository.RANGE_END_FIELD
+
+        starts = asarray(starts, dtype=int)
+        ends = asarray(ends, dtype=int)
+        provided_ranges = list(zip(range(len(starts)), starts.tolist(), ends.tolist()))
+
+        range_ids: ndarray = full(len(starts), -1, dtype=int)
+        with self.batch():
+            self._load_temp_table("provided_ranges", ["position INTEGER PRIMARY KEY", "range_start INTEGER",
+                                                      "range_end INTEGER"], provided_ranges)
+            # Ranges that already exist are found through the unique range index. Repeated ranges are inserted once
+            self._connection.execute(
+                f"INSERT INTO {table} (\"{start_field}\", \"{end_field}\") "
+                f"SELECT range_start, range_end FROM provided_ranges WHERE NOT EXISTS (SELECT 1 FROM {table} "
+                f"WHERE \"{start_field}\" = provided_ranges.range_start "
+                f"AND \"{end_field}\" = provided_ranges.range_end) "
+                f"GROUP BY range_start, range_end ORDER BY MIN(position)")
+            matches: list[tuple] = self._connection.execute(
+                f"SELECT provided_ranges.position, {table}.\"{id_field}\" FROM provided_ranges "
+                f"JOIN {table} ON {table}.\"{start_field}\" = provided_ranges.range_start "
+                f"AND {table}.\"{end_field}\" = provided_ranges.range_end").fetchall()
+
+        if len(matches) > 0:
+            positions, ids = array(matches, dtype=int).T
+            range_ids[positions] = ids
+        return range_ids
+
+    def update(self, range_id: int, start: int, end: int) -> bool:
+        """
+        Updates the attributes for the text range in the database with the given range_id.
+        Returns True if the operation succeeds, False if the operation fails or the text range is not found.
+        Parameters
+        ----------
+        range_id: int - integer id of the text range
+        start: int - the integer index of the start of the text range (inclusive)
+        end: int - the integer index of the end of the text range (exclusive)
+
+        Returns
+        -------
+        bool - True if the operation succeeds, False if the operation fails or the text range is not found.
+        """
+        id_field = TextRangeSQLiteRepository.RANGE_ID_FIELD
+        start_field = TextRangeSQLiteRepository.RANGE_START_FIELD
+        end_field = TextRangeSQLiteRepository.RANGE_END_FIELD
+
+        with self.batch():
+            cursor = self._connection.execute(
+                f"UPDATE {TextRangeSQLiteRepository.TABLE_NAME} SET \"{start_field}\" = ?, \"{end_field}\" = ? "
+                f"WHERE \"{id_field}\" = ?", (int(start), int(end), int(range_id)))
+
+        return cursor.rowcount > 0
+
+    def clear_database(self):
+        """
+        Deletes all contents from the database, except for column headers
+        """
+        with self.batch():
+            self._connection.execute(f"DELETE FROM {TextRangeSQLiteRepository.TABLE_NAME}")
+            self._connection.execute("DELETE FROM sqlite_sequence WHERE name = ?",
+                                     (TextRangeSQLiteRepository.TABLE_NAME,))
+
+    def commit(self):
+        """
+        Provided for parity with the CSV repositories. Every write is already committed in its own transaction
+        """
+        return
+
+    def close(self):
+        """
+        Closes the database connection. The repository cannot be used once closed
+        """
+        with self._lock:
+            self._connection.close()
@@ -1,15 +1,34 @@
+import mmap
 import os
 from pathlib import Path
+from typing import Optional
 
-from annotation.model.database.DatabaseExceptions import DatabaseFileSizeError
+from numpy import ndarray, frombuffer, flatnonzero, concatenate, empty, uint8
+
+from annotation.model.database.repositories.FileLock import FileLock
 
 
 class TextTXTRepository:
-    MAX_SIZE_BYTES: int = 2000000
+    """
+    Stores the text as a UTF-8 file, which is memory-mapped rather than read into memory.
+    A sparse index holds the byte offset of every INDEX_INTERVAL-th character, so a character index is located by
+    decoding at most INDEX_INTERVAL characters, regardless of the size of the text.
+    """
+    ENCODING: str = "utf-8"
+    # Number of characters between consecutive entries of the character to byte offset index
+    INDEX_INTERVAL: int = 1024
+    # Maximum number of bytes used to encode a single character in UTF-8
+    MAX_CHAR_BYTES: int = 4
+    # Number of bytes scanned at a time when building the index, and characters encoded at a time when writing
+    CHUNK_SIZE: int = 1 << 22
 
     def __init__(self, text_txt_path: Path):
         self._database_path: Path = text_txt_path
-        self._database_cache: str = ""
+        self._text_map: Optional[mmap.mmap] = None
+        self._byte_count: int = 0
+        self._char_count: int = 0
+        # Byte offset of the characters at indexes 0, INDEX_INTERVAL, 2 * INDEX_INTERVAL, ...
+        self._char_offsets: ndarray = empty(0, dtype=int)
         self._cache_updated: bool = False
 
         # If file does not exist, create parent directories and file with no content
@@ -23,26 +42,81 @@ class TextTXTRepository:
         if not os.access(text_txt_path, os.W_OK):
             raise PermissionError(f"No permissions to write to the file: {text_txt_path}")
 
-        # Validate the file is not too large to be read into memory
-        if os.path.getsize(text_txt_path) > TextTXTRepository.MAX_SIZE_BYTES:
-            raise DatabaseFileSizeError(f"Database file is too large: {text_txt_path}")
-
         self._read_database_into_cache()
 
     def _read_database_into_cache(self):
         if self._cache_updated:
             return
 
-        with open(self._database_path) as f:
-            self._database_cache = f.read()
+        self._close_text_map()
+        self._byte_count = os.path.getsize(self._database_path)
+        # An empty file cannot be memory-mapped
+        if self._byte_count > 0:
+            with open(self._database_path, 'rb') as f:
+                self._text_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._build_char_offsets()
 
         self._cache_updated = True
 
-    def _write_cache_to_database(self):
-        with open(self._database_path, 'w') as f:
-            f.write(self._database_cache)
-
-        self._cache_updated = True
+    def _close_text_map(self):
+        if self._text_map is not None:
+            self._text_map.close()
+            self._text_map = None
+
+    def _build_char_offsets(self):
+        # In UTF-8, every byte that is not a continuation byte (0b10xxxxxx) starts a character
+        interval: int = TextTXTRepository.INDEX_INTERVAL
+        char_offsets: list[ndarray] = []
+        char_count: int = 0
+        for chunk_start in range(0, self._byte_count, TextTXTRepository.CHUNK_SIZE):
+            chunk_size: int = min(TextTXTRepository.CHUNK_SIZE, self._byte_count - chunk_start)
+            chunk: ndarray = frombuffer(self._text_map, dtype=uint8, count=chunk_size, offset=chunk_start)
+            char_starts: ndarray = flatnonzero((chunk & 0xC0) != 0x80)
+            del chunk
+
+            first_indexed: int = (-char_count) % interval
+            char_offsets.append(char_starts[first_indexed::interval] + chunk_start)
+            char_count += len(char_starts)
+
+        self._char_count = char_count
+        self._char_offsets = concatenate(char_offsets) if len(char_offsets) > 0 else empty(0, dtype=int)
+
+    def _get_byte_offset(self, char_index: int) -> int:
+        """
+        Returns the byte offset of the character at the given index, or the size of the file if the index is the
+        end index of the text
+        """
+        if char_index >= self._char_count:
+            return self._byte_count
+
+        interval: int = TextTXTRepository.INDEX_INTERVAL
+        indexed_char: int = char_index // interval
+        byte_offset: int = int(self._char_offsets[indexed_char])
+        remaining_chars: int = char_index - (indexed_char * interval)
+        if remaining_chars == 0:
+            return byte_offset
+
+        window_size: int = min((remaining_chars + 1) * TextTXTRepository.MAX_CHAR_BYTES,
+                               self._byte_count - byte_offset)
+        window: ndarray = frombuffer(self._text_map, dtype=uint8, count=window_size, offset=byte_offset)
+        char_starts: ndarray = flatnonzero((window & 0xC0) != 0x80)
+
+        return byte_offset + int(char_starts[remaining_chars])
+
+    def _write_cache_to_database(self, text: str):
+        # Written to a temporary file first, so an interrupted write does not corrupt the database.
+        # The text is encoded in chunks so the whole encoded text is never held in memory at once
+        temp_path: Path = self._database_path.with_name(self._database_path.name + ".tmp")
+        with FileLock(self._database_path):
+            with open(temp_path, 'wb') as f:
+                for chunk_start in range(0, len(text), TextTXTRepository.CHUNK_SIZE):
+                    chunk: str = text[chunk_start:chunk_start + TextTXTRepository.CHUNK_SIZE]
+                    f.write(chunk.encode(TextTXTRepository.ENCODING))
+
+            self._close_text_map()
+            os.replace(temp_path, self._database_path)
+        self._cache_updated = False
+        self._read_database_into_cache()
 
     def read_all(self) -> str:
         """
@@ -50,7 +124,9 @@ class TextTXTRepository:
         """
         self._read_database_into_cache()
 
-        return self._database_cache
+        if self._text_map is None:
+            return ""
+        return self._text_map[:].decode(TextTXTRepository.ENCODING)
 
     def read_by_range(self, start: int, end: int) -> str:
         """
@@ -77,12 +153,13 @@ class TextTXTRepository:
             raise ValueError(f"end argument cannot be greater than largest index in text file. "
                              f"Provided end argument: {end}, largest index: {largest_index}")
 
-        if end == 0:
+        if end == start:
             return ""
 
-        self._read_database_into_cache()
+        start_offset: int = self._get_byte_offset(start)
+        end_offset: int = self._get_byte_offset(end)
 
-        return self._database_cache[start:end]
+        return self._text_map[start_offset:end_offset].decode(TextTXTRepository.ENCODING)
 
     def get_end_index(self) -> int:
         """
@@ -94,7 +171,7 @@ class TextTXTRepository:
         """
         self._read_database_into_cache()
 
-        return len(self._database_cache)
+        return self._char_count
 
     def write_file(self, text: str):
         """
@@ -103,12 +180,17 @@ class TextTXTRepository:
         ----------
         text: str - Any string, can be empty.
         """
-        self._database_cache = text
-        self._write_cache_to_database()
+        self._write_cache_to_database(text)
 
     def clear_database(self):
         """
         Deletes all contents from the text database
         """
-        self._database_cache = ""
-        self._write_cache_to_database()
+        self._write_cache_to_database("")
+
+    def close(self):
+        """
+        Releases the memory map of the text. The text is mapped again when next read
+        """
+        self._close_text_map()
+        self._cache_updated = False
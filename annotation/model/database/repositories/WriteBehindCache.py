@@ -0,0 +1,294 @@
+import atexit
+import json
+import os
+from abc import ABC, abstractmethod
+from io import TextIOWrapper
+from pathlib import Path
+from threading import RLock, Timer
+from typing import Optional
+from weakref import WeakSet
+
+from pandas import DataFrame, concat
+
+from annotation.model.database.DatabaseExceptions import DatabaseEntryError
+from annotation.model.database.repositories.FileLock import FileLock
+
+
+class WriteBehindCache(ABC):
+    """
+    Base class for repositories that hold their database in an in-memory cache.
+    Subclasses provide a _database_cache DataFrame with the REQUIRED_FIELDS columns (the id field first),
+    an _id_index mapping each id to its row position, and the _read_database_into_cache and
+    _write_cache_to_database hooks.
+    Rows created one at a time are queued and appended to the cache in a single concat when the cache is next used
+    as a whole, as enlarging the DataFrame by a row copies every column.
+
+    Every change to the cache is appended to a write-ahead log and the cache is marked dirty.
+    When the cache is read from the database, the log is replayed on top of it to recover changes that were not
+    yet written. Dirty changes are compacted into the database, and the log emptied, once no further changes have been
+    made for flush_delay seconds, when commit() or close() is called, or when the interpreter exits.
+    The log starts with the size and modification time of the database it applies to, so a log left behind
+    by an interrupted compaction is not replayed onto the compacted database.
+    The log is read and appended to while holding the database FileLock, as processes sharing the database also
+    share its log.
+    Reads take the cache lock as well as writes, since a commit on the flush timer thread may compact the cache and
+    rebuild its indexes.
+    """
+    DEFAULT_FLUSH_DELAY: float = 2.0
+    LOG_SUFFIX: str = ".wal"
+
+    SNAPSHOT_RECORD: str = "snapshot"
+    PUT_RECORD: str = "put"
+    CLEAR_RECORD: str = "clear"
+
+    # Every cache not yet closed, committed by a single exit hook. Held weakly, so the set does not keep caches alive
+    _open_caches: WeakSet = WeakSet()
+
+    def __init__(self, database_path: Path, flush_delay: Optional[float] = DEFAULT_FLUSH_DELAY):
+        """
+        Parameters
+        ----------
+        database_path: Path - path of the database the cache is written to. The write-ahead log is kept alongside it
+        flush_delay: Optional[float] - seconds without changes before dirty changes are written.
+        If None, changes are only written on commit() and at exit
+        """
+        self._snapshot_path: Path = database_path
+        self._log_path: Path = database_path.with_name(database_path.name + WriteBehindCache.LOG_SUFFIX)
+        self._log_file: Optional[TextIOWrapper] = None
+        # The database signature recorded at the start of the log, if known
+        self._log_signature: Optional[list[int]] = None
+        self._replaying_log: bool = False
+        self._flush_delay: Optional[float] = flush_delay
+        # Guards the cache against being written by the flush timer while it is being modified
+        self._cache_lock: RLock = RLock()
+        self._dirty: bool = False
+        self._flush_timer: Optional[Timer] = None
+        # Rows queued by _append_row, which follow the rows of the cache in order
+        self._pending_rows: list[list] = []
+
+        WriteBehindCache._open_caches.add(self)
+
+    @staticmethod
+    def _commit_open_caches():
+        for cache in list(WriteBehindCache._open_caches):
+            cache.commit()
+
+    @staticmethod
+    def _to_json_value(value):
+        # Cache values are numpy scalars, which json cannot serialise directly
+        return value.item()
+
+    @abstractmethod
+    def _read_database_into_cache(self):
+        """
+        Reads the database into the cache, then replays the write-ahead log on top of it
+        """
+        pass
+
+    @abstractmethod
+    def _write_cache_to_database(self):
+        """
+        Writes the whole cache to the database. Called by commit() while the database is locked
+        """
+        pass
+
+    def _snapshot_signature(self) -> list[int]:
+        snapshot_stat = os.stat(self._snapshot_path)
+        return [snapshot_stat.st_size, snapshot_stat.st_mtime_ns]
+
+    def _write_log_record(self, record_type: str, values: Optional[list] = None):
+        self._log_file.write(json.dumps([record_type, values], default=WriteBehindCache._to_json_value) + '\n')
+        self._log_file.flush()
+
+    def _read_log_signature(self) -> Optional[list[int]]:
+        with open(self._log_path, 'r', encoding='utf-8') as log_f:
+            try:
+                record_type, values = json.loads(log_f.readline())
+            except (json.JSONDecodeError, ValueError):
+                return None
+        if record_type != WriteBehindCache.SNAPSHOT_RECORD:
+            return None
+        return values
+
+    def _log_change(self, record_type: str, values: Optional[list] = None):
+        """
+        Appends a change record to the write-ahead log. Does nothing while the log is being replayed.
+        Another process sharing the database may have compacted it, and emptied the log, since the last append.
+        So the database signature is checked against the start of the log before each append, and a log that is
+        empty or was written against a previous database is restarted with the current signature
+        """
+        if self._replaying_log:
+            return
+        if self._log_file is None:
+            self._log_file = open(self._log_path, 'a', encoding='utf-8')
+            WriteBehindCache._open_caches.add(self)
+
+        with FileLock(self._snapshot_path):
+            signature: list[int] = self._snapshot_signature()
+            log_size: int = os.fstat(self._log_file.fileno()).st_size
+            if (log_size > 0) and (signature != self._log_signature):
+                self._log_signature = self._read_log_signature()
+            if (log_size == 0) or (signature != self._log_signature):
+                self._truncate_log()
+                self._write_log_record(WriteBehindCache.SNAPSHOT_RECORD, signature)
+                self._log_signature = signature
+
+            self._write_log_record(record_type, values)
+
+    def _replay_log(self):
+        """
+        Applies each record in the write-ahead log to the cache, in the order they were logged.
+        If the log was written against a different database than the current one, the log has already been
+        compacted and is discarded instead.
+        """
+        if not os.path.exists(self._log_path):
+            return
+
+        self._replaying_log = True
+        try:
+            # The cache lock is taken before the file lock, in the same order as commit()
+            with self._cache_lock, FileLock(self._snapshot_path), open(self._log_path, 'r', encoding='utf-8') as log_f:
+                for line_num, line in enumerate(log_f):
+                    try:
+                        record_type, values = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A partial record from an interrupted write is the end of the usable log
+                        break
+                    if record_type == WriteBehindCache.SNAPSHOT_RECORD:
+                        if (line_num == 0) and (values != self._snapshot_signature()):
+                            self._truncate_log()
+                            return
+                        continue
+                    self._apply_log_record(record_type, values)
+        finally:
+            self._replaying_log = False
+
+    def _apply_log_record(self, record_type: str, values: Optional[list]):
+        if record_type == WriteBehindCache.PUT_RECORD:
+            self._put_rows(values)
+        elif record_type == WriteBehindCache.CLEAR_RECORD:
+            self.clear_database()
+        else:
+            raise DatabaseEntryError(f"Unknown record type in write-ahead log: {record_type}")
+
+    def _append_row(self, row: list) -> int:
+        """
+        Queues a new row to be appended to the cache. Must be called while holding the cache lock
+
+        Returns
+        -------
+        int - the position the row will have in the cache
+        """
+        self._pending_rows.append(row)
+        return len(self._database_cache) + len(self._pending_rows) - 1
+
+    def _flush_pending_rows(self):
+        """
+        Appends the queued rows to the cache. Called before the cache is read as a whole or changed in place
+        """
+        with self._cache_lock:
+            if len(self._pending_rows) == 0:
+                return
+            new_entries = DataFrame(self._pending_rows, columns=type(self).REQUIRED_FIELDS).astype(
+                type(self).FIELD_DTYPES)
+            self._database_cache = concat([self._database_cache, new_entries], ignore_index=True)
+            self._pending_rows = []
+
+    def _read_row(self, position: int) -> tuple:
+        """
+        Returns the row at the given position of the cache, without appending the queued rows
+        """
+        with self._cache_lock:
+            cache_length: int = len(self._database_cache)
+            if position < cache_length:
+                return tuple(self._database_cache.iloc[position].values)
+            return tuple(self._pending_rows[position - cache_length])
+
+    def _put_rows(self, rows: list[list]):
+        """
+        Inserts or replaces each of the given rows by their id, the first value of each row
+        """
+        required_fields: list[str] = type(self).REQUIRED_FIELDS
+        with self._cache_lock:
+            self._flush_pending_rows()
+            new_rows: list[list] = []
+            for row in rows:
+                position: Optional[int] = self._id_index.get(row[0])
+                if position is None:
+                    new_rows.append(row)
+                    continue
+                for column, value in enumerate(row):
+                    self._database_cache.iat[position, column] = value
+
+            if len(new_rows) > 0:
+                first_position: int = len(self._database_cache)
+                new_entries = DataFrame(new_rows, columns=required_fields).astype(type(self).FIELD_DTYPES)
+                self._database_cache = concat([self._database_cache, new_entries], ignore_index=True)
+                self._id_index.update({int(row[0]): first_position + offset for offset, row in enumerate(new_rows)})
+
+            self._mark_dirty()
+
+    def _truncate_log(self):
+        if self._log_file is None:
+            self._log_file = open(self._log_path, 'a', encoding='utf-8')
+        self._log_file.seek(0)
+        self._log_file.truncate()
+        self._log_signature = None
+
+    def _cancel_flush_timer(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _mark_dirty(self):
+        """
+        Records that the cache holds changes not yet written to the database and (re)starts the flush timer
+        """
+        with self._cache_lock:
+            self._dirty = True
+            self._cancel_flush_timer()
+            if self._flush_delay is not None:
+                self._flush_timer = Timer(self._flush_delay, self.commit)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def has_uncommitted_changes(self) -> bool:
+        return self._dirty
+
+    def commit(self):
+        """
+        Compacts any dirty changes in the cache into the database and empties the write-ahead log.
+        Does nothing if there are no dirty changes. The database file is locked while it is written,
+        so processes sharing the database do not interleave their writes
+        """
+        with self._cache_lock:
+            self._cancel_flush_timer()
+            if not self._dirty:
+                return
+            self._flush_pending_rows()
+            with FileLock(self._snapshot_path):
+                self._write_cache_to_database()
+                self._truncate_log()
+            self._dirty = False
+
+    def close(self):
+        """
+        Commits any dirty changes and closes the write-ahead log. A change made after closing reopens the log
+        """
+        with self._cache_lock:
+            self.commit()
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+            self._log_signature = None
+            WriteBehindCache._open_caches.discard(self)
+
+    @abstractmethod
+    def clear_database(self):
+        """
+        Deletes all contents from the database, except for column headers
+        """
+        pass
+
+
+atexit.register(WriteBehindCache._commit_open_caches)
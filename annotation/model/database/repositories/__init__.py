@@ -1,3 +1,8 @@
+from .FileLock import FileLock
+from .WriteBehindCache import WriteBehindCache
+from .IntervalIndex import IntervalIndex
 from .SequenceCSVRepository import SequenceCSVRepository
 from .TextTXTRepository import TextTXTRepository
 from .TextRangeCSVRepository import TextRangeCSVRepository
+from .SequenceSQLiteRepository import SequenceSQLiteRepository
+from .TextRangeSQLiteRepository import TextRangeSQLiteRepository
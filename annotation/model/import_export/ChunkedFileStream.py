@@ -0,0 +1,51 @@
+import zlib
+from io import RawIOBase
+from typing import Iterator, Optional
+
+
+class ChunkedFileStream(RawIOBase):
+    """
+    A read-only file object over an iterator of byte chunks. Chunks are only generated as the file is read,
+    so the whole file is never held in memory by the stream. If compress is True, the bytes read are the chunks
+    compressed in gzip format.
+    """
+    # zlib window bits value selecting the gzip container format
+    GZIP_WBITS: int = 16 + zlib.MAX_WBITS
+
+    def __init__(self, chunks: Iterator[bytes], compress: bool = False):
+        super().__init__()
+        self._chunks: Iterator[bytes] = chunks
+        self._compressor = None
+        if compress:
+            self._compressor = zlib.compressobj(wbits=ChunkedFileStream.GZIP_WBITS)
+        # The bytes generated but not yet read, starting at _buffer_offset
+        self._buffer: bytes = b""
+        self._buffer_offset: int = 0
+        self._exhausted: bool = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_bytes(self) -> bytes:
+        try:
+            chunk: bytes = next(self._chunks)
+        except StopIteration:
+            self._exhausted = True
+            if self._compressor is not None:
+                return self._compressor.flush()
+            return b""
+
+        if self._compressor is not None:
+            return self._compressor.compress(chunk)
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        while (self._buffer_offset == len(self._buffer)) and (not self._exhausted):
+            self._buffer = self._next_bytes()
+            self._buffer_offset = 0
+
+        read_count: int = min(len(buffer), len(self._buffer) - self._buffer_offset)
+        buffer[:read_count] = memoryview(self._buffer)[self._buffer_offset:self._buffer_offset + read_count]
+        self._buffer_offset += read_count
+
+        return read_count
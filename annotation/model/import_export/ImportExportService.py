@@ -1,18 +1,88 @@
-from io import BytesIO
-from typing import Callable
+from io import BytesIO, StringIO
+from tempfile import TemporaryFile
+from typing import Callable, Optional, Iterator, Iterable, BinaryIO
 
-from pandas import DataFrame, read_excel, read_csv
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font
+from openpyxl.utils import get_column_letter
+from pandas import DataFrame, read_excel, read_csv, read_parquet, read_feather
+from pandas.api.types import is_object_dtype
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from annotation.model.import_export.ChunkedFileStream import ChunkedFileStream
 
 
 class ImportExportService:
     """
     A converter between DataFrame objects and table-like file types.
-    Supported filetypes include xlsx and csv.
+    Supported filetypes include xlsx and csv, and parquet and feather when pyarrow is installed.
+    Parquet and feather files keep the column dtypes, so they are read back without parsing.
+    CSV exports, optionally gzip compressed as csv.gz, and xlsx exports can also be streamed from DataFrame chunks,
+    and every import filetype can be read in chunks of rows.
     """
+    # Compression codec of parquet and feather exports
+    ARROW_COMPRESSION: str = "zstd"
+    ENCODING: str = "utf-8"
+    # Formatting of xlsx exports, matching write_excel_formatting in llm/excel_json_converter.py
+    EXCEL_SHEET_NAME: str = "Sheet1"
+    EXCEL_HEADER_COLOUR: str = "D7E4BC"
+    EXCEL_COLUMN_WIDTH: int = 22
+    EXCEL_TEXT_COLUMN_WIDTH: int = 80
+    # Default number of rows in each chunk produced by iter_import_chunks
+    IMPORT_CHUNK_SIZE: int = 20000
+
+    @staticmethod
+    def write_excel_chunks(df_chunks: Iterable[DataFrame], file_object: BinaryIO):
+        """
+        Writes the DataFrame chunks to a single formatted xlsx sheet using a write-only workbook.
+        Rows are written out as they are added rather than kept as cell objects, so memory use does not grow with
+        the number of rows. The header row is bold with a coloured fill, and text columns are wider than the others
+
+        Parameters
+        ----------
+        df_chunks: Iterable[DataFrame] - the rows to write, in consecutive chunks with the same columns.
+        The header and column widths are taken from the first chunk
+        file_object: BinaryIO - the file the workbook is saved to
+        """
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(ImportExportService.EXCEL_SHEET_NAME)
+        header_fill = PatternFill(start_color=ImportExportService.EXCEL_HEADER_COLOUR,
+                                  end_color=ImportExportService.EXCEL_HEADER_COLOUR, fill_type='solid')
+        header_font = Font(bold=True)
+
+        is_first_chunk: bool = True
+        for df in df_chunks:
+            if is_first_chunk:
+                # Column widths must be set before any row is written
+                for col_idx, col in enumerate(df.columns, start=1):
+                    width: int = ImportExportService.EXCEL_COLUMN_WIDTH
+                    if is_object_dtype(df[col].dtype):
+                        width = ImportExportService.EXCEL_TEXT_COLUMN_WIDTH
+                    worksheet.column_dimensions[get_column_letter(col_idx)].width = width
+                header: list[WriteOnlyCell] = []
+                for col in df.columns:
+                    cell = WriteOnlyCell(worksheet, value=str(col))
+                    cell.fill = header_fill
+                    cell.font = header_font
+                    header.append(cell)
+                worksheet.append(header)
+                is_first_chunk = False
+            for row in df.itertuples(index=False, name=None):
+                worksheet.append(row)
+
+        workbook.save(file_object)
+
     @staticmethod
     def export_to_excel(df: DataFrame) -> BytesIO:
         excel_object = BytesIO()
-        df.to_excel(excel_object, index=False)
+        ImportExportService.write_excel_chunks([df], excel_object)
 
         return excel_object
 
@@ -24,12 +94,194 @@ class ImportExportService:
         return csv_object
 
     @staticmethod
-    def import_from_excel(file_path_or_object: BytesIO | str) -> DataFrame:
-        return read_excel(file_path_or_object, na_filter=False)
+    def export_to_parquet(df: DataFrame) -> BytesIO:
+        parquet_object = BytesIO()
+        df.to_parquet(parquet_object, engine="pyarrow", compression=ImportExportService.ARROW_COMPRESSION,
+                      index=False)
+
+        return parquet_object
+
+    @staticmethod
+    def export_to_feather(df: DataFrame) -> BytesIO:
+        feather_object = BytesIO()
+        # Feather files cannot store a non-default index
+        df.reset_index(drop=True).to_feather(feather_object, compression=ImportExportService.ARROW_COMPRESSION)
+
+        return feather_object
+
+    @staticmethod
+    def iter_csv_chunks(df_chunks: Iterable[DataFrame]) -> Iterator[bytes]:
+        """
+        Encodes each DataFrame chunk as CSV rows. The header is only written for the first chunk,
+        so the concatenated output matches export_to_csv of the concatenated chunks
+        """
+        is_first_chunk: bool = True
+        for df in df_chunks:
+            csv_buffer = StringIO()
+            df.to_csv(csv_buffer, index=False, header=is_first_chunk)
+            is_first_chunk = False
+            yield csv_buffer.getvalue().encode(ImportExportService.ENCODING)
+
+    @staticmethod
+    def export_stream_to_csv(df_chunks: Iterable[DataFrame]) -> ChunkedFileStream:
+        return ChunkedFileStream(ImportExportService.iter_csv_chunks(df_chunks))
+
+    @staticmethod
+    def export_stream_to_csv_gzip(df_chunks: Iterable[DataFrame]) -> ChunkedFileStream:
+        return ChunkedFileStream(ImportExportService.iter_csv_chunks(df_chunks), compress=True)
+
+    @staticmethod
+    def export_stream_to_excel(df_chunks: Iterable[DataFrame]) -> BinaryIO:
+        # The xlsx archive can only be completed once every row is written, so it is spooled to a temporary file
+        # on disk rather than generated as it is read
+        excel_file = TemporaryFile()
+        ImportExportService.write_excel_chunks(df_chunks, excel_file)
+        excel_file.seek(0)
+
+        return excel_file
+
+    @staticmethod
+    def _restrict_to_header(header: list[str], columns: Optional[list[str]],
+                            dtypes: Optional[dict]) -> tuple[Optional[list[str]], Optional[dict]]:
+        """
+        Drops the columns and dtypes that are not in the header, so files missing columns are still read
+        and can be validated by the caller
+        """
+        if columns is not None:
+            columns = [col for col in columns if col in header]
+        if dtypes is not None:
+            dtypes = {col: dtype for col, dtype in dtypes.items()
+                      if (col in header) and ((columns is None) or (col in columns))}
+        return columns, dtypes
+
+    @staticmethod
+    def _read_csv_header(file_path_or_object: BytesIO | str) -> list[str]:
+        header: list[str] = list(read_csv(file_path_or_object, nrows=0).columns)
+        if hasattr(file_path_or_object, "seek"):
+            file_path_or_object.seek(0)
+        return header
+
+    @staticmethod
+    def _select_columns(df: DataFrame, columns: Optional[list[str]]) -> DataFrame:
+        if columns is None:
+            return df
+        return df[columns]
+
+    @staticmethod
+    def _astype_present(df: DataFrame, dtypes: Optional[dict]) -> DataFrame:
+        if dtypes is None:
+            return df
+        return df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
 
     @staticmethod
-    def import_from_csv(file_path_or_object: BytesIO | str) -> DataFrame:
-        return read_csv(file_path_or_object, na_filter=False)
+    def import_from_excel(file_path_or_object: BytesIO | str, columns: Optional[list[str]] = None,
+                          dtypes: Optional[dict] = None) -> DataFrame:
+        usecols: Optional[Callable] = None
+        if columns is not None:
+            usecols = columns.__contains__
+        df: DataFrame = read_excel(file_path_or_object, na_filter=False, usecols=usecols)
+        return ImportExportService._astype_present(df, dtypes)
+
+    @staticmethod
+    def import_from_csv(file_path_or_object: BytesIO | str, columns: Optional[list[str]] = None,
+                        dtypes: Optional[dict] = None) -> DataFrame:
+        """
+        Parses the CSV in a single pass, with the pyarrow engine when pyarrow is installed.
+        Empty values are read as empty strings rather than NaN
+        """
+        if (columns is not None) or (dtypes is not None):
+            columns, dtypes = ImportExportService._restrict_to_header(
+                ImportExportService._read_csv_header(file_path_or_object), columns, dtypes)
+
+        df: DataFrame
+        if pyarrow is None:
+            df = read_csv(file_path_or_object, na_filter=False, usecols=columns, dtype=dtypes)
+        else:
+            df = read_csv(file_path_or_object, engine="pyarrow", keep_default_na=False, na_values=[],
+                          usecols=columns, dtype=dtypes)
+        # The engines differ in whether usecols orders the columns, so the requested order is applied to both
+        return ImportExportService._select_columns(df, columns)
+
+    @staticmethod
+    def import_from_parquet(file_path_or_object: BytesIO | str, columns: Optional[list[str]] = None,
+                            dtypes: Optional[dict] = None) -> DataFrame:
+        if columns is not None:
+            header: list[str] = pyarrow.parquet.read_schema(file_path_or_object).names
+            if hasattr(file_path_or_object, "seek"):
+                file_path_or_object.seek(0)
+            columns, dtypes = ImportExportService._restrict_to_header(header, columns, dtypes)
+        df: DataFrame = read_parquet(file_path_or_object, engine="pyarrow", columns=columns)
+        return ImportExportService._astype_present(df, dtypes)
+
+    @staticmethod
+    def import_from_feather(file_path_or_object: BytesIO | str, columns: Optional[list[str]] = None,
+                            dtypes: Optional[dict] = None) -> DataFrame:
+        if columns is not None:
+            header: list[str] = pyarrow.ipc.open_file(file_path_or_object).schema.names
+            if hasattr(file_path_or_object, "seek"):
+                file_path_or_object.seek(0)
+            columns, dtypes = ImportExportService._restrict_to_header(header, columns, dtypes)
+        df: DataFrame = read_feather(file_path_or_object, columns=columns)
+        return ImportExportService._astype_present(df, dtypes)
+
+    @staticmethod
+    def iter_excel_chunks(file_path_or_object: BytesIO | str, chunk_size: int, columns: Optional[list[str]] = None,
+                          dtypes: Optional[dict] = None) -> Iterator[DataFrame]:
+        # A read-only workbook parses rows as they are iterated rather than loading the whole sheet
+        workbook = load_workbook(file_path_or_object, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header: list[str] = [str(col) for col in next(rows, ())]
+            col_idxs: list[int] = [idx for idx, col in enumerate(header) if (columns is None) or (col in columns)]
+            chunk_columns: list[str] = [header[idx] for idx in col_idxs]
+
+            chunk_rows: list[list] = []
+            for row in rows:
+                if all([value is None for value in row]):
+                    continue
+                chunk_rows.append(["" if (idx >= len(row)) or (row[idx] is None) else row[idx] for idx in col_idxs])
+                if len(chunk_rows) == chunk_size:
+                    yield ImportExportService._astype_present(DataFrame(chunk_rows, columns=chunk_columns), dtypes)
+                    chunk_rows = []
+            if len(chunk_rows) > 0:
+                yield ImportExportService._astype_present(DataFrame(chunk_rows, columns=chunk_columns), dtypes)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def iter_csv_import_chunks(file_path_or_object: BytesIO | str, chunk_size: int, columns: Optional[list[str]] = None,
+                               dtypes: Optional[dict] = None) -> Iterator[DataFrame]:
+        # The pyarrow engine cannot read in chunks, so the C engine is used
+        if (columns is not None) or (dtypes is not None):
+            columns, dtypes = ImportExportService._restrict_to_header(
+                ImportExportService._read_csv_header(file_path_or_object), columns, dtypes)
+        with read_csv(file_path_or_object, na_filter=False, usecols=columns, dtype=dtypes,
+                      chunksize=chunk_size) as reader:
+            for df in reader:
+                yield ImportExportService._select_columns(df, columns)
+
+    @staticmethod
+    def iter_parquet_chunks(file_path_or_object: BytesIO | str, chunk_size: int,
+                            columns: Optional[list[str]] = None, dtypes: Optional[dict] = None) -> Iterator[DataFrame]:
+        parquet_file = pyarrow.parquet.ParquetFile(file_path_or_object)
+        if columns is not None:
+            columns, dtypes = ImportExportService._restrict_to_header(parquet_file.schema_arrow.names, columns, dtypes)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield ImportExportService._astype_present(batch.to_pandas(), dtypes)
+
+    @staticmethod
+    def iter_feather_chunks(file_path_or_object: BytesIO | str, chunk_size: int,
+                            columns: Optional[list[str]] = None, dtypes: Optional[dict] = None) -> Iterator[DataFrame]:
+        reader = pyarrow.ipc.open_file(file_path_or_object)
+        if columns is not None:
+            columns, dtypes = ImportExportService._restrict_to_header(reader.schema.names, columns, dtypes)
+        # Record batches are decompressed one at a time, then split into chunks
+        for batch_idx in range(reader.num_record_batches):
+            batch = reader.get_batch(batch_idx)
+            if columns is not None:
+                batch = batch.select(columns)
+            for chunk_start in range(0, batch.num_rows, chunk_size):
+                yield ImportExportService._astype_present(batch.slice(chunk_start, chunk_size).to_pandas(), dtypes)
 
     def __init__(self):
         self.export_type_mapping: dict[str, Callable] = {
@@ -40,9 +292,37 @@ class ImportExportService:
             "xlsx": self.import_from_excel,
             "csv": self.import_from_csv
         }
+        if pyarrow is not None:
+            self.export_type_mapping["parquet"] = self.export_to_parquet
+            self.export_type_mapping["feather"] = self.export_to_feather
+            self.import_type_mapping["parquet"] = self.import_from_parquet
+            self.import_type_mapping["feather"] = self.import_from_feather
+        self.chunk_import_type_mapping: dict[str, Callable] = {
+            "xlsx": self.iter_excel_chunks,
+            "csv": self.iter_csv_import_chunks
+        }
+        if pyarrow is not None:
+            self.chunk_import_type_mapping["parquet"] = self.iter_parquet_chunks
+            self.chunk_import_type_mapping["feather"] = self.iter_feather_chunks
+        self.stream_export_type_mapping: dict[str, Callable] = {
+            "xlsx": self.export_stream_to_excel,
+            "csv": self.export_stream_to_csv,
+            "csv.gz": self.export_stream_to_csv_gzip
+        }
 
     def get_filetypes(self) -> list[str]:
-        return list(self.export_type_mapping.keys())
+        """
+        Returns the export filetypes
+        """
+        filetypes: list[str] = list(self.export_type_mapping.keys())
+        filetypes.extend([ftype for ftype in self.stream_export_type_mapping.keys() if ftype not in filetypes])
+        return filetypes
+
+    def get_import_filetypes(self) -> list[str]:
+        return list(self.import_type_mapping.keys())
+
+    def is_stream_filetype(self, filetype: str) -> bool:
+        return filetype in self.stream_export_type_mapping
 
     def export(self, df: DataFrame, filetype: str) -> BytesIO:
         if filetype not in self.export_type_mapping:
@@ -52,11 +332,60 @@ class ImportExportService:
 
         return file_object
 
-    def import_file(self, file_path_or_object: BytesIO | str, filetype: str) -> DataFrame:
-        if filetype not in self.export_type_mapping:
+    def export_stream(self, df_chunks: Iterable[DataFrame], filetype: str) -> BinaryIO:
+        """
+        Exports the DataFrame chunks as a single file without holding every chunk in memory at once.
+        CSV contents are only generated as the file is read, while xlsx files are written to a temporary file
+
+        Parameters
+        ----------
+        df_chunks: Iterable[DataFrame] - the rows to export, in consecutive chunks with the same columns
+        filetype: str - a filetype for which is_stream_filetype is True
+        """
+        if filetype not in self.stream_export_type_mapping:
+            raise ValueError(f"{filetype} is not a valid stream export format")
+        return self.stream_export_type_mapping[filetype](df_chunks)
+
+    def import_file(self, file_path_or_object: BytesIO | str, filetype: str,
+                    columns: Optional[list[str]] = None, dtypes: Optional[dict] = None) -> DataFrame:
+        """
+        Parameters
+        ----------
+        file_path_or_object: BytesIO | str - the file to read
+        filetype: str - one of the filetypes returned by get_import_filetypes
+        columns: Optional[list[str]] - if provided, only these columns are read. CSV, parquet and feather files
+        skip parsing the other columns entirely. Columns missing from the file are not an error, and are left for
+        the caller to validate
+        dtypes: Optional[dict] - if provided, the dtype of each column. CSV columns are parsed directly into
+        these dtypes
+        """
+        if filetype not in self.import_type_mapping:
             raise ValueError(f"{filetype} is not a valid import format")
         if isinstance(file_path_or_object, BytesIO):
             file_path_or_object.seek(0)
 
-        df: DataFrame = self.import_type_mapping[filetype](file_path_or_object)
+        df: DataFrame = self.import_type_mapping[filetype](file_path_or_object, columns, dtypes)
         return df
+
+    def iter_import_chunks(self, file_path_or_object: BytesIO | str, filetype: str,
+                           chunk_size: int = IMPORT_CHUNK_SIZE, columns: Optional[list[str]] = None,
+                           dtypes: Optional[dict] = None) -> Iterator[DataFrame]:
+        """
+        Reads the file in consecutive chunks of rows, so only one chunk is held in memory at a time.
+        Together, the chunks hold the same rows and columns as import_file
+
+        Parameters
+        ----------
+        file_path_or_object: BytesIO | str - the file to read
+        filetype: str - one of the filetypes returned by get_import_filetypes
+        chunk_size: int - the maximum number of rows in each chunk
+        columns: Optional[list[str]] - if provided, only these columns are read. Columns missing from the file
+        are not an error, and are left for the caller to validate
+        dtypes: Optional[dict] - if provided, the dtype of each column
+        """
+        if filetype not in self.chunk_import_type_mapping:
+            raise ValueError(f"{filetype} is not a valid import format")
+        if isinstance(file_path_or_object, BytesIO):
+            file_path_or_object.seek(0)
+
+        return self.chunk_import_type_mapping[filetype](file_path_or_object, chunk_size, columns, dtypes)
@@ -1 +1,2 @@
 from .ImportExportService import ImportExportService
+from .ChunkedFileStream import ChunkedFileStream
@@ -1,4 +1,4 @@
-from panel import Row, Column
+from panel import Row, Column, state
 
 from annotation.controller import AnnotationController
 from annotation.view.global_notifiers import LoadingIndicator
@@ -30,5 +30,9 @@ class AnnotationViewWrapper:
 
         self.controller.update_displays()
 
+        # Annotation changes are written behind, so any outstanding changes are written when the session closes
+        # and the datastores of the session are released
+        state.on_session_destroyed(lambda session_context: self.controller.end_session())
+
     def get_layout(self):
         return self.layout
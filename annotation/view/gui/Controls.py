@@ -5,6 +5,7 @@ from panel.widgets import Button, CheckButtonGroup, MultiSelect, IntInput
 from panel.pane import Str, HTML, Markdown
 
 from annotation.controller.AnnotationController import AnnotationController
+from annotation.model.data_structures import SequenceView
 from .styles import (controls_style, sequence_heading_style, delete_sequence_button_style, add_sequence_button_style,
                      clause_stylesheet, sequence_info_style, classification_heading_style,
                      sequence_classification_style, manage_sequence_button_style)
@@ -16,8 +17,10 @@ class ClauseSequenceControls:
         self.add_sequence_controls_fn = add_sequence_controls_fn
 
         self.title = Str("Clause Pair Sequence", styles=sequence_heading_style, align="center")
-        self.sequence_id_control = IntInput(width=100)
-        sequence_id_bound_fn = bind(self.set_sequence_id, sequence_id=self.sequence_id_control)
+        self.sequence_position_control = IntInput(width=100)
+        sequence_position_bound_fn = bind(self.set_sequence_position, sequence_position=self.sequence_position_control)
+        self.text_index_control = IntInput(name="Go to character", value=None, start=0, width=150)
+        self.text_index_control.param.watch(self.go_to_text_index, 'value')
         self.clause_a_info = HTML(ClauseSequenceControls.format_first_clause_str(), stylesheets=[clause_stylesheet])
         self.clause_b_info = HTML(ClauseSequenceControls.format_second_clause_str(), stylesheets=[clause_stylesheet])
         self.clause_overlap_info = HTML(ClauseSequenceControls.format_overlap_str(), stylesheets=[clause_stylesheet])
@@ -39,8 +42,10 @@ class ClauseSequenceControls:
 
         self.component = Column(
             Row(self.title,
-                self.sequence_id_control,
-                sequence_id_bound_fn,
+                self.sequence_position_control,
+                sequence_position_bound_fn,
+                align="center"),
+            Row(self.text_index_control,
                 align="center"),
             Row(
                 self.prev_sequence_button,
@@ -106,20 +111,6 @@ class ClauseSequenceControls:
 
         return linkage_str
 
-    @staticmethod
-    def get_clause_overlap(clause_a_range: tuple[int, int], clause_b_range: tuple[int, int]) -> Optional[tuple[int, int]]:
-        if (clause_a_range is None) or (clause_b_range is None):
-            return
-
-        a_start, a_end = clause_a_range
-        b_start, b_end = clause_b_range
-
-        overlap_start = max(a_start, b_start)
-        overlap_end = min(a_end, b_end)
-
-        if overlap_start < overlap_end:
-            return overlap_start, overlap_end
-
     def get_component(self):
         return self.component
 
@@ -130,21 +121,16 @@ class ClauseSequenceControls:
         self.component.visible = not self.component.visible
 
     def update_display(self):
-        clause_ranges = self.controller.get_curr_sequence_ranges()
-        if clause_ranges is None:
-            clause_a_range, clause_b_range = None, None
-        else:
-            clause_a_range, clause_b_range = clause_ranges
-        self.clause_a_info.object = ClauseSequenceControls.format_first_clause_str(clause_a_range)
-        self.clause_b_info.object = ClauseSequenceControls.format_second_clause_str(clause_b_range)
-        overlap_range = ClauseSequenceControls.get_clause_overlap(clause_a_range, clause_b_range)
-        self.clause_overlap_info.object = ClauseSequenceControls.format_overlap_str(overlap_range)
-        linkage_words: Optional[list[str]] = self.controller.get_curr_sequence_linkage_words()
-        self.linkage_word_info.object = ClauseSequenceControls.format_linkage_str(linkage_words)
-
-        self.sequence_id_control.value = self.controller.get_current_sequence_id()
-        self.sequence_id_control.start = self.controller.get_min_sequence_id()
-        self.sequence_id_control.end = self.controller.get_max_sequence_id()
+        sequence_view: SequenceView = self.controller.get_curr_sequence_view()
+        self.clause_a_info.object = ClauseSequenceControls.format_first_clause_str(sequence_view.clause_a_range)
+        self.clause_b_info.object = ClauseSequenceControls.format_second_clause_str(sequence_view.clause_b_range)
+        self.clause_overlap_info.object = ClauseSequenceControls.format_overlap_str(sequence_view.overlap_range)
+        self.linkage_word_info.object = ClauseSequenceControls.format_linkage_str(sequence_view.linkage_words)
+
+        min_sequence_position: int = self.controller.get_min_sequence_position()
+        self.sequence_position_control.value = sequence_view.position
+        self.sequence_position_control.start = min_sequence_position
+        self.sequence_position_control.end = sequence_view.sequence_count - 1 + min_sequence_position
 
         self.reset_manage_sequence_pane()
 
@@ -175,10 +161,15 @@ class ClauseSequenceControls:
     def delete_sequence(self, event):
         self.controller.delete_curr_sequence()
 
-    def set_sequence_id(self, sequence_id: int):
-        self.controller.set_current_sequence_id(sequence_id)
+    def set_sequence_position(self, sequence_position: int):
+        self.controller.set_current_sequence_position(sequence_position)
         self.update_display()
 
+    def go_to_text_index(self, event):
+        if event.new is None:
+            return
+        self.controller.set_current_sequence_at_text_index(event.new)
+
 
 class AddSequenceControls:
     def __init__(self, controller: AnnotationController, reset_visibility_fn: Callable):
@@ -285,11 +276,12 @@ class SequenceClassificationControls:
         self.component.visible = not self.component.visible
 
     def update_display(self):
-        curr_correct_classes: list[str] = self.controller.get_correct_classifications()
+        sequence_view: SequenceView = self.controller.get_curr_sequence_view()
+        curr_correct_classes: list[str] = sequence_view.correct_classes
         if len(curr_correct_classes) == 0:
-            curr_correct_classes = self.controller.get_predicted_classifications()
+            curr_correct_classes = sequence_view.predicted_classes
         self.classification_selector.value = curr_correct_classes
-        reasoning: str = self.controller.get_reasoning()
+        reasoning: str = sequence_view.reasoning
         if reasoning == '':
             self.llm_reasoning_display.object = '**LLM Reasoning:**'
             self.llm_reasoning_display.visible = False
@@ -47,14 +47,15 @@ class FigureGenerator:
     def create_weighted_scatterplot(df: DataFrame, window: Optional[int] = None) -> Figure:
         if window is None:
             window = len(df) // 10
-        df["rolling_average"] = df.rolling(window=window, center=True)['weight'].mean()
+        # The DataFrame is shared with the datastore plot cache, so the average is not added to it as a column
+        rolling_average = df['weight'].rolling(window=window, center=True).mean()
 
         fig = go.Figure()
 
         fig.add_trace(
             go.Scatter(
                 x=df["sequence_position"],
-                y=df["rolling_average"],
+                y=rolling_average,
                 mode="lines"
             )
         )
@@ -73,9 +74,8 @@ class FigureGenerator:
         return fig
 
     @staticmethod
-    def create_bar_chart(df: DataFrame) -> Figure:
-        plot_df = df.groupby(['classification']).size().reset_index(name='count')
-        fig = px.bar(plot_df, x='classification', y='count', color='classification')
+    def create_bar_chart(class_count_df: DataFrame) -> Figure:
+        fig = px.bar(class_count_df, x='classification', y='count', color='classification')
 
         return fig
 
@@ -99,23 +99,34 @@ class DataDisplay:
             self.bar_chart,
             sizing_mode='stretch_width')
 
+        # The plot DataFrames last drawn. The same DataFrame is returned until the data changes,
+        # so the figures are only redrawn when it does
+        self._plot_df: Optional[DataFrame] = None
+        self._weights_df: Optional[DataFrame] = None
+        self._class_count_df: Optional[DataFrame] = None
+
         self.average_window_slider.param.watch(self._rolling_average_slider_update, ['value'])
         self.controller.add_update_text_display_callable(self.update_display)
 
     def update_display(self):
         df: Optional[DataFrame] = self.controller.get_plot_data()
         weights_df: Optional[DataFrame] = self.controller.get_plot_weights_data()
-        if weights_df is not None:
+        class_count_df: Optional[DataFrame] = self.controller.get_plot_class_count_data()
+        if (weights_df is not None) and (weights_df is not self._weights_df):
             window = self.average_window_slider.value
             self.weighted_scatterplot.object = FigureGenerator.create_weighted_scatterplot(weights_df, window)
-        if df is not None:
+        if (df is not None) and (df is not self._plot_df):
             self.scatterplot.object = FigureGenerator.create_scatterplot(df)
-            self.bar_chart.object = FigureGenerator.create_bar_chart(df)
+        if (class_count_df is not None) and (class_count_df is not self._class_count_df):
+            self.bar_chart.object = FigureGenerator.create_bar_chart(class_count_df)
+        self._plot_df = df
+        self._weights_df = weights_df
+        self._class_count_df = class_count_df
 
         self.average_window_slider.visible = weights_df is not None
         self.weighted_scatterplot.visible = weights_df is not None
         self.scatterplot.visible = df is not None
-        self.bar_chart.visible = df is not None
+        self.bar_chart.visible = class_count_df is not None
 
     def _rolling_average_slider_update(self, *_):
         weights_df: Optional[DataFrame] = self.controller.get_plot_weights_data()
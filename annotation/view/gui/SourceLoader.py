@@ -1,3 +1,4 @@
+import asyncio
 from io import BytesIO
 from typing import Optional
 
@@ -71,6 +72,11 @@ class FileUploadWidget:
             file_content.seek(0)
             return file_content
 
+    def get_filename(self) -> Optional[str]:
+        if self.file_input.value is None:
+            return
+        return self.file_input.filename
+
     def get_filetype(self) -> Optional[str]:
         if self.file_input.value is None:
             return
@@ -187,13 +193,14 @@ class UnprocessedModeLoader:
             self.controller.display_error("No source file loaded")
             return
         source_filetype: Optional[str] = self.source_file_loader.get_filetype()
+        source_filename: Optional[str] = self.source_file_loader.get_filename()
 
         llm_definitions_content: Optional[BytesIO] = self.llm_definitions_loader.get_file_content()
         llm_examples_content: Optional[BytesIO] = self.llm_examples_loader.get_file_content()
         llm_prompt_content: Optional[BytesIO] = self.llm_prompt_loader.get_file_content()
 
         self.set_cost_time_estimate()
-        self.controller.load_source_file(source_file_content, source_filetype)
+        self.controller.load_source_file(source_file_content, source_filetype, source_filename)
         self.controller.prepare_llm_processor(llm_definitions_content, llm_examples_content, llm_prompt_content)
         self.set_cost_time_estimate()
 
@@ -205,11 +212,14 @@ class UnprocessedModeLoader:
 
 
 class PreprocessedModeLoader:
+    # Seconds the event loop is given between loading chunks of the preprocessed file
+    CHUNK_YIELD_DELAY: float = 0.01
+
     def __init__(self, controller: AnnotationController):
         self.controller: AnnotationController = controller
 
         self.source_file_loader = FileUploadWidget("source file", ["docx", "txt"])
-        valid_filetypes: list[str] = self.controller.get_import_export_file_formats()
+        valid_filetypes: list[str] = self.controller.get_import_file_formats()
         self.preprocessed_loader = FileUploadWidget("preprocessed sequences", valid_filetypes)
         self.load_files_button = Button(name="Load", button_type="success", button_style="outline")
         self.load_files_button.on_click(self.load_files)
@@ -240,17 +250,21 @@ class PreprocessedModeLoader:
     def set_visible(self, visible: bool):
         self.component.visible = visible
 
-    def load_files(self, *_):
+    async def load_files(self, *_):
         source_file_content: Optional[BytesIO] = self.source_file_loader.get_file_content()
         if source_file_content is None:
             self.controller.display_error("No source file loaded")
             return
         source_filetype: Optional[str] = self.source_file_loader.get_filetype()
+        source_filename: Optional[str] = self.source_file_loader.get_filename()
         preprocessed_content: Optional[BytesIO] = self.preprocessed_loader.get_file_content()
         preprocessed_filetype: Optional[str] = self.preprocessed_loader.get_filetype()
 
-        self.controller.load_source_file(source_file_content, source_filetype)
-        self.controller.load_preprocessed_sequences(preprocessed_content, preprocessed_filetype)
+        self.controller.load_source_file(source_file_content, source_filetype, source_filename)
+        # Yielding to the event loop between chunks sends the display updates and handles navigation
+        # while the rest of the file loads
+        for _ in self.controller.iter_load_preprocessed_sequences(preprocessed_content, preprocessed_filetype):
+            await asyncio.sleep(PreprocessedModeLoader.CHUNK_YIELD_DELAY)
         self.export_controls.set_button_disabled(False)
 
 
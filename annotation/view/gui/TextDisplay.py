@@ -5,6 +5,7 @@ from panel import Column
 from panel.pane import HTML
 
 from annotation.controller.AnnotationController import AnnotationController
+from annotation.model.data_structures import SequenceView
 from .styles import text_display_style, clause_stylesheet
 
 
@@ -185,15 +186,10 @@ class TextDisplay:
         self.controller.add_update_text_display_callable(self.update_display)
 
     def update_display(self):
-        clause_ranges = self.controller.get_curr_sequence_ranges()
-        if clause_ranges is None:
-            clause_a_range, clause_b_range = None, None
-        else:
-            clause_a_range, clause_b_range = clause_ranges
-        self.text_render.set_clause_a_range(clause_a_range)
-        self.text_render.set_clause_b_range(clause_b_range)
-        linkage_words: Optional[list[str]] = self.controller.get_curr_sequence_linkage_words()
-        self.text_render.update_linkage_word_ranges(linkage_words)
+        sequence_view: SequenceView = self.controller.get_curr_sequence_view()
+        self.text_render.set_clause_a_range(sequence_view.clause_a_range)
+        self.text_render.set_clause_b_range(sequence_view.clause_b_range)
+        self.text_render.update_linkage_word_ranges(sequence_view.linkage_words)
 
         self.set_text(self.controller.get_text())
 
@@ -162,7 +162,8 @@ class LLMProcess():
                  outpath="../results_llm/",
                  modelname_llm="gpt-3.5-turbo-1106",
                  nseq_per_prompt = 8,
-                 progress_update_fn=print):
+                 progress_update_fn=print,
+                 sequence_ids=None):
         """
         Initialize LLMProcess class.
 
@@ -177,6 +178,8 @@ class LLMProcess():
         - modelname_llm (str): The name of the LLM model to use.
         - nseq_per_prompt (int): The number of sequences per prompt.
         - progress_update_fn (Callable): The function to pass the process progress message to. Defaults to print
+        - sequence_ids (list[int]): Optional subset of sequence ids to process (e.g. only new or changed pairs).
+            If None, all clausing pairs in filename_pairs are processed.
 
         """
         # Check if filename_examples is excel file
@@ -227,6 +230,10 @@ class LLMProcess():
 
         # load clausing pairs
         self.df_sequences = pd.read_csv(self.filename_pairs)
+        # restrict to the requested delta of clausing pairs
+        if sequence_ids is not None:
+            self.df_sequences = self.df_sequences[self.df_sequences['sequence_id'].isin(sequence_ids)]
+            self.df_sequences = self.df_sequences.reset_index(drop=True)
 
         # Select examples for each type
         self.example_types = self.df_examples['Sub_Subtype'].unique()
@@ -240,7 +247,16 @@ class LLMProcess():
         # initialize token_counter
         self.token_count = 0
 
+        # counts the calls to run, so each run writes its own results file
+        self.run_count = 0
+
         # initiate results dataframe
+        self.init_results()
+
+    def init_results(self):
+        """
+        Initialise the results dataframe from the current clausing pairs.
+        """
         self.df_res = self.df_sequences.copy()
         self.df_res['predicted_classes'] = None
         self.df_res['predicted_classes_name'] = None
@@ -254,6 +270,18 @@ class LLMProcess():
         self.df_res['modelname_llm'] = None
         self.df_res['reasoning'] = None
 
+    def set_sequences(self, df_sequences):
+        """
+        Replace the clausing pairs to process in memory.
+        Input files are not re-read and no new output folder is created.
+
+        Parameters:
+        -----------
+        - df_sequences (pd.DataFrame): The clausing pairs, with the same columns as the filename_pairs csv table.
+        """
+        self.df_sequences = df_sequences.reset_index(drop=True)
+        self.init_results()
+
     def estimate_compute_cost(self, 
                               path_cost = './schemas/openai_pricing.json',
                               avg_token_instruction = 2500,
@@ -410,8 +438,9 @@ class LLMProcess():
         # Initiate LLM with API key
         self.llm = LLM(filename_openai_key, model_name = self.modelname_llm)
 
-        # path to results
-        self.fname_results = os.path.join(self.outpath, 'results.csv')
+        # path to results, numbered by run so later runs over a new delta of pairs keep earlier results
+        self.run_count += 1
+        self.fname_results = os.path.join(self.outpath, f'results_run{self.run_count}.csv')
 
         # split test samples in chunks of nseq_per_prompt
         list_text_chunk1 = []
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Allows the tests to import the annotation package when run from any directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,87 @@
+# Test functions for the class ClassificationMask in annotation.model.data_structures.ClassificationMask
+
+from itertools import combinations
+
+from numpy import array
+
+from annotation.model.data_structures.Classification import Classification
+from annotation.model.data_structures.ClassificationMask import ClassificationMask
+from annotation.model.database.repositories import SequenceCSVRepository, SequenceSQLiteRepository
+
+
+def every_class_subset() -> list[tuple[Classification, ...]]:
+    classes: tuple[Classification, ...] = ClassificationMask.CLASSES
+    return [subset for size in range(len(classes) + 1) for subset in combinations(classes, size)]
+
+
+def test_value_strings_round_trip():
+    """
+    test that every set of classifications converts to value strings and back to the same mask
+    """
+    subsets = every_class_subset()
+    masks = array([ClassificationMask.from_values([c.value for c in subset]) for subset in subsets])
+
+    value_strings = ClassificationMask.to_value_strings(masks)
+
+    assert len(set(masks.tolist())) == ClassificationMask.MASK_COUNT
+    assert ClassificationMask.from_value_strings(value_strings).tolist() == masks.tolist()
+    assert [ClassificationMask.to_classifications(mask) or [] for mask in masks] == [list(s) for s in subsets]
+
+
+def test_na_bit_kept_apart_from_other_classes():
+    """
+    test that the NA classification has its own bit, so its negative value is never confused with another class
+    """
+    na_mask: int = ClassificationMask.get_bit(Classification.NA)
+    masks = ClassificationMask.from_value_strings(["-1", "1", "-1,1", " 1, -1"])
+
+    assert masks.tolist() == [na_mask, ClassificationMask.get_bit(Classification.INC)] + [na_mask | 2] * 2
+    assert ClassificationMask.to_value_strings(masks).tolist() == ["-1", "1", "-1,1", "-1,1"]
+    assert ClassificationMask.to_name_strings(masks).tolist() == ["NA", "INC", "NA,INC", "NA,INC"]
+    assert ClassificationMask.to_value_sums(masks).tolist() == [-1, 1, 0, 0]
+    assert ClassificationMask.contains(masks, Classification.NA).tolist() == [True, False, True, True]
+
+
+def test_empty_and_unknown_values():
+    """
+    test that missing entries and values that are not a classification give the empty mask
+    """
+    masks = ClassificationMask.from_value_strings([None, "", "9", "3,9"])
+
+    assert masks.tolist() == [0, 0, 0, ClassificationMask.get_bit(Classification.REP)]
+    assert ClassificationMask.from_values([0, 9, 3]) == ClassificationMask.get_bit(Classification.REP)
+    assert ClassificationMask.to_classifications(ClassificationMask.EMPTY_MASK) is None
+    assert ClassificationMask.to_value_strings([0]).tolist() == [""]
+    assert ClassificationMask.to_name_strings([0]).tolist() == [ClassificationMask.EMPTY_NAME]
+
+
+def test_class_matrix_columns_follow_bits():
+    """
+    test that each column of the class matrix is set exactly where its classification is set in the mask
+    """
+    masks = array(range(ClassificationMask.MASK_COUNT))
+
+    class_matrix = ClassificationMask.to_class_matrix(masks)
+
+    assert class_matrix.shape == (ClassificationMask.MASK_COUNT, len(ClassificationMask.CLASSES))
+    for column, classification in enumerate(ClassificationMask.CLASSES):
+        assert class_matrix[:, column].tolist() == ClassificationMask.contains(masks, classification).tolist()
+
+
+def test_masks_stored_and_read_by_repositories(tmp_path):
+    """
+    test that the masks written to both sequence repositories are read back unchanged after the database is reopened
+    """
+    masks = array([0, ClassificationMask.get_bit(Classification.NA), ClassificationMask.MASK_COUNT - 1, 6])
+    repository_builders = (lambda: SequenceCSVRepository(tmp_path / "sequences.csv", flush_delay=None),
+                           lambda: SequenceSQLiteRepository(tmp_path / "sequences.db"))
+    for build_repository in repository_builders:
+        repository = build_repository()
+        repository.create_many(array([1, 2, 3, 4]), array([2, 3, 4, 5]), predicted_classes=masks,
+                               correct_classes=masks[::-1].copy())
+        repository.commit()
+
+        rows = build_repository().read_all().tolist()
+
+        assert [row[4] for row in rows] == masks.tolist()
+        assert [row[5] for row in rows] == masks[::-1].tolist()
@@ -0,0 +1,96 @@
+# Test functions for the clause pairing of annotation.model.clausing.SequencingTool and AnnotationService
+
+from io import BytesIO
+
+from numpy import array
+from pandas import DataFrame, concat
+
+import annotation.model.AnnotationService as annotation_service
+from annotation.model.AnnotationService import AnnotationService
+from annotation.model.clausing.SequencingTool import SequencingTool, START_FIELD, END_FIELD, CLAUSE_FIELD
+
+# Two speaker turns, starting at 0 and 20, of two and three clauses
+TEXT: str = "One two. Three four.Five six. Seven. Eight nine."
+CLAUSE_STARTS: list[int] = [0, 9, 20, 30, 37]
+CLAUSE_ENDS: list[int] = [8, 20, 29, 36, 48]
+TURN_STARTS: list[int] = [0, 20]
+
+
+class FakeClauser:
+    """
+    Stands in for SourceFileClauser, which needs a spaCy model, and clauses TEXT into fixed clauses
+    """
+    def __init__(self, source_file: BytesIO, filetype: str):
+        pass
+
+    def get_text(self) -> str:
+        return TEXT
+
+    def get_turn_starts(self):
+        return array(TURN_STARTS)
+
+    def generate_clause_dataframe(self) -> DataFrame:
+        return build_clause_df()
+
+
+def build_clause_df() -> DataFrame:
+    return DataFrame({CLAUSE_FIELD: [TEXT[s:e] for s, e in zip(CLAUSE_STARTS, CLAUSE_ENDS)],
+                      START_FIELD: CLAUSE_STARTS, END_FIELD: CLAUSE_ENDS})
+
+
+def clause_index_pairs(sequence_df: DataFrame) -> list[tuple[int, int]]:
+    return [(CLAUSE_STARTS.index(c1_start), CLAUSE_STARTS.index(c2_start))
+            for c1_start, c2_start in zip(sequence_df["c1_start"], sequence_df["c2_start"])]
+
+
+def stored_clause_index_pairs(service: AnnotationService) -> list[tuple[int, int]]:
+    pairs = []
+    for position in range(1, service.get_sequence_count() + 1):
+        sequence = service.annotation_dao.get_sequence_by_id(service.annotation_dao.get_sequence_id_at(position))
+        first_range, second_range = sequence.get_clause_ranges()
+        pairs.append((CLAUSE_STARTS.index(first_range[0]), CLAUSE_STARTS.index(second_range[0])))
+    return pairs
+
+
+def test_chunks_match_whole_generation():
+    """
+    test that generating the pairs in small chunks gives the same pairs and ids as generating them at once
+    """
+    sequence_generator = SequencingTool(build_clause_df(), pair_range=3)
+
+    chunks = list(sequence_generator.iter_sequence_chunks(chunk_size=4))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 4 for chunk in chunks)
+    assert concat(chunks, ignore_index=True).equals(sequence_generator.generate_initial_sequence_df())
+
+
+def test_pruning_rules():
+    """
+    test that pairs are skipped when their clauses are too far apart or start in different speaker turns
+    """
+    clause_df = build_clause_df()
+
+    distance_df = SequencingTool(clause_df, pair_range=2, max_char_distance=1).generate_initial_sequence_df()
+    turn_df = SequencingTool(clause_df, pair_range=4, turn_starts=array(TURN_STARTS)).generate_initial_sequence_df()
+
+    assert clause_index_pairs(distance_df) == [(0, 1), (1, 2), (2, 3), (3, 4)]
+    assert clause_index_pairs(turn_df) == [(0, 1), (2, 3), (2, 4), (3, 4)]
+    assert turn_df["sequence_id"].tolist() == [1, 2, 3, 4]
+
+
+def test_service_passes_pairing_options(tmp_path, monkeypatch):
+    """
+    test that the pairing options given when loading a source file decide which clause pairs are stored
+    """
+    monkeypatch.setattr(annotation_service, "SourceFileClauser", FakeClauser)
+    service = AnnotationService(tmp_path)
+
+    service.load_source_file(BytesIO(), "docx")
+    assert stored_clause_index_pairs(service) == [(0, 1), (1, 2), (2, 3), (3, 4)]
+
+    service.load_source_file(BytesIO(), "docx", pair_range=4, within_turns=True)
+    assert stored_clause_index_pairs(service) == [(0, 1), (2, 3), (2, 4), (3, 4)]
+
+    service.load_source_file(BytesIO(), "docx", pair_range=2, max_char_distance=8)
+    assert stored_clause_index_pairs(service) == [(0, 1), (1, 2), (2, 3), (2, 4), (3, 4)]
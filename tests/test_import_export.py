@@ -0,0 +1,154 @@
+# Test functions for the chunked exports and imports of annotation.model.import_export.ImportExportService
+
+import gzip
+from io import BytesIO
+
+import pytest
+from numpy import array
+from openpyxl import load_workbook
+from pandas import DataFrame, concat
+
+from annotation.model.AnnotationService import AnnotationService
+from annotation.model.data_structures import Classification, ClassificationMask
+from annotation.model.database import DatastoreHandler
+from annotation.model.import_export import ImportExportService
+
+TEXT: str = "Première clause, avec virgule. Second \"quoted\" clause.\nThird clause 中文. Fourth clause. Fifth."
+CLAUSE_STARTS: list[int] = [0, 31, 54, 72, 87]
+CLAUSE_ENDS: list[int] = [30, 53, 71, 86, 93]
+
+
+def build_service(tmp_path, with_classes: bool = True) -> AnnotationService:
+    service = AnnotationService(tmp_path)
+    dao = service.annotation_dao
+    dao.write_text_file(TEXT)
+    clause_ids = dao.create_many_clauses(array(CLAUSE_STARTS), array(CLAUSE_ENDS))
+    if not with_classes:
+        dao.create_many_sequences(clause_ids[:-1], clause_ids[1:])
+        return service
+
+    masks = array([ClassificationMask.get_bit(Classification.INC), 0,
+                   ClassificationMask.from_values([2, 5]), ClassificationMask.get_bit(Classification.NA)])
+    dao.create_many_sequences(clause_ids[:-1], clause_ids[1:], array(["and", "", "so, then", "because"]),
+                              masks, masks[::-1].copy(), array(["first", "", "line\nbreak", "ünïcode"]))
+    return service
+
+
+def build_chunks(service: AnnotationService, chunk_size: int = 2) -> list[DataFrame]:
+    service.commit_changes()
+    return list(service.datastore_handler.iter_export_dataframes(chunk_size=chunk_size))
+
+
+def import_fields() -> tuple[list[str], dict]:
+    field_dtypes: dict = AnnotationService.get_sequence_field_dtypes()
+    return list(field_dtypes.keys()), field_dtypes
+
+
+def export_file(df: DataFrame, filetype: str) -> BytesIO:
+    return ImportExportService().export(df, filetype)
+
+
+def test_export_chunks_match_whole_export(tmp_path):
+    """
+    test that the export chunks hold the same rows as the whole export, reading only the text each chunk spans
+    """
+    service = build_service(tmp_path)
+
+    chunks = build_chunks(service)
+
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    assert concat(chunks, ignore_index=True).equals(service.get_dataframe_for_export())
+
+
+def test_streamed_csv_matches_whole_csv(tmp_path):
+    """
+    test that the streamed csv and csv.gz exports decode to the same bytes as exporting the whole DataFrame
+    """
+    service = build_service(tmp_path)
+    import_export_service = ImportExportService()
+    whole_csv: bytes = ImportExportService.export_to_csv(service.get_dataframe_for_export()).getvalue()
+
+    streamed_csv: bytes = import_export_service.export_stream(build_chunks(service), "csv").read()
+    streamed_gzip: bytes = import_export_service.export_stream(build_chunks(service), "csv.gz").read()
+
+    assert streamed_csv == whole_csv
+    assert gzip.decompress(streamed_gzip) == whole_csv
+
+
+def test_streamed_csv_without_sequences(tmp_path):
+    """
+    test that streaming an export with no sequences still writes the header row
+    """
+    service = AnnotationService(tmp_path)
+
+    streamed_csv: bytes = ImportExportService().export_stream(build_chunks(service), "csv").read()
+
+    assert streamed_csv.decode("utf-8").strip() == ",".join(DatastoreHandler.EXPORT_FIELDS)
+
+
+def test_streamed_excel_formatting_and_values(tmp_path):
+    """
+    test that the streamed xlsx export has a formatted header and holds the same values as the whole export
+    """
+    service = build_service(tmp_path)
+    export_df = service.get_dataframe_for_export()
+
+    excel_file = ImportExportService().export_stream(build_chunks(service), "xlsx")
+
+    workbook = load_workbook(excel_file)
+    worksheet = workbook[ImportExportService.EXCEL_SHEET_NAME]
+    header = list(worksheet.iter_rows(max_row=1))[0]
+    assert [cell.value for cell in header] == DatastoreHandler.EXPORT_FIELDS
+    assert all(cell.font.bold for cell in header)
+    assert all(cell.fill.start_color.rgb.endswith(ImportExportService.EXCEL_HEADER_COLOUR) for cell in header)
+    assert worksheet.column_dimensions["A"].width == ImportExportService.EXCEL_COLUMN_WIDTH
+    assert worksheet.column_dimensions["B"].width == ImportExportService.EXCEL_TEXT_COLUMN_WIDTH
+    assert worksheet.max_row == len(export_df) + 1
+
+    excel_file.seek(0)
+    columns, field_dtypes = import_fields()
+    imported_df = ImportExportService.import_from_excel(excel_file, columns, field_dtypes)
+    assert imported_df.equals(export_df[imported_df.columns])
+
+
+@pytest.mark.parametrize("filetype", ["csv", "xlsx", "parquet", "feather"])
+def test_import_chunks_match_whole_import(tmp_path, filetype):
+    """
+    test that reading a file in chunks gives the same rows, columns and dtypes as reading it whole
+    """
+    import_export_service = ImportExportService()
+    if filetype not in import_export_service.get_import_filetypes():
+        pytest.skip(f"{filetype} files need pyarrow, which is not installed")
+    export_df = build_service(tmp_path).get_dataframe_for_export()
+    columns, field_dtypes = import_fields()
+    # A requested column missing from the file is left for the caller to validate
+    columns.append("missing_field")
+
+    whole_df = import_export_service.import_file(export_file(export_df, filetype), filetype, columns, field_dtypes)
+    chunks = list(import_export_service.iter_import_chunks(export_file(export_df, filetype), filetype,
+                                                           chunk_size=3, columns=columns, dtypes=field_dtypes))
+
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    assert concat(chunks, ignore_index=True).equals(whole_df)
+    assert sorted(whole_df.columns) == sorted(columns[:-1])
+    assert whole_df.equals(export_df[whole_df.columns])
+
+
+def test_chunked_import_matches_whole_import(tmp_path):
+    """
+    test that storing a preprocessed file chunk by chunk leaves the same sequences as storing it at once
+    """
+    export_df = build_service(tmp_path / "source").get_dataframe_for_export()
+    import_export_service = ImportExportService()
+    columns, field_dtypes = import_fields()
+    whole_service = build_service(tmp_path / "whole", with_classes=False)
+    chunked_service = build_service(tmp_path / "chunked", with_classes=False)
+
+    whole_service.build_datastore(import_export_service.import_file(export_file(export_df, "csv"), "csv",
+                                                                   columns, field_dtypes))
+    for chunk in import_export_service.iter_import_chunks(export_file(export_df, "csv"), "csv", chunk_size=1,
+                                                          columns=columns, dtypes=field_dtypes):
+        chunked_service.build_datastore(chunk)
+
+    assert chunked_service.get_dataframe_for_export().equals(export_df)
+    assert whole_service.get_dataframe_for_export().equals(export_df)
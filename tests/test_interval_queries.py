@@ -0,0 +1,111 @@
+# Test functions for the half-open interval queries over clause ranges
+
+import random
+
+import pytest
+from numpy import array
+
+from annotation.model.AnnotationService import AnnotationService
+from annotation.model.database.repositories import (IntervalIndex, TextRangeCSVRepository,
+                                                    TextRangeSQLiteRepository)
+
+ADJACENT_STARTS: list[int] = [0, 12, 24]
+ADJACENT_ENDS: list[int] = [12, 24, 37]
+
+
+def build_repository(tmp_path, backend: str) -> TextRangeCSVRepository | TextRangeSQLiteRepository:
+    if backend == "csv":
+        return TextRangeCSVRepository(tmp_path / "clauses.csv", flush_delay=None)
+    return TextRangeSQLiteRepository(tmp_path / "clauses.db")
+
+
+def range_ids(rows) -> list[int]:
+    return [int(row[0]) for row in rows]
+
+
+def brute_force_overlapping(ranges: dict[int, tuple[int, int]], start: int, end: int) -> list[int]:
+    matches = [range_id for range_id, (range_start, range_end) in ranges.items()
+               if (range_start < end) and (start < range_end)]
+    return sorted(matches, key=lambda range_id: (ranges[range_id][0], range_id))
+
+
+def test_interval_index_half_open():
+    """
+    test that the interval index treats range ends as exclusive for point and overlap queries
+    """
+    index = IntervalIndex(array([1, 2, 3]), array(ADJACENT_STARTS), array(ADJACENT_ENDS))
+
+    assert index.containing(12).tolist() == [2]
+    assert index.containing(11).tolist() == [1]
+    assert index.containing(37).tolist() == []
+    assert index.overlapping(0, 12).tolist() == [1]
+    assert index.overlapping(11, 13).tolist() == [1, 2]
+
+
+def test_interval_index_matches_brute_force():
+    """
+    test the interval index against a linear scan over random ranges
+    """
+    random.seed(1)
+    starts = [random.randrange(0, 500) for _ in range(300)]
+    ranges = {range_id: (start, start + random.randrange(1, 40)) for range_id, start in enumerate(starts, start=1)}
+    index = IntervalIndex(array(list(ranges.keys())), array([r[0] for r in ranges.values()]),
+                          array([r[1] for r in ranges.values()]))
+
+    for _ in range(200):
+        start = random.randrange(0, 540)
+        end = start + random.randrange(1, 30)
+        assert index.overlapping(start, end).tolist() == brute_force_overlapping(ranges, start, end)
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_repository_adjacent_clauses(tmp_path, backend):
+    """
+    test that a clause ending where the next one starts does not contain the shared boundary index
+    """
+    repository = build_repository(tmp_path, backend)
+    repository.create_many(array(ADJACENT_STARTS), array(ADJACENT_ENDS))
+
+    assert range_ids(repository.read_containing(12)) == [2]
+    assert range_ids(repository.read_containing(24)) == [3]
+    assert range_ids(repository.read_overlapping(0, 12)) == [1]
+    assert range_ids(repository.read_overlapping(10, 30)) == [1, 2, 3]
+
+
+def test_csv_queries_follow_changes_between_rebuilds(tmp_path, monkeypatch):
+    """
+    test that overlap queries see ranges created or moved after the interval index was built
+    """
+    monkeypatch.setattr(TextRangeCSVRepository, "MAX_UNINDEXED_RANGES", 16)
+    repository = build_repository(tmp_path, "csv")
+    ranges: dict[int, tuple[int, int]] = {}
+    random.seed(2)
+    for _ in range(120):
+        start = random.randrange(0, 300)
+        end = start + random.randrange(1, 30)
+        if (len(ranges) > 0) and (random.random() < 0.3):
+            range_id = random.choice(list(ranges.keys()))
+            if (start, end) not in ranges.values():
+                repository.update(range_id, start, end)
+                ranges[range_id] = (start, end)
+        elif (start, end) not in ranges.values():
+            ranges[repository.create(start, end)] = (start, end)
+
+        query_start = random.randrange(0, 320)
+        query_end = query_start + random.randrange(1, 20)
+        assert (range_ids(repository.read_overlapping(query_start, query_end)) ==
+                brute_force_overlapping(ranges, query_start, query_end))
+
+
+def test_sequence_ids_at_text_index(tmp_path):
+    """
+    test that only the sequences with a clause containing the index are found at a clause boundary
+    """
+    service = AnnotationService(tmp_path)
+    service.annotation_dao.write_text_file("First clause ends. Second clause. Third clause goes on.")
+    clause_ids = service.annotation_dao.create_many_clauses(array(ADJACENT_STARTS), array(ADJACENT_ENDS))
+    service.annotation_dao.create_many_sequences(clause_ids[[0, 1]], clause_ids[[2, 2]])
+
+    assert service.get_sequence_ids_at_text_index(11) == [1]
+    assert service.get_sequence_ids_at_text_index(12) == [2]
+    assert service.get_sequence_ids_at_text_index(24) == [1, 2]
@@ -0,0 +1,63 @@
+# Test functions for the LLM delta tracking in annotation.model.AnnotationService
+
+from numpy import array
+from pandas import DataFrame
+
+from annotation.model.AnnotationService import AnnotationService
+from annotation.model.database import DatastoreHandler
+
+
+def build_service(data_dir) -> AnnotationService:
+    service = AnnotationService(data_dir)
+    dao = service.annotation_dao
+    dao.write_text_file("First clause. Second clause. Third clause.")
+    clause_ids = dao.create_many_clauses(array([0, 14, 29]), array([13, 28, 42]))
+    dao.create_many_sequences(clause_ids[[0, 1]], clause_ids[[1, 2]])
+    return service
+
+
+def build_llm_results(predicted_classes: list[str]) -> DataFrame:
+    return DataFrame({
+        DatastoreHandler.SEQ_ID_FIELD: [1, 2],
+        DatastoreHandler.C1_START_FIELD: [0, 14], DatastoreHandler.C1_END_FIELD: [13, 28],
+        DatastoreHandler.C2_START_FIELD: [14, 29], DatastoreHandler.C2_END_FIELD: [28, 42],
+        DatastoreHandler.LINKAGE_FIELD: ["and", "NONE"],
+        DatastoreHandler.PREDICTED_FIELD: predicted_classes,
+        DatastoreHandler.CORRECTED_FIELD: ["0", "0"],
+        DatastoreHandler.REASONING_FIELD: ["because", "NONE"],
+        DatastoreHandler.WINDOW_START_FIELD: [0, 14], DatastoreHandler.WINDOW_END_FIELD: [28, 42]
+    })
+
+
+def test_merge_keeps_failed_sequences_in_delta(tmp_path):
+    """
+    test that sequences whose LLM response failed stay in the delta and are not marked as processed
+    """
+    service = build_service(tmp_path)
+    document = service._document
+    document.llm_delta_df = service.datastore_handler.build_pre_llm_dataframe()
+
+    service.merge_llm_results(build_llm_results(["1", ""]))
+
+    assert document.llm_delta_df[DatastoreHandler.SEQ_ID_FIELD].tolist() == [2]
+    assert document.llm_processed_ranges == {((0, 13), (14, 28))}
+    assert service.get_sequence_predict_classes(1) == ["INC"]
+    assert service.get_sequence_predict_classes(2) == []
+    assert service.get_sequence_reasoning(2) == ""
+    assert service.datastore_handler.get_llm_delta_sequence_ids(document.llm_processed_ranges) == [2]
+    service.close()
+
+
+def test_merge_removes_classified_sequences_from_delta(tmp_path):
+    """
+    test that every sequence with a valid classification is removed from the delta
+    """
+    service = build_service(tmp_path)
+    document = service._document
+    document.llm_delta_df = service.datastore_handler.build_pre_llm_dataframe()
+
+    service.merge_llm_results(build_llm_results(["1", "2,3"]))
+
+    assert len(document.llm_delta_df) == 0
+    assert service.datastore_handler.get_llm_delta_sequence_ids(document.llm_processed_ranges) == []
+    service.close()
@@ -0,0 +1,58 @@
+# Test functions for the result files written by the class LLMProcess in llm.llmprocess
+
+import json
+import os
+
+import pandas as pd
+
+import llm.llmprocess as llmprocess
+from llm.llmprocess import LLMProcess
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schemas')
+
+
+class FakeLLM:
+    """
+    Stands in for the OpenAI client and classifies every sequence in the prompt as INC
+    """
+    def __init__(self, filename_openai_key=None, model_name=None):
+        self.call_count = 0
+
+    def request_chatcompletion(self, prompt, max_tokens=None):
+        self.call_count += 1
+        completion = {str(i): {'reason': 'reason', 'classification': 'INC', 'linkage word': 'and'}
+                      for i in range(prompt.count("'Sample ID'"))}
+        return json.dumps(completion), 10, f'chat{self.call_count}', None
+
+
+def build_process(tmp_path, monkeypatch) -> LLMProcess:
+    monkeypatch.setattr(llmprocess, 'LLM', FakeLLM)
+    monkeypatch.setattr(llmprocess.time, 'sleep', lambda seconds: None)
+
+    text_path = tmp_path / 'text.txt'
+    text_path.write_text("First clause. Second clause. Third clause.")
+    pairs_path = tmp_path / 'pairs.csv'
+    pd.DataFrame({'sequence_id': [1, 2], 'c1_start': [0, 14], 'c1_end': [13, 28],
+                  'c2_start': [14, 29], 'c2_end': [28, 42]}).to_csv(pairs_path, index=False)
+
+    return LLMProcess(str(pairs_path), str(text_path),
+                      os.path.join(SCHEMA_PATH, 'sequencing_examples_reason_converted.json'),
+                      filename_definitions=os.path.join(SCHEMA_PATH, 'sequencing_types_converted.json'),
+                      filename_zero_prompt=os.path.join(SCHEMA_PATH, 'instruction_multiprompt.txt'),
+                      outpath=str(tmp_path / 'results_llm'),
+                      progress_update_fn=lambda *args, **kwargs: None)
+
+
+def test_each_run_writes_its_own_results_file(tmp_path, monkeypatch):
+    """
+    test that running the process again over a new delta of pairs keeps the results of the earlier run
+    """
+    llm_process = build_process(tmp_path, monkeypatch)
+    first_results = llm_process.run()
+
+    llm_process.set_sequences(llm_process.df_sequences.iloc[[1]].reset_index(drop=True))
+    second_results = llm_process.run()
+
+    assert first_results != second_results
+    assert pd.read_csv(first_results)['sequence_id'].tolist() == [1, 2]
+    assert pd.read_csv(second_results)['sequence_id'].tolist() == [2]
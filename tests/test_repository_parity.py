@@ -0,0 +1,147 @@
+# Test functions for the parity of the CSV and SQLite repositories in annotation.model.database.repositories
+
+from threading import Thread
+
+import pytest
+from numpy import array
+
+from annotation.model.database.repositories import (SequenceCSVRepository, SequenceSQLiteRepository,
+                                                    TextRangeCSVRepository, TextRangeSQLiteRepository)
+
+
+def build_sequence_repositories(tmp_path) -> tuple:
+    return (SequenceCSVRepository(tmp_path / "sequences.csv", flush_delay=None),
+            SequenceSQLiteRepository(tmp_path / "sequences.db"))
+
+
+def build_text_range_repositories(tmp_path) -> tuple:
+    return (TextRangeCSVRepository(tmp_path / "clauses.csv", flush_delay=None),
+            TextRangeSQLiteRepository(tmp_path / "clauses.db"))
+
+
+def as_rows(repository_rows) -> list[tuple]:
+    return [tuple(row) for row in repository_rows.tolist()]
+
+
+def test_sequence_create_many_parity(tmp_path):
+    """
+    test that both sequence repositories skip existing and repeated clause pairs and assign the same ids
+    """
+    csv_repository, sqlite_repository = build_sequence_repositories(tmp_path)
+    for repository in (csv_repository, sqlite_repository):
+        repository.create(1, 2)
+
+    results = [repository.create_many(array([1, 2, 3, 2]), array([2, 3, 4, 3]),
+                                      linkage_words=array(["and", "then", "so", "but"]),
+                                      predicted_classes=array([2, 4, 8, 16]))
+               for repository in (csv_repository, sqlite_repository)]
+
+    assert results[0].tolist() == [-1, 2, 3, -1]
+    assert results[1].tolist() == results[0].tolist()
+    assert as_rows(sqlite_repository.read_all()) == as_rows(csv_repository.read_all())
+
+
+def test_sequence_update_many_parity(tmp_path):
+    """
+    test that both sequence repositories update the same rows in bulk and report missing ids
+    """
+    csv_repository, sqlite_repository = build_sequence_repositories(tmp_path)
+    results = []
+    for repository in (csv_repository, sqlite_repository):
+        repository.create_many(array([1, 2, 3]), array([2, 3, 4]))
+        repository.delete(2)
+        results.append(repository.update_many(array([3, 2, 1]), predicted_classes=array([8, 4, 2]),
+                                              reasoning=array(["c", "b", "a"])))
+
+    assert results[0].tolist() == [True, False, True]
+    assert results[1].tolist() == results[0].tolist()
+    assert as_rows(sqlite_repository.read_all()) == as_rows(csv_repository.read_all())
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_text_range_create_many_parity(tmp_path):
+    """
+    test that both text range repositories return the ids of existing ranges and add each new range once,
+    with the ids of new ranges kept as integers
+    """
+    csv_repository, sqlite_repository = build_text_range_repositories(tmp_path)
+    for repository in (csv_repository, sqlite_repository):
+        repository.create_many(array([10]), array([20]))
+
+    results = [repository.create_many(array([0, 10, 20, 0]), array([10, 20, 30, 10]))
+               for repository in (csv_repository, sqlite_repository)]
+
+    assert results[0].tolist() == [2, 1, 3, 2]
+    assert results[1].tolist() == results[0].tolist()
+    assert all(dtype.kind == "i" for dtype in csv_repository._database_cache.dtypes)
+    assert as_rows(sqlite_repository.read_all()) == as_rows(csv_repository.read_all())
+
+
+def test_sqlite_repository_shared_between_threads(tmp_path):
+    """
+    test that creating sequences from several threads on one SQLite repository gives each sequence its own id
+    """
+    repository = SequenceSQLiteRepository(tmp_path / "sequences.db")
+
+    def create_sequences(clause_a_id: int):
+        for clause_b_id in range(50):
+            repository.create(clause_a_id, clause_b_id)
+
+    threads = [Thread(target=create_sequences, args=(clause_a_id,)) for clause_a_id in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    sequence_ids = [row[0] for row in repository.read_all().tolist()]
+    assert sequence_ids == list(range(1, 201))
+
+
+def test_text_range_ids_continue_after_reopen(tmp_path):
+    """
+    test that both text range repositories continue ids from the largest id assigned after the database is reopened
+    """
+    csv_repository, sqlite_repository = build_text_range_repositories(tmp_path)
+    for repository in (csv_repository, sqlite_repository):
+        repository.create_many(array([0, 10]), array([10, 20]))
+        repository.create(20, 30)
+        repository.commit()
+
+    csv_repository, sqlite_repository = build_text_range_repositories(tmp_path)
+    for repository in (csv_repository, sqlite_repository):
+        assert repository.create(30, 40) == 4
+        assert repository.create_many(array([40, 0]), array([50, 10])).tolist() == [5, 1]
+        assert repository.create(10, 20) == 2
+
+
+def test_rows_created_one_at_a_time_parity(tmp_path):
+    """
+    test that rows created one at a time are read, changed and written by the CSV repositories like the SQLite ones,
+    before and after the queued rows are appended to the cache
+    """
+    csv_repository, sqlite_repository = build_sequence_repositories(tmp_path)
+    for repository in (csv_repository, sqlite_repository):
+        for clause_a_id in range(1, 5):
+            repository.create(clause_a_id, clause_a_id + 1, linkage_words="and", predicted_classes=clause_a_id)
+        assert tuple(repository.read_by_id(3)) == (3, 3, 4, "and", 3, 1, "")
+        assert repository.read_id_by_clause_pair(4, 5) == 4
+        repository.update(4, reasoning="queued")
+        repository.delete(2)
+        repository.create(9, 10)
+        repository.commit()
+
+    assert as_rows(sqlite_repository.read_all()) == as_rows(csv_repository.read_all())
+    assert as_rows(SequenceCSVRepository(tmp_path / "sequences.csv", flush_delay=None).read_all()) == \
+        as_rows(sqlite_repository.read_all())
+
+    csv_repository, sqlite_repository = build_text_range_repositories(tmp_path)
+    for repository in (csv_repository, sqlite_repository):
+        repository.create_many(array([0]), array([10]))
+        repository.read_overlapping(0, 1)
+        repository.create(5, 15)
+        repository.create(20, 30)
+        assert tuple(repository.read_by_range(5, 15)) == (2, 5, 15)
+        assert as_rows(repository.read_overlapping(8, 25)) == [(1, 0, 10), (2, 5, 15), (3, 20, 30)]
+        repository.update(2, 12, 18)
+
+    assert as_rows(sqlite_repository.read_all()) == as_rows(csv_repository.read_all())
@@ -0,0 +1,120 @@
+# Test functions for the stable sequence ids of annotation.model.database.AnnotationDAO and SequenceCSVRepository
+
+import random
+from threading import Event, Thread
+
+from numpy import arange
+
+from annotation.model.database.AnnotationDAO import AnnotationDAO
+from annotation.model.database.repositories import SequenceCSVRepository
+
+
+def build_dao(tmp_path, sequence_count: int) -> AnnotationDAO:
+    dao = AnnotationDAO(tmp_path / "text.txt", tmp_path / "clauses.csv", tmp_path / "sequences.csv")
+    dao.create_many_sequences(arange(sequence_count), arange(sequence_count) + 1)
+    return dao
+
+
+def test_positions_skip_deleted_sequences(tmp_path):
+    """
+    test that deleting sequences keeps the ids of the others and shifts only the positions after them
+    """
+    dao = build_dao(tmp_path, 5)
+    dao.delete_sequence(2)
+    dao.delete_sequence(4)
+
+    assert dao.get_sequence_count() == 3
+    assert [dao.get_sequence_id_at(position) for position in range(1, 5)] == [1, 3, 5, None]
+    assert [dao.get_sequence_position(sequence_id) for sequence_id in range(1, 6)] == [1, None, 2, None, 3]
+    assert dao.create_sequence(10, 11) == 6
+    assert dao.get_sequence_position(6) == 4
+
+
+def test_positions_match_after_many_deletes(tmp_path, monkeypatch):
+    """
+    test that positions stay consistent with the remaining ids as deleted ids build up and are removed from the index
+    """
+    monkeypatch.setattr(AnnotationDAO, "MAX_DELETED_SEQUENCE_IDS", 8)
+    dao = build_dao(tmp_path, 100)
+    remaining_ids: list[int] = list(range(1, 101))
+    random.seed(0)
+    for sequence_id in random.sample(remaining_ids, 60):
+        dao.delete_sequence(sequence_id)
+        remaining_ids.remove(sequence_id)
+
+        assert dao.get_sequence_count() == len(remaining_ids)
+        assert [dao.get_sequence_id_at(position) for position in range(1, len(remaining_ids) + 1)] == remaining_ids
+        assert all(dao.get_sequence_position(remaining_id) == position
+                   for position, remaining_id in enumerate(remaining_ids, start=1))
+
+
+def test_tombstones_compacted_on_commit(tmp_path):
+    """
+    test that deleted rows are dropped when the database is written, without the ids of deleted sequences being reused
+    """
+    database_path = tmp_path / "sequences.csv"
+    repository = SequenceCSVRepository(database_path, flush_delay=None)
+    repository.create_many(arange(4), arange(4) + 1)
+    repository.delete(2)
+    repository.delete(4)
+    repository.commit()
+
+    reopened = SequenceCSVRepository(database_path, flush_delay=None)
+
+    assert [int(row[0]) for row in reopened.read_all()] == [1, 3]
+    assert len(database_path.read_text().splitlines()) == 4
+    assert reopened.create(10, 11) == 5
+
+
+def test_database_without_deleted_field_readable(tmp_path):
+    """
+    test that a sequence database written before sequences were tombstoned is read with no sequences deleted
+    """
+    database_path = tmp_path / "sequences.csv"
+    database_path.write_text("sequence_id,c1_id,c2_id,linkage_words,predicted_classes,corrected_classes,reasoning\n"
+                             "1,1,2,and,2,0,because\n"
+                             "3,2,3,,0,1,\n")
+
+    repository = SequenceCSVRepository(database_path, flush_delay=None)
+
+    assert repository.read_by_id(1) == (1, 1, 2, "and", 2, 0, "because")
+    assert [int(row[0]) for row in repository.read_all()] == [1, 3]
+    assert repository.create(3, 4) == 4
+
+
+def test_reads_wait_for_commit_on_another_thread(tmp_path):
+    """
+    test that a read made while another thread compacts the tombstones sees the sequences before or after compaction,
+    never the compacted rows through the positions held before compaction
+    """
+    repository = SequenceCSVRepository(tmp_path / "sequences.csv", flush_delay=None)
+    repository.create_many(arange(4), arange(4) + 1)
+    repository.delete(1)
+    compacted = Event()
+    release = Event()
+    rebuild_id_index = repository._rebuild_id_index
+
+    def rebuild_id_index_slowly():
+        compacted.set()
+        release.wait(5)
+        rebuild_id_index()
+
+    repository._rebuild_id_index = rebuild_id_index_slowly
+    read_results: dict[str, object] = {}
+
+    def read_sequences():
+        read_results["by_id"] = repository.read_by_id(3)
+        read_results["by_clause"] = [int(row[0]) for row in repository.read_by_clause_id(3)]
+
+    committer = Thread(target=repository.commit)
+    committer.start()
+    assert compacted.wait(5)
+    reader = Thread(target=read_sequences)
+    reader.start()
+    reader.join(0.2)
+    release.set()
+    committer.join()
+    reader.join()
+
+    assert read_results["by_id"][:3] == (3, 2, 3)
+    assert read_results["by_clause"] == [3, 4]
@@ -0,0 +1,78 @@
+# Test functions for the memory-mapped text store of annotation.model.database.repositories.TextTXTRepository
+
+import random
+
+import pytest
+
+from annotation.model.database.repositories import TextTXTRepository
+
+# Characters encoded in 1, 2, 3 and 4 bytes in UTF-8
+MIXED_WIDTH_CHARS: str = "a é 中 😀\n"
+
+
+def build_text(char_count: int) -> str:
+    random.seed(3)
+    return "".join(random.choice(MIXED_WIDTH_CHARS) for _ in range(char_count))
+
+
+def test_ranges_match_string_slices(tmp_path, monkeypatch):
+    """
+    test that reading any range of a text with characters of every width matches slicing the text
+    """
+    monkeypatch.setattr(TextTXTRepository, "INDEX_INTERVAL", 7)
+    monkeypatch.setattr(TextTXTRepository, "CHUNK_SIZE", 64)
+    text = build_text(1000)
+    repository = TextTXTRepository(tmp_path / "text.txt")
+    repository.write_file(text)
+
+    assert repository.get_end_index() == len(text)
+    assert repository.read_all() == text
+    for _ in range(300):
+        start = random.randrange(0, len(text) + 1)
+        end = random.randrange(start, len(text) + 1)
+        assert repository.read_by_range(start, end) == text[start:end]
+
+
+def test_index_rebuilt_when_reopened_and_rewritten(tmp_path, monkeypatch):
+    """
+    test that the character index is rebuilt from the file when the repository is reopened or the text is replaced
+    """
+    monkeypatch.setattr(TextTXTRepository, "INDEX_INTERVAL", 5)
+    text_path = tmp_path / "text.txt"
+    TextTXTRepository(text_path).write_file(build_text(200))
+    text_path.write_text("😀" * 30 + "end", encoding="utf-8")
+
+    repository = TextTXTRepository(text_path)
+
+    assert repository.get_end_index() == 33
+    assert repository.read_by_range(29, 33) == "😀end"
+    repository.write_file("short é")
+    assert repository.read_by_range(6, 7) == "é"
+    assert text_path.read_text(encoding="utf-8") == "short é"
+
+
+def test_empty_text(tmp_path):
+    """
+    test that an empty or cleared text file is read without being memory-mapped
+    """
+    repository = TextTXTRepository(tmp_path / "text.txt")
+
+    assert repository.get_end_index() == 0
+    assert repository.read_all() == ""
+    assert repository.read_by_range(0, 0) == ""
+    repository.write_file("some text")
+    repository.clear_database()
+    assert repository.read_all() == ""
+
+
+def test_invalid_ranges_rejected(tmp_path):
+    """
+    test that ranges before the start, reversed or past the end of the text raise a ValueError
+    """
+    repository = TextTXTRepository(tmp_path / "text.txt")
+    repository.write_file("中文 text")
+
+    for start, end in ((-1, 2), (3, 2), (0, 8)):
+        with pytest.raises(ValueError):
+            repository.read_by_range(start, end)
+    assert repository.read_by_range(0, 7) == "中文 text"
@@ -0,0 +1,127 @@
+# Test functions for the write-ahead log of annotation.model.database.repositories.WriteBehindCache
+
+import json
+import shutil
+
+from numpy import array
+
+from annotation.model.AnnotationService import AnnotationService
+from annotation.model.database.repositories import SequenceCSVRepository, WriteBehindCache
+
+
+def read_sequence_ids(repository: SequenceCSVRepository) -> list[int]:
+    return [int(row[0]) for row in repository.read_all()]
+
+
+def test_uncommitted_changes_replayed_after_crash(tmp_path):
+    """
+    test that changes never compacted into the database are recovered from the log when the database is reopened
+    """
+    database_path = tmp_path / "sequences.csv"
+    repository = SequenceCSVRepository(database_path, flush_delay=None)
+    repository.create_many(array([1, 2, 3]), array([2, 3, 4]))
+    repository.update(2, predicted_classes=4)
+    repository.delete(3)
+
+    recovered = SequenceCSVRepository(database_path, flush_delay=None)
+
+    assert read_sequence_ids(recovered) == [1, 2]
+    assert recovered.read_by_id(2)[4] == 4
+    assert recovered.create(4, 5) == 4
+
+
+def test_compacted_log_not_replayed(tmp_path):
+    """
+    test that a log left behind by an interrupted compaction is not replayed onto the compacted database
+    """
+    database_path = tmp_path / "sequences.csv"
+    log_path = tmp_path / ("sequences.csv" + WriteBehindCache.LOG_SUFFIX)
+    repository = SequenceCSVRepository(database_path, flush_delay=None)
+    repository.create_many(array([1, 2]), array([2, 3]))
+    shutil.copyfile(log_path, tmp_path / "stale.wal")
+    repository.commit()
+    repository.delete(1)
+    repository.commit()
+    shutil.copyfile(tmp_path / "stale.wal", log_path)
+
+    reopened = SequenceCSVRepository(database_path, flush_delay=None)
+
+    assert read_sequence_ids(reopened) == [2]
+
+
+def test_log_restarted_after_compaction_by_another_writer(tmp_path):
+    """
+    test that appending after another writer compacted the database starts the log with the new database signature
+    """
+    database_path = tmp_path / "sequences.csv"
+    log_path = tmp_path / ("sequences.csv" + WriteBehindCache.LOG_SUFFIX)
+    first_writer = SequenceCSVRepository(database_path, flush_delay=None)
+    second_writer = SequenceCSVRepository(database_path, flush_delay=None)
+    second_writer.create(1, 2)
+    first_writer.create(5, 6)
+    first_writer.commit()
+
+    second_writer.create(2, 3)
+
+    with open(log_path, 'r', encoding='utf-8') as log_f:
+        record_type, values = json.loads(log_f.readline())
+    assert record_type == WriteBehindCache.SNAPSHOT_RECORD
+    assert values == second_writer._snapshot_signature()
+    reopened = SequenceCSVRepository(database_path, flush_delay=None)
+    assert reopened.read_id_by_clause_pair(2, 3) is not None
+
+
+def test_service_startup_keeps_recovered_data(tmp_path):
+    """
+    test that starting the annotation service does not clear the data recovered from the logs
+    """
+    service = AnnotationService(tmp_path)
+    service.annotation_dao.write_text_file("First clause. Second clause.")
+    clause_ids = service.annotation_dao.create_many_clauses(array([0, 14]), array([13, 28]))
+    service.annotation_dao.create_many_sequences(clause_ids[[0]], clause_ids[[1]])
+
+    restarted = AnnotationService(tmp_path)
+
+    assert restarted.get_sequence_count() == 1
+    assert restarted.get_text() == "First clause. Second clause."
+
+
+def test_open_caches_committed_by_exit_hook(tmp_path):
+    """
+    test that the single exit hook commits every open cache, and that a closed cache is committed and no longer held
+    """
+    database_path = tmp_path / "sequences.csv"
+    open_repository = SequenceCSVRepository(database_path, flush_delay=None)
+    closed_repository = SequenceCSVRepository(tmp_path / "closed.csv", flush_delay=None)
+    open_repository.create(1, 2)
+    closed_repository.create(1, 2)
+
+    closed_repository.close()
+    WriteBehindCache._commit_open_caches()
+
+    assert open_repository in WriteBehindCache._open_caches
+    assert closed_repository not in WriteBehindCache._open_caches
+    assert not open_repository.has_uncommitted_changes()
+    assert not closed_repository.has_uncommitted_changes()
+    assert closed_repository._log_file is None
+    assert read_sequence_ids(SequenceCSVRepository(tmp_path / "closed.csv", flush_delay=None)) == [1]
+
+
+def test_session_end_closes_datastores(tmp_path):
+    """
+    test that closing the service of a session commits and closes its datastores before they are deleted
+    """
+    shared_service = AnnotationService(tmp_path)
+    session_service = AnnotationService(tmp_path, session_id="session-1")
+    for service in (shared_service, session_service):
+        service.annotation_dao.create_many_sequences(array([1]), array([2]))
+    shared_repository = shared_service.annotation_dao.sequence_repository
+    session_dir = session_service.workspace.data_dir
+
+    shared_service.close()
+    session_service.close()
+
+    assert shared_repository not in WriteBehindCache._open_caches
+    assert shared_repository._log_file is None
+    assert not session_dir.exists()
+    assert AnnotationService(tmp_path).get_sequence_count() == 1